@@ -0,0 +1,73 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from py_bit_torrent.protocol.shared_file_handler import file_io
+
+"""
+    benchmark of many concurrent writers writing pieces into the shared file,
+    compares the earlier global lock around lseek + write on the shared file
+    descriptor with positional writes (pwrite) that need no lock
+
+    usage : python -m benchmarks.concurrent_writes
+"""
+
+PIECE_LENGTH = 2**18
+PIECES_COUNT = 512
+WRITERS_COUNT = 16
+REPEAT = 7
+
+
+# earlier writing : shared file descriptor is moved and written under lock
+class locked_writer:
+    def __init__(self, file_path):
+        self.download_file = file_io(file_path)
+        self.shared_file_lock = threading.Lock()
+
+    def write_piece(self, piece_index, piece_data):
+        with self.shared_file_lock:
+            self.download_file.move_descriptor_position(piece_index * PIECE_LENGTH)
+            self.download_file.write(piece_data)
+
+
+class positional_writer:
+    def __init__(self, file_path):
+        self.download_file = file_io(file_path)
+
+    def write_piece(self, piece_index, piece_data):
+        self.download_file.pwrite(piece_data, piece_index * PIECE_LENGTH)
+
+
+def write_file(writer_class, piece_data):
+    with tempfile.TemporaryDirectory() as directory:
+        writer = writer_class(os.path.join(directory, "download.bin"))
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(WRITERS_COUNT) as executor:
+            for piece_index in range(PIECES_COUNT):
+                executor.submit(writer.write_piece, piece_index, piece_data)
+        seconds = time.perf_counter() - start_time
+        os.close(writer.download_file.file_descriptor)
+    return seconds
+
+
+# best of the repeated runs since page cache writes are noisy
+def report(name, writer_class, piece_data):
+    seconds = min(write_file(writer_class, piece_data) for _ in range(REPEAT))
+    throughput = PIECES_COUNT * PIECE_LENGTH / seconds / 2**20
+    print(
+        name.ljust(12),
+        str(round(seconds, 3)).rjust(8),
+        "seconds",
+        str(round(throughput, 1)).rjust(10),
+        "MiB/s with",
+        WRITERS_COUNT,
+        "writers",
+    )
+
+
+if __name__ == "__main__":
+    piece_data = os.urandom(PIECE_LENGTH)
+    report("locked", locked_writer, piece_data)
+    report("positional", positional_writer, piece_data)
@@ -0,0 +1,116 @@
+import struct
+import time
+import tracemalloc
+
+from py_bit_torrent.protocol.peer_state import DSTATE2, peer_state
+from py_bit_torrent.protocol.peer_wire_messages import PEER_MESSAGE_DECODER, PIECE
+
+"""
+    benchmark of the objects allocated for every message recieved by the
+    peer over 1 GiB transfer of PIECE messages, compares the earlier
+    messages (general peer wire message decoded into the message type, both
+    having __dict__) and the earlier peer state (four flags compared with the
+    FSM state objects) with the compact messages decoded directly from the
+    frame and the peer state stored as a small int
+
+    usage : python -m benchmarks.message_allocation
+"""
+
+BLOCK_LENGTH = 2**14
+TRANSFER_SIZE = 2**30
+MESSAGES_COUNT = TRANSFER_SIZE // BLOCK_LENGTH
+# messages kept alive while measuring the memory of a message
+SAMPLE_COUNT = 1024
+
+
+# earlier messages : attributes of every message in __dict__
+class legacy_peer_wire_message:
+    def __init__(self, message_length, message_id, payload):
+        self.message_length = message_length
+        self.message_id = message_id
+        self.payload = payload
+
+
+class legacy_piece(legacy_peer_wire_message):
+    def __init__(self, piece_index, block_offset, block):
+        super().__init__(9 + len(block), PIECE, None)
+        self.piece_index = piece_index
+        self.block_offset = block_offset
+        self.block = block
+
+
+# earlier peer state : four flags compared one by one with the FSM state
+class legacy_peer_state:
+    def __init__(self, am_choking, am_interested, peer_choking, peer_interested):
+        self.am_choking = am_choking
+        self.am_interested = am_interested
+        self.peer_choking = peer_choking
+        self.peer_interested = peer_interested
+
+    def __eq__(self, other):
+        return (
+            self.am_choking == other.am_choking
+            and self.am_interested == other.am_interested
+            and self.peer_choking == other.peer_choking
+            and self.peer_interested == other.peer_interested
+        )
+
+
+LEGACY_DSTATE2 = legacy_peer_state(True, True, False, False)
+
+
+def legacy_recieve(frame, state):
+    message_length, message_id, payload = frame
+    message = legacy_peer_wire_message(message_length, message_id, payload)
+    piece_index, block_offset = struct.unpack_from("!II", message.payload)
+    decoded = legacy_piece(piece_index, block_offset, memoryview(message.payload)[8:])
+    return state == LEGACY_DSTATE2, decoded
+
+
+def compact_recieve(frame, state):
+    decoded = PEER_MESSAGE_DECODER.decode_frame(*frame)
+    return state.download_state() == DSTATE2, decoded
+
+
+def compact_state():
+    state = peer_state()
+    state.set_client_interested()
+    state.set_peer_unchoking()
+    return state
+
+
+# every frame refers the payload of the same recieve buffer
+def frames(count):
+    buffer = bytearray(struct.pack("!II", 0, 0) + bytes(BLOCK_LENGTH))
+    payload = memoryview(buffer)
+    for message_index in range(count):
+        yield 9 + BLOCK_LENGTH, PIECE, payload
+
+
+def report(name, recieve, state):
+    # memory of the messages and views allocated for every message
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    messages = [recieve(frame, state) for frame in frames(SAMPLE_COUNT)]
+    message_memory = (tracemalloc.get_traced_memory()[0] - before) / SAMPLE_COUNT
+    tracemalloc.stop()
+    del messages
+
+    start_time = time.perf_counter()
+    for frame in frames(MESSAGES_COUNT):
+        in_state, message = recieve(frame, state)
+    seconds = time.perf_counter() - start_time
+    print(
+        name.ljust(8),
+        str(round(message_memory)).rjust(6),
+        "bytes per message",
+        str(round(seconds * 1000, 1)).rjust(8),
+        "ms per GiB",
+        str(round(seconds / MESSAGES_COUNT * 10**9)).rjust(6),
+        "ns per message",
+    )
+
+
+if __name__ == "__main__":
+    report("legacy", legacy_recieve, legacy_peer_state(True, True, False, False))
+    report("compact", compact_recieve, compact_state())
@@ -0,0 +1,76 @@
+import hashlib
+import os
+import tempfile
+import time
+import tracemalloc
+from copy import deepcopy
+
+from py_bit_torrent.protocol.peer import Peer
+from py_bit_torrent.protocol.torrent import torrent
+from py_bit_torrent.protocol.torrent_file_handler import torrent_metadata
+
+"""
+    benchmark of the memory used by the connected peers of a large torrent,
+    compares the earlier peers which deep copied the torrent (piece hashes
+    and statistics) with the peers sharing the torrent metadata and keeping
+    only their own small statistics. Memory is measured with tracemalloc
+
+    usage : python -m benchmarks.peer_memory
+"""
+
+PIECES_COUNT = 100000
+PIECE_LENGTH = 2**18
+PEERS_COUNT = 200
+
+
+def make_torrent():
+    pieces = os.urandom(20 * PIECES_COUNT)
+    metadata = torrent_metadata(
+        [None],
+        "large.bin",
+        PIECES_COUNT * PIECE_LENGTH,
+        PIECE_LENGTH,
+        pieces,
+        hashlib.sha1(pieces).digest(),
+        None,
+    )
+    client_request = {"seeding": None, "downloading": ".", "max peers": 4}
+    return torrent(metadata, client_request)
+
+
+# earlier peer : every peer has its own deep copy of the torrent
+def legacy_peer(peer_port, shared_torrent):
+    return Peer("127.0.0.1", peer_port, deepcopy(shared_torrent))
+
+
+def shared_peer(peer_port, shared_torrent):
+    return Peer("127.0.0.1", peer_port, shared_torrent)
+
+
+def report(name, create_peer, first_port):
+    shared_torrent = make_torrent()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    peers = [
+        create_peer(first_port + port, shared_torrent) for port in range(PEERS_COUNT)
+    ]
+    seconds = time.perf_counter() - start_time
+    peers_memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(
+        name.ljust(10),
+        str(round(peers_memory / PEERS_COUNT)).rjust(10),
+        "bytes per peer",
+        str(round(seconds / PEERS_COUNT * 1000, 3)).rjust(8),
+        "ms per peer",
+    )
+    return peers
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        # loggers of the protocol write into ./torrent_logs/
+        os.chdir(directory)
+        os.mkdir("torrent_logs")
+        report("deepcopy", legacy_peer, 10000)
+        report("shared", shared_peer, 20000)
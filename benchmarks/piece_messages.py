@@ -0,0 +1,85 @@
+import struct
+import timeit
+import tracemalloc
+
+from py_bit_torrent.protocol.peer_wire_messages import (
+    PEER_MESSAGE_DECODER,
+    PIECE,
+    peer_wire_message,
+    piece,
+)
+
+"""
+    micro-benchmark of bytes copied for every block of PIECE message that is
+    received (decode) and sent (encode), compared with the earlier encoding
+    which sliced the payload and concatenated the header with the block
+
+    usage : python -m benchmarks.piece_messages
+"""
+
+BLOCK_LENGTH = 2**14
+
+
+# earlier decoding : block sliced out of payload and payload rebuilt
+def legacy_decode(payload):
+    piece_index = struct.unpack_from("!I", payload, 0)[0]
+    block_offset = struct.unpack_from("!I", payload, 4)[0]
+    block = payload[8:]
+    rebuilt_payload = struct.pack("!I", piece_index)
+    rebuilt_payload += struct.pack("!I", block_offset)
+    rebuilt_payload += block
+    return block, rebuilt_payload
+
+
+# earlier encoding : payload with block and then message with payload
+def legacy_encode(piece_index, block_offset, block):
+    payload = struct.pack("!I", piece_index)
+    payload += struct.pack("!I", block_offset)
+    payload += block
+    message = struct.pack("!I", 9 + len(block))
+    message += struct.pack("!B", PIECE)
+    message += payload
+    return payload, message
+
+
+def decode(payload):
+    message = peer_wire_message(9 + BLOCK_LENGTH, PIECE, payload)
+    return PEER_MESSAGE_DECODER.decode(message)
+
+
+def encode(piece_index, block_offset, block):
+    return piece(piece_index, block_offset, block).message_parts()
+
+
+# bytes allocated by the function call, results are kept alive while measuring
+def allocated_bytes(function, *args):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = function(*args)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def report(name, function, *args):
+    copied = allocated_bytes(function, *args)
+    seconds = timeit.timeit(lambda: function(*args), number=10000) / 10000
+    print(
+        name.ljust(16),
+        str(copied).rjust(8),
+        "bytes allocated per block",
+        str(round(seconds * 1e6, 2)).rjust(8),
+        "us per block",
+    )
+
+
+if __name__ == "__main__":
+    block = bytes(BLOCK_LENGTH)
+    # received payload is a view of the receive buffer of framed reader
+    payload = memoryview(bytearray(struct.pack("!II", 1, 0) + block))
+
+    report("legacy decode", legacy_decode, bytes(payload))
+    report("decode", decode, payload)
+    report("legacy encode", legacy_encode, 1, 0, block)
+    report("encode", encode, 1, 0, block)
@@ -0,0 +1,88 @@
+import asyncio
+import time
+
+from py_bit_torrent.protocol.peer_protocol import peer_protocol
+from py_bit_torrent.protocol.rate_limiter import create_rate_limiter
+
+"""
+    benchmark of the accuracy of rate limiting, several peers upload blocks
+    to local leechers over loopback at the same time, every peer is limited
+    by its own limit and by the global limit shared by all the peers. The
+    measured rates are compared with the limits for uploading (limited
+    writes) and for downloading (limited reads of the leechers)
+
+    usage : python -m benchmarks.rate_limiting
+"""
+
+BLOCK_LENGTH = 2**14
+PEERS_COUNT = 8
+PEER_DATA_SIZE = 2**22
+# limits in KB/s, the global limit is the tighter one with all peers active
+GLOBAL_RATE = 8 * 2**10
+PEER_RATE = 2 * 2**10
+
+
+async def peer_upload(connection):
+    for _ in range(PEER_DATA_SIZE // BLOCK_LENGTH):
+        await connection.write(bytes(BLOCK_LENGTH))
+    connection.close()
+
+
+async def leecher_download(port, download_limiter):
+    def leecher_protocol():
+        connection = peer_protocol()
+        connection.set_rate_limiters(download_limiter, None)
+        return connection
+
+    _, connection = await asyncio.get_running_loop().create_connection(
+        leecher_protocol, "127.0.0.1", port
+    )
+    await connection.read_exactly(PEER_DATA_SIZE)
+    connection.close()
+
+
+async def swarm_transfer(upload_limited):
+    global_limiter = create_rate_limiter(GLOBAL_RATE)
+
+    def peer_limiter():
+        return create_rate_limiter(PEER_RATE, global_limiter)
+
+    def seeder_protocol():
+        connection = peer_protocol(peer_upload)
+        if upload_limited:
+            connection.set_rate_limiters(None, peer_limiter())
+        return connection
+
+    server = await asyncio.get_running_loop().create_server(
+        seeder_protocol, "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    start_time = time.perf_counter()
+    await asyncio.gather(
+        *[
+            leecher_download(port, None if upload_limited else peer_limiter())
+            for _ in range(PEERS_COUNT)
+        ]
+    )
+    seconds = time.perf_counter() - start_time
+    server.close()
+    return seconds
+
+
+def report(name, upload_limited):
+    seconds = asyncio.run(swarm_transfer(upload_limited))
+    rate = PEERS_COUNT * PEER_DATA_SIZE / seconds / 2**10
+    print(
+        name.ljust(10),
+        str(round(seconds, 3)).rjust(8),
+        "seconds",
+        str(round(rate)).rjust(8),
+        "KB/s",
+        str(round((rate - GLOBAL_RATE) / GLOBAL_RATE * 100, 2)).rjust(8),
+        "% error",
+    )
+
+
+if __name__ == "__main__":
+    report("upload", True)
+    report("download", False)
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from py_bit_torrent.protocol.peer_protocol import peer_protocol
+from py_bit_torrent.protocol.peer_wire_messages import piece
+from py_bit_torrent.protocol.shared_file_handler import file_io
+
+"""
+    benchmark of seeder uploading the blocks of a file to a local leecher
+    over loopback, compares uploading the blocks read into user space
+    (pread in worker thread + scatter/gather write of header and block)
+    with sending the blocks directly from the file using sendfile
+
+    usage : python -m benchmarks.seeding_throughput
+"""
+
+BLOCK_LENGTH = 2**14
+FILE_SIZE = 2**26
+REPEAT = 5
+
+
+# earlier uploading : block is read from file and written to the transport
+async def upload_read_blocks(connection, seed_file):
+    for file_position in range(0, FILE_SIZE, BLOCK_LENGTH):
+        block = await asyncio.to_thread(seed_file.pread, BLOCK_LENGTH, file_position)
+        header = piece.block_header(0, file_position, BLOCK_LENGTH)
+        await connection.write(header, block)
+
+
+async def upload_sendfile_blocks(connection, seed_file):
+    for file_position in range(0, FILE_SIZE, BLOCK_LENGTH):
+        header = piece.block_header(0, file_position, BLOCK_LENGTH)
+        await connection.sendfile(header, seed_file, file_position, BLOCK_LENGTH)
+
+
+async def leecher_download(seed_file, upload_blocks):
+    uploaded = asyncio.get_running_loop().create_future()
+
+    async def seeder_upload(connection):
+        await upload_blocks(connection, seed_file)
+        connection.close()
+        uploaded.set_result(True)
+
+    server = await asyncio.get_running_loop().create_server(
+        lambda: peer_protocol(seeder_upload), "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    start_time = time.perf_counter()
+    recieved = 0
+    while True:
+        data = await reader.read(2**20)
+        if not data:
+            break
+        recieved += len(data)
+    seconds = time.perf_counter() - start_time
+    await uploaded
+    writer.close()
+    server.close()
+    assert recieved == FILE_SIZE // BLOCK_LENGTH * (13 + BLOCK_LENGTH)
+    return seconds
+
+
+def report(name, seed_file, upload_blocks):
+    seconds = min(
+        asyncio.run(leecher_download(seed_file, upload_blocks)) for _ in range(REPEAT)
+    )
+    print(
+        name.ljust(10),
+        str(round(seconds, 3)).rjust(8),
+        "seconds",
+        str(round(FILE_SIZE / seconds / 2**20, 1)).rjust(10),
+        "MiB/s",
+    )
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        seed_path = os.path.join(directory, "seed.bin")
+        with open(seed_path, "wb") as seed:
+            seed.write(os.urandom(FILE_SIZE))
+        seed_file = file_io(seed_path)
+        report("read", seed_file, upload_read_blocks)
+        report("sendfile", seed_file, upload_sendfile_blocks)
+        seed_file.close()
@@ -0,0 +1,96 @@
+import asyncio
+import time
+
+from py_bit_torrent.protocol.download_scheduler import download_scheduler
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+from py_bit_torrent.protocol.piece_picker import piece_picker
+
+"""
+    simulated swarm where every peer has all the pieces and one peer is ten
+    times slower than the others, compares the time to download all pieces
+    with rounds of pieces across peers (every round waits for the slowest
+    peer) against the continuous scheduler where each peer pulls its next
+    piece as soon as it finishes one
+
+    usage : python -m benchmarks.slow_peer_scheduler
+"""
+
+PIECES_COUNT = 128
+PEERS_COUNT = 4
+# seconds taken by a fast peer for downloading a piece
+PIECE_TIME = 0.005
+SLOW_FACTOR = 10
+
+
+class simulated_torrent:
+    block_length = 2**14
+
+    def get_piece_length(self, piece_index):
+        return 2**18
+
+
+class simulated_peer:
+    def __init__(self, piece_time):
+        self.piece_time = piece_time
+        self.bitfield_pieces = piece_bitfield.full(PIECES_COUNT)
+        self.pieces_downloaded = 0
+
+    async def download_piece(self, piece_index):
+        await asyncio.sleep(self.piece_time)
+        self.pieces_downloaded += 1
+        return True
+
+
+def make_swarm():
+    peers = [simulated_peer(PIECE_TIME) for _ in range(PEERS_COUNT - 1)]
+    peers.append(simulated_peer(PIECE_TIME * SLOW_FACTOR))
+    picker = piece_picker(PIECES_COUNT)
+    for peer in peers:
+        picker.add_peer_bitfield(peer.bitfield_pieces)
+    return peers, picker
+
+
+# earlier downloading : one piece per peer in every round
+async def download_in_rounds():
+    peers, picker = make_swarm()
+    while picker.has_available_pieces():
+        pieces = picker.rarest_pieces(len(peers))
+        results = await asyncio.gather(
+            *[peer.download_piece(piece) for peer, piece in zip(peers, pieces)]
+        )
+        for piece_index, downloaded in zip(pieces, results):
+            if downloaded:
+                picker.mark_downloaded(piece_index)
+    return peers
+
+
+async def download_continuously():
+    peers, picker = make_swarm()
+    scheduler = download_scheduler(picker, simulated_torrent())
+
+    async def peer_worker(peer):
+        while (downloading_piece := scheduler.next_piece(peer)) is not None:
+            piece_index = downloading_piece.piece_index
+            downloaded = await peer.download_piece(piece_index)
+            scheduler.piece_finished(peer, piece_index, downloaded)
+
+    await asyncio.gather(*[peer_worker(peer) for peer in peers])
+    return peers
+
+
+def report(name, download):
+    start_time = time.perf_counter()
+    peers = asyncio.run(download())
+    seconds = time.perf_counter() - start_time
+    print(
+        name.ljust(12),
+        str(round(seconds, 3)).rjust(8),
+        "seconds",
+        " pieces per peer :",
+        [peer.pieces_downloaded for peer in peers],
+    )
+
+
+if __name__ == "__main__":
+    report("rounds", download_in_rounds)
+    report("continuous", download_continuously)
@@ -0,0 +1,90 @@
+import os
+import random
+import tempfile
+import time
+from types import SimpleNamespace
+
+from py_bit_torrent.protocol.disk_writer import disk_writer
+from py_bit_torrent.protocol.shared_file_handler import torrent_shared_file_handler
+
+"""
+    benchmark of writing the verified pieces downloaded in random order,
+    compares the earlier writing of every piece with its own pwrite with
+    the disk writer writing the batches of dirty pieces in file order with
+    one pwritev for every run of adjacent pieces
+
+    usage : python -m benchmarks.write_combining
+"""
+
+PIECE_LENGTH = 2**16
+PIECES_COUNT = 4096
+# pieces verified while the earlier batch is being written
+BATCH_SIZE = 64
+REPEAT = 5
+
+
+def make_file_handler(directory):
+    metadata = SimpleNamespace(
+        file_size=PIECE_LENGTH * PIECES_COUNT, piece_length=PIECE_LENGTH
+    )
+    torrent = SimpleNamespace(torrent_metadata=metadata, client_request={})
+    return torrent_shared_file_handler(os.path.join(directory, "download.bin"), torrent)
+
+
+# earlier writing : every verified piece is written by its own system call
+def write_pieces(file_handler, pieces_order, piece_data):
+    for piece_index in pieces_order:
+        file_handler.write_piece(piece_index, piece_data)
+    return len(pieces_order)
+
+
+def write_combined_pieces(file_handler, pieces_order, piece_data):
+    writer = disk_writer(file_handler)
+    for batch_start in range(0, len(pieces_order), BATCH_SIZE):
+        batch = pieces_order[batch_start : batch_start + BATCH_SIZE]
+        writer.write_dirty_pieces({piece_index: piece_data for piece_index in batch})
+    return writer.writes_count
+
+
+def write_file(write_function, pieces_order, piece_data):
+    with tempfile.TemporaryDirectory() as directory:
+        file_handler = make_file_handler(directory)
+        file_handler.initialize_for_download()
+        start_time = time.perf_counter()
+        writes_count = write_function(file_handler, pieces_order, piece_data)
+        os.fsync(file_handler.download_file.file_descriptor)
+        seconds = time.perf_counter() - start_time
+        file_handler.download_file.close()
+    return seconds, writes_count
+
+
+def report(name, write_function, pieces_order, piece_data):
+    seconds, writes_count = min(
+        write_file(write_function, pieces_order, piece_data) for _ in range(REPEAT)
+    )
+    print(
+        name.ljust(10),
+        str(round(seconds, 3)).rjust(8),
+        "seconds",
+        str(writes_count).rjust(6),
+        "write system calls",
+    )
+
+
+if __name__ == "__main__":
+    piece_data = os.urandom(PIECE_LENGTH)
+    random.seed(0)
+    # several peers completing nearby pieces in random order
+    pieces_order = []
+    for window_start in range(0, PIECES_COUNT, BATCH_SIZE):
+        window = list(range(window_start, window_start + BATCH_SIZE))
+        random.shuffle(window)
+        pieces_order += window
+    print("pieces completed out of order within windows of", BATCH_SIZE, "pieces")
+    report("pwrite", write_pieces, pieces_order, piece_data)
+    report("combined", write_combined_pieces, pieces_order, piece_data)
+    # pieces completed in random order over the whole file (worst case)
+    random.shuffle(pieces_order)
+    print("pieces completed in random order")
+    report("pwrite", write_pieces, pieces_order, piece_data)
+    report("combined", write_combined_pieces, pieces_order, piece_data)
@@ -0,0 +1,169 @@
+import random
+import time
+
+"""
+    Choker decides which of the interested peers are unchoked, i.e. the peers
+    to which client uploads the blocks (upload slots). The swarm calls rechoke
+    periodically with all the peers and the peers ask the choker whether they
+    are allowed to upload before unchoking the peer, thus the choking
+    algorithms are pluggable and can be driven by a simulation with any
+    objects having the peer interface used below
+
+        peer.state.peer_interested          peer is interested in client
+        peer.peer_sock.peer_connection_active()
+        peer.download_rate()                rate of recieving from peer
+        peer.upload_rate()                  rate of sending to peer
+        peer.is_snubbed(current_time)       peer stopped sending blocks
+"""
+
+# seconds after which the unchoked peers are decided again
+RECHOKE_INTERVAL = 10
+
+# seconds after which the optimistic unchoke is given to another peer
+OPTIMISTIC_UNCHOKE_INTERVAL = 30
+
+# seconds without any block from peer after which the peer is snubbed
+SNUBBED_TIMEOUT = 60
+
+# number of peers unchoked at any time (including optimistic unchoke)
+UPLOAD_SLOTS = 4
+
+# choking algorithms that client can use
+TIT_FOR_TAT = "tit-for-tat"
+UNCHOKE_ALL = "unchoke-all"
+
+
+"""
+    base choker unchokes every interested peer, which was the earlier
+    behaviour of the client, the choking algorithms override the decisions
+    of unchoking the peer (upload allowed) and of the rechoke
+"""
+
+
+class choker:
+
+    def __init__(self, upload_slots=UPLOAD_SLOTS):
+        self.upload_slots = upload_slots
+        # peers that client is uploading to
+        self.unchoked_peers = set()
+
+    # returns true if the peer can be unchoked
+    def upload_allowed(self, peer):
+        self.unchoked_peers.add(peer)
+        return True
+
+    # upload slot of the disconnected peer is free for other peers
+    def remove_peer(self, peer):
+        self.unchoked_peers.discard(peer)
+
+    # returns the interested peers which are still connected
+    def interested_peers(self, peers):
+        return [
+            peer
+            for peer in peers
+            if peer.state.peer_interested and peer.peer_sock.peer_connection_active()
+        ]
+
+    """
+        function decides the unchoked peers among the given peers, seeding
+        tells whether client is seeding (has complete file) or downloading
+    """
+
+    def rechoke(self, peers, seeding, current_time=None):
+        self.unchoked_peers = set(self.interested_peers(peers))
+        return self.unchoked_peers
+
+
+"""
+    tit for tat choker unchokes the peers from which the client downloads at
+    the highest rates (peers reciprocating the uploads), while seeding the
+    peers to which the client uploads at the highest rates are unchoked. One
+    slot is the optimistic unchoke which rotates among the other interested
+    peers, so the new peers get the pieces to reciprocate with and better
+    peers than the current ones are discovered. Snubbed peers (not sending
+    any block for long time) lose their slot while client is downloading
+"""
+
+
+class tit_for_tat_choker(choker):
+
+    def __init__(self, upload_slots=UPLOAD_SLOTS):
+        super().__init__(upload_slots)
+        # peer given the optimistic unchoke and time it was given
+        self.optimistic_peer = None
+        self.optimistic_unchoke_time = None
+
+    # returns true if the peer can be unchoked, peers that become interested
+    # between rechokes are unchoked immediately if any upload slot is free
+    def upload_allowed(self, peer):
+        if peer in self.unchoked_peers:
+            return True
+        if len(self.unchoked_peers) < self.upload_slots:
+            self.unchoked_peers.add(peer)
+            return True
+        return False
+
+    def remove_peer(self, peer):
+        super().remove_peer(peer)
+        if peer is self.optimistic_peer:
+            self.optimistic_peer = None
+
+    # rate by which the peers are ranked for the regular upload slots
+    def peer_rate(self, peer, seeding):
+        if seeding:
+            return peer.upload_rate()
+        return peer.download_rate()
+
+    def rechoke(self, peers, seeding, current_time=None):
+        if current_time is None:
+            current_time = time.monotonic()
+        interested_peers = self.interested_peers(peers)
+
+        # regular slots go to the fastest peers which are not snubbing client
+        candidate_peers = interested_peers
+        if not seeding:
+            candidate_peers = [
+                peer for peer in interested_peers if not peer.is_snubbed(current_time)
+            ]
+        candidate_peers.sort(
+            key=lambda peer: self.peer_rate(peer, seeding), reverse=True
+        )
+        unchoked_peers = set(candidate_peers[: self.upload_slots - 1])
+
+        # optimistic unchoke rotates among the peers that are not unchoked
+        if (
+            self.optimistic_peer not in interested_peers
+            or self.optimistic_peer in unchoked_peers
+            or current_time - self.optimistic_unchoke_time
+            >= OPTIMISTIC_UNCHOKE_INTERVAL
+        ):
+            choked_peers = [
+                peer for peer in interested_peers if peer not in unchoked_peers
+            ]
+            self.optimistic_peer = None
+            if choked_peers:
+                self.optimistic_peer = random.choice(choked_peers)
+                self.optimistic_unchoke_time = current_time
+        if self.optimistic_peer is not None:
+            unchoked_peers.add(self.optimistic_peer)
+
+        self.unchoked_peers = unchoked_peers
+        return self.unchoked_peers
+
+
+# choker classes of the choking algorithms
+CHOKING_ALGORITHMS = {
+    TIT_FOR_TAT: tit_for_tat_choker,
+    UNCHOKE_ALL: choker,
+}
+
+
+"""
+    function creates the choker of choking algorithm given by client request
+"""
+
+
+def create_choker(torrent):
+    choking_algorithm = torrent.client_request.get("choking algorithm", TIT_FOR_TAT)
+    upload_slots = torrent.client_request.get("upload slots", UPLOAD_SLOTS)
+    return CHOKING_ALGORITHMS[choking_algorithm](upload_slots)
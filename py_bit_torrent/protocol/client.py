@@ -3,11 +3,18 @@ import json
 import os
 import sys
 import time
-import threading
 from logging import DEBUG
 
+from py_bit_torrent.protocol.choker import TIT_FOR_TAT, UPLOAD_SLOTS
+from py_bit_torrent.protocol.fast_resume import RESUME_FILE_EXTENSION, fast_resume
 from py_bit_torrent.protocol.kademlia import Server
-from py_bit_torrent.protocol.shared_file_handler import torrent_shared_file_handler
+from py_bit_torrent.protocol.shared_file_handler import (
+    ALLOCATION_MODES,
+    ALLOCATION_SPARSE,
+    STORAGE_BACKENDS,
+    STORAGE_FILE,
+    create_shared_file_handler,
+)
 
 # tracker module for making tracker request and recieving peer data
 from py_bit_torrent.protocol.swarm import swarm
@@ -30,6 +37,10 @@ DOWNLOAD_DIR_PATH = "download_directory_path"
 SEEDING_DIR_PATH = "seeding_directory_path"
 MAX_PEERS = "max_peers"
 RATE_LIMIT = "rate_limit"
+PEER_RATE_LIMIT = "peer_rate_limit"
+ALLOCATION_MODE = "allocation_mode"
+STORAGE_BACKEND = "storage_backend"
+PIECE_CACHE_SIZE = "cache_size"
 
 """
     Torrent client would help interacting with the tracker server and
@@ -66,7 +77,15 @@ class bittorrent_client:
             "downloading": None,
             "uploading rate": sys.maxsize,
             "downloading rate": sys.maxsize,
+            "peer uploading rate": sys.maxsize,
+            "peer downloading rate": sys.maxsize,
             "max peers": 4,
+            "max outstanding requests": 64,
+            "allocation mode": ALLOCATION_SPARSE,
+            "storage backend": STORAGE_FILE,
+            "piece cache size": 0,
+            "choking algorithm": TIT_FOR_TAT,
+            "upload slots": UPLOAD_SLOTS,
         }
 
         # user wants to download the torrent file
@@ -76,16 +95,38 @@ class bittorrent_client:
                 self.client_request["downloading rate"] = int(
                     user_arguments[RATE_LIMIT]
                 )
+            if user_arguments.get(PEER_RATE_LIMIT):
+                self.client_request["peer downloading rate"] = int(
+                    user_arguments[PEER_RATE_LIMIT]
+                )
         # user wants to seed the torrent file
         elif user_arguments[SEEDING_DIR_PATH]:
             self.client_request["seeding"] = user_arguments[SEEDING_DIR_PATH]
             if user_arguments[RATE_LIMIT]:
                 self.client_request["uploading rate"] = int(user_arguments[RATE_LIMIT])
+            if user_arguments.get(PEER_RATE_LIMIT):
+                self.client_request["peer uploading rate"] = int(
+                    user_arguments[PEER_RATE_LIMIT]
+                )
 
         # max peer connections
         if user_arguments[MAX_PEERS]:
             self.client_request["max peers"] = int(user_arguments[MAX_PEERS])
 
+        # allocation of the downloading file on disk
+        if user_arguments.get(ALLOCATION_MODE):
+            self.client_request["allocation mode"] = user_arguments[ALLOCATION_MODE]
+
+        # storage backend for reading/writing the file
+        if user_arguments.get(STORAGE_BACKEND):
+            self.client_request["storage backend"] = user_arguments[STORAGE_BACKEND]
+
+        # memory budget (in MB) of the piece cache for seeding
+        if user_arguments.get(PIECE_CACHE_SIZE):
+            self.client_request["piece cache size"] = int(
+                user_arguments[PIECE_CACHE_SIZE]
+            )
+
         # make torrent class instance from torrent data extracted from torrent file
         self.torrent = torrent(self.torrent_info.get_data(), self.client_request)
 
@@ -200,30 +241,31 @@ class bittorrent_client:
         downloaded completely, basically the client becomes the seeder
     """
 
-    def seed(self):
+    async def seed(self):
         self.bittorrent_logger.log("Client started seeding ... ")
 
         # download file initialization
         upload_file_path = self.client_request["seeding"]
 
         # create file handler for downloading data from peers
-        file_handler = torrent_shared_file_handler(upload_file_path, self.torrent)
+        file_handler = create_shared_file_handler(upload_file_path, self.torrent)
 
         # add the file handler
         self.swarm.add_shared_file_handler(file_handler)
 
         # start seeding the file
-        self.swarm.seed_file()
+        await self.swarm.seed_file()
 
     """
         function helps in downloading the torrent file form swarm 
         in which peers are sharing file data
     """
 
-    def download(self):
-        # download file initialization
-        download_file_path = (
-            self.client_request["downloading"] + self.torrent.torrent_metadata.file_name
+    async def download(self):
+        # download file initialization, in case of multifile torrent the
+        # name is of the directory in which all the files are downloaded
+        download_file_path = os.path.join(
+            self.client_request["downloading"], self.torrent.torrent_metadata.file_name
         )
 
         self.bittorrent_logger.log(
@@ -231,7 +273,15 @@ class bittorrent_client:
         )
 
         # create file handler for downloading data from peers
-        file_handler = torrent_shared_file_handler(download_file_path, self.torrent)
+        file_handler = create_shared_file_handler(download_file_path, self.torrent)
+
+        # read the state of earlier download before files are initialized
+        resume_file = fast_resume(
+            download_file_path + RESUME_FILE_EXTENSION,
+            self.torrent,
+            file_handler.get_file_paths(),
+        )
+        resume_file.load()
 
         # initialize file handler for downloading
         file_handler.initialize_for_download()
@@ -239,35 +289,36 @@ class bittorrent_client:
         # distribute file handler among all peers for reading/writing
         self.swarm.add_shared_file_handler(file_handler)
 
+        # skip the pieces already downloaded (or checked) in the files
+        await self.swarm.resume_download(resume_file)
+
         self.bittorrent_logger.log(
             "Client started downloading (check torrent statistics) ... "
         )
 
         # lastly download the whole file
-        self.swarm.download_file()
+        await self.swarm.download_file()
 
     """
-        the event loop that either downloads / uploads a file
+        the event loop that either downloads / uploads a file, peers and
+        the DHT node share the single asyncio event loop of the client
     """
 
-    def event_loop(self):
+    async def event_loop(self):
         if self.client_request["downloading"] is not None:
-            # Start new thread for monitoring new seeder nodes periodically
-            monitor_thread = threading.Thread(
-                target=self.monitor_dht_seeders, daemon=True
-            )
-            monitor_thread.start()
-            self.download()
+            # Start new task for monitoring new seeder nodes periodically
+            monitor_task = asyncio.create_task(self.monitor_dht_seeders())
+            await self.download()
+            monitor_task.cancel()
         if self.client_request["seeding"] is not None:
-            self.seed()
+            await self.seed()
 
     # Add a new method to monitor for new seeders via DHT
-    def monitor_dht_seeders(self):
+    async def monitor_dht_seeders(self):
         while not self.swarm.download_complete():
             try:
-                # Call the asynchronous get_dht_peers from a synchronous context
-                new_peers = asyncio.run(
-                    self.get_dht_peers(self.torrent.torrent_metadata.info_hash)
+                new_peers = await self.get_dht_peers(
+                    self.torrent.torrent_metadata.info_hash
                 )
                 for peer_info in new_peers:
                     # Check if the peer is already in the swarm by matching ip and port
@@ -276,16 +327,11 @@ class bittorrent_client:
                         for p in self.swarm.peers_list
                     )
                     if not exists:
-                        from py_bit_torrent.protocol.peer import Peer  # local import
-
-                        new_peer = Peer(
-                            peer_info["ip"], int(peer_info["port"]), self.torrent
-                        )
-                        self.swarm.peers_list.append(new_peer)
+                        self.swarm.add_peer(peer_info["ip"], int(peer_info["port"]))
                         self.bittorrent_logger.log(
                             f"Added new seeder {peer_info['ip']}:{peer_info['port']}"
                         )
-                time.sleep(10)  # poll every 10 seconds
+                await asyncio.sleep(10)  # poll every 10 seconds
             except Exception as e:
                 self.bittorrent_logger.log("Error monitoring DHT seeders: " + str(e))
-                time.sleep(10)
+                await asyncio.sleep(10)
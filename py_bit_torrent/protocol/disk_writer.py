@@ -0,0 +1,137 @@
+import asyncio
+
+"""
+    Disk writer is the write back stage between the verified pieces and the
+    file, the verified pieces are kept in the buffer of dirty pieces and are
+    written by the flushing coroutine in the order of their position in the
+    file, the adjacent dirty pieces are written together with one vectored
+    write (pwritev) so the pieces downloaded from peers in any order are
+    written with fewer system calls and seeks.
+
+    The memory of the dirty pieces is limited, once the buffer is full the
+    pieces (and peers downloading new blocks) wait untill the flushing
+    coroutine has written the pieces, i.e. the network is slowed down to
+    the speed of the disk instead of buffering the pieces in memory.
+
+    Every piece is given with a callback which is called once the piece is
+    written (or its write failed), so the piece is reported as downloaded
+    only after its data is actually in the file
+"""
+
+# maximum size in bytes of the dirty pieces waiting to be written
+MAX_DIRTY_SIZE = 64 * 2**20
+
+
+class disk_writer:
+
+    def __init__(self, file_handler, max_dirty_size=MAX_DIRTY_SIZE):
+        self.file_handler = file_handler
+        self.max_dirty_size = max_dirty_size
+
+        # verified pieces waiting to be written : piece index -> data
+        self.dirty_pieces = {}
+        # callbacks of the dirty pieces : piece index -> callback
+        self.written_callbacks = {}
+        # size of the dirty pieces including the pieces being written
+        self.dirty_size = 0
+
+        # condition on which writers wait for space in the buffer
+        self.space_condition = asyncio.Condition()
+        # coroutine writing the dirty pieces into file
+        self.flush_task = None
+
+        # count of the vectored writes done and pieces written
+        self.writes_count = 0
+        self.pieces_written = 0
+        # count of the vectored writes failed
+        self.write_errors = 0
+
+    # returns true if more pieces can be added in the buffer
+    def has_space(self):
+        return self.dirty_size < self.max_dirty_size
+
+    # waits untill more pieces can be added in the buffer
+    async def wait_for_space(self):
+        if self.has_space():
+            return
+        async with self.space_condition:
+            await self.space_condition.wait_for(self.has_space)
+
+    """
+        function adds the verified piece in the buffer of dirty pieces, the
+        function waits only if the buffer is full, the piece is written into
+        the file later by the flushing coroutine which then awaits
+        written_callback(piece_index, is_piece_written) if callback is given
+    """
+
+    async def write_piece(self, piece_index, piece_data, written_callback=None):
+        await self.wait_for_space()
+        self.dirty_pieces[piece_index] = piece_data
+        self.dirty_size += len(piece_data)
+        if written_callback is not None:
+            self.written_callbacks[piece_index] = written_callback
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.flush_dirty_pieces())
+
+    """
+        function writes the dirty pieces untill the buffer is empty, pieces
+        added while writing are written with the next batch of pieces
+    """
+
+    async def flush_dirty_pieces(self):
+        while self.dirty_pieces:
+            dirty_pieces, self.dirty_pieces = self.dirty_pieces, {}
+            written_callbacks, self.written_callbacks = self.written_callbacks, {}
+            failed_pieces = set(dirty_pieces)
+            try:
+                failed_pieces = await asyncio.to_thread(
+                    self.write_dirty_pieces, dirty_pieces
+                )
+            finally:
+                self.dirty_size -= sum(map(len, dirty_pieces.values()))
+                async with self.space_condition:
+                    self.space_condition.notify_all()
+                # pieces are reported even if the flushing is cancelled
+                for piece_index, written_callback in written_callbacks.items():
+                    await written_callback(piece_index, piece_index not in failed_pieces)
+
+    """
+        function writes the runs of adjacent pieces in order of their position
+        in file, the failed write of any run (eg. disk is full) never stops
+        the other runs from being written
+        function returns the set of pieces that couldn't be written
+    """
+
+    def write_dirty_pieces(self, dirty_pieces):
+        failed_pieces = set()
+        pieces_run = []
+        for piece_index in sorted(dirty_pieces):
+            if pieces_run and pieces_run[0] + len(pieces_run) != piece_index:
+                if not self.write_pieces_run(pieces_run, dirty_pieces):
+                    failed_pieces.update(pieces_run)
+                pieces_run = []
+            pieces_run.append(piece_index)
+        if pieces_run and not self.write_pieces_run(pieces_run, dirty_pieces):
+            failed_pieces.update(pieces_run)
+        return failed_pieces
+
+    # writes the run of pieces, returns true if the pieces are written
+    def write_pieces_run(self, pieces_run, dirty_pieces):
+        pieces_data = [dirty_pieces[piece_index] for piece_index in pieces_run]
+        try:
+            self.file_handler.write_pieces(pieces_run[0], pieces_data)
+        except (OSError, ValueError):
+            self.write_errors += 1
+            return False
+        self.writes_count += 1
+        self.pieces_written += len(pieces_run)
+        return True
+
+    # waits untill all the dirty pieces are written into the file, note that
+    # the flushing coroutine is never cancelled if the waiting is cancelled
+    async def flush(self):
+        while self.flush_task is not None:
+            flush_task = self.flush_task
+            await asyncio.shield(flush_task)
+            if flush_task is self.flush_task:
+                return
@@ -0,0 +1,259 @@
+from collections import deque
+
+from py_bit_torrent.protocol.partial_piece import partial_piece
+
+"""
+    Download scheduler assigns pieces to the peers continuously, every peer
+    pulls its next piece as soon as it finishes the earlier one, so a slow
+    peer never holds back the fast peers of the swarm.
+
+    Every peer has a short queue of pieces assigned to it which is refilled
+    from the rarest pieces it has. Once there are no unassigned pieces left
+    for a peer, it steals queued (not yet started) pieces from other peers,
+    the peer with the longest queue is robbed first.
+
+    Pieces taken from the queues are downloaded as partial pieces and their
+    blocks are shared by all the peers, i.e. a peer fills its request window
+    with missing blocks of any partial piece it has (oldest pieces first)
+    before starting a new piece, so a piece is downloaded from several peers
+    at once instead of being bound to a single peer.
+
+    Once every remaining block is requested (endgame mode) the blocks are
+    also requested from other peers having the piece, so the end of download
+    does not wait on the slowest peer, the duplicate requests are cancelled
+    when the block is recieved from any one of the peers.
+"""
+
+# number of pieces queued for every peer
+PEER_QUEUE_LENGTH = 2
+
+# maximum number of peers a block is requested from in endgame mode
+ENDGAME_MAX_REQUESTS = 3
+
+
+class download_scheduler:
+
+    def __init__(self, piece_picker, torrent, queue_length=PEER_QUEUE_LENGTH):
+        # availability index used for selecting rarest pieces
+        self.piece_picker = piece_picker
+        self.torrent = torrent
+        self.queue_length = queue_length
+
+        # pieces queued for every peer
+        self.peer_queues = {}
+
+        # piece -> peer for pieces that are queued
+        self.assigned_pieces = {}
+
+        # piece -> partial piece for pieces that are being downloaded
+        self.partial_pieces = {}
+
+    """
+        adds the peer to the scheduler with an empty queue
+    """
+
+    def add_peer(self, peer):
+        self.peer_queues.setdefault(peer, deque())
+
+    """
+        removes the peer from scheduler, pieces queued for the peer and the
+        blocks requested from the peer are made available to other peers
+    """
+
+    def remove_peer(self, peer):
+        for piece_index in self.peer_queues.pop(peer, ()):
+            del self.assigned_pieces[piece_index]
+        for downloading_piece in self.partial_pieces.values():
+            downloading_piece.release_peer(peer)
+
+    """
+        returns true if the piece can be assigned to the given peer
+    """
+
+    def assignable(self, peer, piece_index):
+        if piece_index in self.assigned_pieces:
+            return False
+        if piece_index in self.partial_pieces:
+            return False
+        return piece_index in peer.bitfield_pieces
+
+    """
+        refills the queue of peer with the rarest unassigned pieces peer has
+    """
+
+    def fill_queue(self, peer):
+        peer_queue = self.peer_queues[peer]
+        required_pieces = self.queue_length - len(peer_queue)
+        if required_pieces <= 0:
+            return
+        pieces = self.piece_picker.rarest_pieces(
+            required_pieces,
+            piece_filter=lambda piece_index: self.assignable(peer, piece_index),
+        )
+        for piece_index in pieces:
+            self.assigned_pieces[piece_index] = peer
+            peer_queue.append(piece_index)
+
+    """
+        steals a queued piece that given peer has from the other peers
+        function returns the stolen piece index else returns None
+    """
+
+    def steal_piece(self, peer):
+        victims = sorted(
+            self.peer_queues.items(), key=lambda item: len(item[1]), reverse=True
+        )
+        for victim, victim_queue in victims:
+            if victim is peer:
+                continue
+            # pieces at the end of queue would be downloaded last by victim
+            for piece_index in reversed(victim_queue):
+                if piece_index in peer.bitfield_pieces:
+                    victim_queue.remove(piece_index)
+                    return piece_index
+        return None
+
+    """
+        function starts downloading the next piece of the peer, the piece is
+        taken from queue of the peer or stolen from queue of other peers
+        function returns the partial piece else returns None if there is no
+        piece to download for the peer
+    """
+
+    def next_piece(self, peer):
+        self.add_peer(peer)
+        self.fill_queue(peer)
+        peer_queue = self.peer_queues[peer]
+        if peer_queue:
+            piece_index = peer_queue.popleft()
+        else:
+            piece_index = self.steal_piece(peer)
+            if piece_index is None:
+                return None
+        self.assigned_pieces.pop(piece_index, None)
+        downloading_piece = partial_piece(
+            piece_index,
+            self.torrent.get_piece_length(piece_index),
+            self.torrent.block_length,
+        )
+        self.partial_pieces[piece_index] = downloading_piece
+        return downloading_piece
+
+    """
+        function restores the partial piece of earlier download, the given
+        blocks were written in file and are read back in the piece data
+    """
+
+    def restore_partial_piece(self, piece_index, block_offsets, piece_data):
+        downloading_piece = partial_piece(
+            piece_index,
+            self.torrent.get_piece_length(piece_index),
+            self.torrent.block_length,
+        )
+        for block_offset in block_offsets:
+            block_end = block_offset + self.torrent.block_length
+            downloading_piece.block_recieved(
+                block_offset, piece_data[block_offset:block_end]
+            )
+        self.partial_pieces[piece_index] = downloading_piece
+        return downloading_piece
+
+    """
+        function returns the next block (piece index, offset, length) to be
+        requested from the peer, missing blocks of partial pieces are given
+        before starting a new piece, function returns None if there is no
+        block to request from the peer
+    """
+
+    def next_block(self, peer):
+        for piece_index, downloading_piece in self.partial_pieces.items():
+            if not downloading_piece.missing_blocks:
+                continue
+            if piece_index not in peer.bitfield_pieces:
+                continue
+            return (piece_index, *downloading_piece.request_block(peer))
+        downloading_piece = self.next_piece(peer)
+        if downloading_piece is not None:
+            piece_index = downloading_piece.piece_index
+            return (piece_index, *downloading_piece.request_block(peer))
+        if self.in_endgame():
+            return self.next_duplicate_block(peer)
+        return None
+
+    """
+        function returns true if all the remaining blocks are requested, i.e.
+        all the available pieces are being downloaded and there are no more
+        blocks in these pieces which are not requested from any peer
+    """
+
+    def in_endgame(self):
+        if self.piece_picker.available_pieces > len(self.partial_pieces):
+            return False
+        for downloading_piece in self.partial_pieces.values():
+            if downloading_piece.missing_blocks:
+                return False
+        return True
+
+    """
+        function returns the block (piece index, offset, length) which is
+        already requested from other peers to be requested from given peer
+        as well (endgame mode) else returns None
+    """
+
+    def next_duplicate_block(self, peer):
+        for piece_index, downloading_piece in self.partial_pieces.items():
+            if piece_index not in peer.bitfield_pieces:
+                continue
+            block = downloading_piece.request_duplicate_block(
+                peer, ENDGAME_MAX_REQUESTS
+            )
+            if block is not None:
+                return (piece_index, *block)
+        return None
+
+    """
+        the block requested from peer is no longer expected from the peer
+    """
+
+    def release_block(self, peer, piece_index, block_offset):
+        downloading_piece = self.partial_pieces.get(piece_index)
+        if downloading_piece is not None:
+            downloading_piece.release_block(peer, block_offset)
+
+    """
+        function returns the other peers the recieved block is requested from
+        whose requests must be cancelled, must be called before the block
+        recieved is placed in the piece
+    """
+
+    def duplicate_requests(self, peer, piece_index, block_offset):
+        downloading_piece = self.partial_pieces.get(piece_index)
+        if downloading_piece is None:
+            return []
+        requesting_peers = downloading_piece.requesting_peers(block_offset)
+        return [other for other in requesting_peers if other is not peer]
+
+    """
+        function places the block recieved from the peer in its partial piece
+        function returns the partial piece once all its blocks are recieved
+    """
+
+    def block_recieved(self, peer, piece_index, block_offset, block_data):
+        downloading_piece = self.partial_pieces.get(piece_index)
+        if downloading_piece is None:
+            return None
+        if not downloading_piece.block_recieved(block_offset, block_data):
+            return None
+        if not downloading_piece.is_complete():
+            return None
+        return downloading_piece
+
+    """
+        the downloading of piece is finished, unsuccessful pieces (eg. piece
+        failed validation) are made available for assignment again
+    """
+
+    def piece_finished(self, peer, piece_index, downloaded):
+        self.partial_pieces.pop(piece_index, None)
+        if downloaded:
+            self.piece_picker.mark_downloaded(piece_index)
@@ -0,0 +1,134 @@
+import os
+
+# bencodepy module for reading/writing the resume file
+import bencodepy
+
+from py_bit_torrent.protocol.partial_piece import BLOCK_RECIEVED
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+
+"""
+    Fast resume file keeps the state of download between the restarts of
+    client, it is bencoded dictionary stored next to the downloading file
+
+    * info hash         : info hash of the torrent being downloaded
+    * piece length      : number of bytes per piece
+    * pieces            : bitfield of the verified pieces in the file
+    * partial pieces    : list of [piece index, block map] of the pieces
+                          partially downloaded, block map has one byte per
+                          block which is 1 if the block is written in file
+    * files             : list of [size, mtime in ns] of every file
+
+    The resume file is trusted only if the files are exactly of same size
+    and modification time as when the resume file was saved, otherwise the
+    pieces of the existing files are checked again against their hashes
+"""
+
+# extension of the resume file added to the download path
+RESUME_FILE_EXTENSION = ".resume"
+
+
+class fast_resume:
+
+    def __init__(self, resume_file_path, torrent, file_paths):
+        self.resume_file_path = resume_file_path
+        self.torrent = torrent
+        # all the files of the torrent in order of torrent data
+        self.file_paths = file_paths
+        # trusted resume data of the earlier download
+        self.resume_data = None
+        # true if any file of the torrent already has data
+        self.existing_data = False
+
+    # size and modification time (in ns) of every file of the torrent
+    def file_stats(self):
+        stats = []
+        for file_path in self.file_paths:
+            try:
+                file_stat = os.stat(file_path)
+            except FileNotFoundError:
+                stats.append([-1, -1])
+                continue
+            stats.append([file_stat.st_size, file_stat.st_mtime_ns])
+        return stats
+
+    """
+        function reads the resume file, note that function must be called
+        before the files are initialized for download (which changes the
+        files), function returns true if the resume data can be trusted
+    """
+
+    def load(self):
+        file_stats = self.file_stats()
+        self.existing_data = any(file_size > 0 for file_size, mtime in file_stats)
+        self.resume_data = None
+        try:
+            with open(self.resume_file_path, "rb") as resume_file:
+                resume_data = bencodepy.decode(resume_file.read())
+        except (OSError, bencodepy.DecodingError):
+            return False
+        if not isinstance(resume_data, dict):
+            return False
+        if resume_data.get(b"info hash") != self.torrent.torrent_metadata.info_hash:
+            return False
+        if resume_data.get(b"piece length") != self.torrent.piece_length:
+            return False
+        if resume_data.get(b"files") != file_stats:
+            return False
+        if not isinstance(resume_data.get(b"pieces"), bytes):
+            return False
+        self.resume_data = resume_data
+        return True
+
+    # indexes of the verified pieces in the trusted resume data
+    def downloaded_pieces(self):
+        return list(
+            piece_bitfield.from_payload(
+                self.resume_data[b"pieces"], self.torrent.pieces_count
+            )
+        )
+
+    # (piece index, block offsets) of partial pieces in trusted resume data
+    def partial_pieces(self):
+        partial_pieces = []
+        for piece_index, block_map in self.resume_data.get(b"partial pieces", []):
+            if not 0 <= piece_index < self.torrent.pieces_count:
+                continue
+            if not isinstance(block_map, bytes):
+                continue
+            block_offsets = [
+                block_index * self.torrent.block_length
+                for block_index, block_written in enumerate(block_map)
+                if block_written
+            ]
+            partial_pieces.append((piece_index, block_offsets))
+        return partial_pieces
+
+    """
+        function writes the resume file given the bitfield of the verified
+        pieces and the partial pieces whose recieved blocks are written in
+        the files, file is replaced atomically so it is never half written
+    """
+
+    def save(self, downloaded_pieces, partial_pieces):
+        resume_data = {
+            b"info hash": self.torrent.torrent_metadata.info_hash,
+            b"piece length": self.torrent.piece_length,
+            b"pieces": downloaded_pieces.to_payload(),
+            b"partial pieces": [
+                [
+                    downloading_piece.piece_index,
+                    bytes(
+                        block_state == BLOCK_RECIEVED
+                        for block_state in downloading_piece.block_states
+                    ),
+                ]
+                for downloading_piece in partial_pieces
+            ],
+            b"files": self.file_stats(),
+        }
+        temporary_file_path = self.resume_file_path + ".tmp"
+        with open(temporary_file_path, "wb") as resume_file:
+            resume_file.write(bencodepy.encode(resume_data))
+            resume_file.flush()
+            os.fsync(resume_file.fileno())
+        os.replace(temporary_file_path, self.resume_file_path)
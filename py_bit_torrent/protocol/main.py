@@ -52,7 +52,7 @@ async def main(user_arguments=None):
     # initialize the swarm of peers
     client.initialize_swarm()
     # download the file from the swarm
-    client.event_loop()
+    await client.event_loop()
 
 
 if __name__ == "__main__":
@@ -77,7 +77,30 @@ if __name__ == "__main__":
         help="maximum peers participating in upload/download of file",
     )
     parser.add_argument(
-        "-l", "--" + RATE_LIMIT, help="upload / download limits in Kbps"
+        "-l", "--" + RATE_LIMIT, help="upload / download limits in KB/s"
+    )
+    parser.add_argument(
+        "-r",
+        "--" + PEER_RATE_LIMIT,
+        help="upload / download limits of every peer connection in KB/s",
+    )
+    parser.add_argument(
+        "-a",
+        "--" + ALLOCATION_MODE,
+        choices=ALLOCATION_MODES,
+        help="allocation of downloading file on disk (default : sparse)",
+    )
+    parser.add_argument(
+        "-b",
+        "--" + STORAGE_BACKEND,
+        choices=STORAGE_BACKENDS,
+        help="reading/writing file using file I/O or memory mapping (default : file)",
+    )
+    parser.add_argument(
+        "-c",
+        "--" + PIECE_CACHE_SIZE,
+        type=int,
+        help="memory in MB for caching the pieces while seeding (default : 0, no cache)",
     )
 
     # get the user input option after parsing the command line argument
@@ -95,9 +118,19 @@ if __name__ == "__main__":
 
     if options[RATE_LIMIT] and int(options[RATE_LIMIT]) <= 0:
         print(
-            "Bittorrent client upload / download rate must always greater than 0 Kbps"
+            "Bittorrent client upload / download rate must always greater than 0 KB/s"
         )
         sys.exit()
 
+    if options[PEER_RATE_LIMIT] and int(options[PEER_RATE_LIMIT]) <= 0:
+        print(
+            "Bittorrent client peer upload / download rate must be greater than 0 KB/s"
+        )
+        sys.exit()
+
+    if options[PIECE_CACHE_SIZE] and options[PIECE_CACHE_SIZE] < 0:
+        print("Bittorrent client piece cache size can't be negative")
+        sys.exit()
+
     # call the main function
     asyncio.run(main(options))
@@ -0,0 +1,214 @@
+import hashlib
+import time
+from collections import deque
+
+"""
+    Partial piece is the piece that is being downloaded, the blocks of the
+    piece can be requested from several peers at once and all of them are
+    assembled in the one shared buffer of the piece. Every block is either
+    missing (not requested from any peer), requested or recieved. The piece
+    is verified once all of its blocks are recieved.
+
+    In endgame mode the requested blocks are requested from more peers, so
+    every block keeps the list of peers it is requested from, the requests
+    with other peers are cancelled once the block is recieved from any peer.
+
+    The SHA1 hash of piece is computed while the blocks are recieved, every
+    block is hashed as soon as all the blocks before it are recieved. The
+    blocks recieved out of order wait in the buffer untill the gap before
+    them is filled, so hash of the complete piece is ready without hashing
+    the whole piece once it is complete.
+"""
+
+# states of the blocks of piece
+BLOCK_MISSING = 0
+BLOCK_REQUESTED = 1
+BLOCK_RECIEVED = 2
+
+
+class partial_piece:
+
+    def __init__(self, piece_index, piece_length, block_length):
+        self.piece_index = piece_index
+        self.piece_length = piece_length
+        self.block_length = block_length
+        self.blocks_count = (piece_length + block_length - 1) // block_length
+
+        # shared buffer in which blocks from all the peers are assembled
+        self.piece_data = bytearray(piece_length)
+
+        # state of every block and the peers it is requested from
+        self.block_states = bytearray(self.blocks_count)
+        self.block_peers = [[] for _ in range(self.blocks_count)]
+
+        # blocks that are yet to be requested from any peer
+        self.missing_blocks = deque(range(self.blocks_count))
+        self.recieved_blocks = 0
+
+        # hash of the contiguous recieved blocks from start of the piece
+        self.piece_hash = hashlib.sha1()
+        self.hashed_blocks = 0
+
+        # time when downloading of piece started
+        self.start_time = time.time()
+
+    """
+        function returns the (offset, length) of the given block index
+    """
+
+    def block_range(self, block_index):
+        block_offset = block_index * self.block_length
+        return block_offset, min(self.block_length, self.piece_length - block_offset)
+
+    """
+        function marks the next missing block as requested from given peer
+        function returns (block offset, block length) else returns None
+        if all the blocks of piece are already requested or recieved
+    """
+
+    def request_block(self, peer):
+        if not self.missing_blocks:
+            return None
+        block_index = self.missing_blocks.popleft()
+        self.block_states[block_index] = BLOCK_REQUESTED
+        self.block_peers[block_index].append(peer)
+        return self.block_range(block_index)
+
+    """
+        function marks the block already requested from other peers as also
+        requested from given peer (endgame mode), the block requested from
+        fewest peers is selected, atmost max requests peers per block
+        function returns (block offset, block length) else returns None
+    """
+
+    def request_duplicate_block(self, peer, max_requests):
+        selected_block = None
+        fewest_requests = max_requests
+        for block_index in range(self.blocks_count):
+            if self.block_states[block_index] != BLOCK_REQUESTED:
+                continue
+            requesting_peers = self.block_peers[block_index]
+            if peer in requesting_peers or len(requesting_peers) >= fewest_requests:
+                continue
+            selected_block = block_index
+            fewest_requests = len(requesting_peers)
+        if selected_block is None:
+            return None
+        self.block_peers[selected_block].append(peer)
+        return self.block_range(selected_block)
+
+    """
+        function marks the block requested from peer as missing again
+        eg. peer choked the client or disconnected before responding
+    """
+
+    def release_block(self, peer, block_offset):
+        block_index = block_offset // self.block_length
+        if not 0 <= block_index < self.blocks_count:
+            return
+        if self.block_states[block_index] != BLOCK_REQUESTED:
+            return
+        requesting_peers = self.block_peers[block_index]
+        if peer not in requesting_peers:
+            return
+        requesting_peers.remove(peer)
+        # block is still requested from other peers
+        if requesting_peers:
+            return
+        self.block_states[block_index] = BLOCK_MISSING
+        # released blocks are requested before the untouched blocks
+        self.missing_blocks.appendleft(block_index)
+
+    """
+        function releases all the blocks requested from the given peer
+    """
+
+    def release_peer(self, peer):
+        # released in reverse so that blocks are requested again in order
+        for block_index in reversed(range(self.blocks_count)):
+            if peer in self.block_peers[block_index]:
+                self.release_block(peer, block_index * self.block_length)
+
+    """
+        function returns the peers the given block is requested from
+    """
+
+    def requesting_peers(self, block_offset):
+        block_index = block_offset // self.block_length
+        if not 0 <= block_index < self.blocks_count:
+            return []
+        return list(self.block_peers[block_index])
+
+    """
+        function copies the recieved block into the shared buffer of piece
+        function returns true if the block is new and was expected
+    """
+
+    def block_recieved(self, block_offset, block_data):
+        block_index, remainder = divmod(block_offset, self.block_length)
+        if remainder or not 0 <= block_index < self.blocks_count:
+            return False
+        if self.block_states[block_index] == BLOCK_RECIEVED:
+            return False
+        if len(block_data) != self.block_range(block_index)[1]:
+            return False
+        # block may have been released and waiting to be requested again
+        if self.block_states[block_index] == BLOCK_MISSING:
+            self.missing_blocks.remove(block_index)
+        self.piece_data[block_offset : block_offset + len(block_data)] = block_data
+        self.block_states[block_index] = BLOCK_RECIEVED
+        self.block_peers[block_index] = []
+        self.recieved_blocks += 1
+        if block_index == self.hashed_blocks:
+            self.update_piece_hash()
+        return True
+
+    """
+        function hashes the recieved blocks following the hashed blocks
+    """
+
+    def update_piece_hash(self):
+        piece_view = memoryview(self.piece_data)
+        while (
+            self.hashed_blocks < self.blocks_count
+            and self.block_states[self.hashed_blocks] == BLOCK_RECIEVED
+        ):
+            block_offset, block_length = self.block_range(self.hashed_blocks)
+            self.piece_hash.update(
+                piece_view[block_offset : block_offset + block_length]
+            )
+            self.hashed_blocks += 1
+        piece_view.release()
+
+    """
+        function returns the SHA1 hash of the piece if it is complete
+    """
+
+    def piece_digest(self):
+        if self.hashed_blocks != self.blocks_count:
+            return None
+        return self.piece_hash.digest()
+
+    """
+        function returns the (offset, length) of all the recieved blocks
+    """
+
+    def recieved_block_ranges(self):
+        return [
+            self.block_range(block_index)
+            for block_index in range(self.blocks_count)
+            if self.block_states[block_index] == BLOCK_RECIEVED
+        ]
+
+    """
+        function returns true if all the blocks of piece are recieved
+    """
+
+    def is_complete(self):
+        return self.recieved_blocks == self.blocks_count
+
+    def __str__(self):
+        partial_piece_log = "PARTIAL PIECE : (index : " + str(self.piece_index)
+        partial_piece_log += ", blocks : " + str(self.recieved_blocks)
+        partial_piece_log += "/" + str(self.blocks_count) + ")"
+        return partial_piece_log
@@ -1,9 +1,9 @@
-import hashlib
-import struct
+import asyncio
 import time
-from copy import deepcopy
+from collections import deque
 from logging import DEBUG
 
+from py_bit_torrent.protocol.choker import SNUBBED_TIMEOUT
 from py_bit_torrent.protocol.peer_socket import peer_socket
 from py_bit_torrent.protocol.peer_state import (
     DSTATE0,
@@ -24,8 +24,6 @@ from py_bit_torrent.protocol.peer_wire_messages import (
     HAVE,
     INTERESTED,
     KEEP_ALIVE,
-    MESSAGE_ID_SIZE,
-    MESSAGE_LENGTH_SIZE,
     PEER_MESSAGE_DECODER,
     PIECE,
     PORT,
@@ -33,23 +31,32 @@ from py_bit_torrent.protocol.peer_wire_messages import (
     UNCHOKE,
     UNINTERESTED,
     bitfield,
+    cancel,
     choke,
     create_bitfield_message,
     handshake,
     have,
     interested,
     keep_alive,
-    peer_wire_message,
     piece,
     request,
     unchoke,
     uninterested,
 )
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+from py_bit_torrent.protocol.request_window import (
+    MAX_OUTSTANDING_REQUESTS,
+    request_window,
+)
 from py_bit_torrent.protocol.torrent_error import FAILURE, SUCCESS
+from py_bit_torrent.protocol.torrent_statistics import peer_statistics
 from py_bit_torrent.protocol.torrent_logger import PEER_LOG_FILE, torrent_logger
 
 # user defined libraries
 
+# maximum number of block requests from peer queued for uploading
+MAX_QUEUED_REQUESTS = 256
+
 """
     peer class instance maintains the information about the peer participating
     in the file sharing. The class provides function like handshake, request
@@ -58,12 +65,43 @@ from py_bit_torrent.protocol.torrent_logger import PEER_LOG_FILE, torrent_logger
 
 
 class Peer:
+    # attributes of peer are fixed, every connected peer has no __dict__
+    __slots__ = (
+        "IP",
+        "port",
+        "torrent",
+        "statistics",
+        "state",
+        "unique_id",
+        "peer_id",
+        "max_block_length",
+        "handshake_flag",
+        "request_window",
+        "bitfield_pieces",
+        "bitfield_initialized",
+        "peer_sock",
+        "file_handler",
+        "upload_queue",
+        "max_queued_requests",
+        "piece_picker",
+        "availability_counted",
+        "choker",
+        "last_block_time",
+        "peer_logger",
+        "response_handler",
+        "keep_alive_timeout",
+        "keep_alive_timer",
+    )
+
     # parameterized constructor does the peer class initialization
-    def __init__(self, peer_IP, peer_port, torrent, init_peer_socket=None):
-        # peer IP, port and torrent instance
+    def __init__(self, peer_IP, peer_port, torrent, init_peer_connection=None):
+        # peer IP, port and torrent instance, the torrent is shared by the
+        # swarm and all the peers (never modified by the peer)
         self.IP = peer_IP
         self.port = peer_port
-        self.torrent = deepcopy(torrent)
+        self.torrent = torrent
+        # rates of downloading from and uploading to this peer
+        self.statistics = peer_statistics()
 
         # initialize the peer_state
         self.state = peer_state()
@@ -80,15 +118,40 @@ class Peer:
         # handshake flag with peer
         self.handshake_flag = False
 
+        # pipelined block requests that are not yet responded by peer
+        max_outstanding_requests = torrent.client_request.get(
+            "max outstanding requests", MAX_OUTSTANDING_REQUESTS
+        )
+        self.request_window = request_window(
+            self.max_block_length, max_outstanding_requests
+        )
+
         # bitfield representing which data file pieces peer has
-        self.bitfield_pieces = set([])
+        self.bitfield_pieces = piece_bitfield(torrent.pieces_count)
+        # initial messages after handshake are exchanged with peer
+        self.bitfield_initialized = False
 
         # peer socket for communication
-        self.peer_sock = peer_socket(self.IP, self.port, init_peer_socket)
+        self.peer_sock = peer_socket(self.IP, self.port, init_peer_connection)
 
         # file handler used for reading/writing the file file
         self.file_handler = None
 
+        # blocks (piece index, offset, length) requested by peer that are not
+        # yet uploaded, cancelled requests are removed before uploading
+        self.upload_queue = deque()
+        self.max_queued_requests = MAX_QUEUED_REQUESTS
+
+        # availability index of swarm updated with pieces that peer has
+        self.piece_picker = None
+        # true while bitfield of the peer is counted in availability index
+        self.availability_counted = False
+
+        # choker of the swarm deciding if the peer is unchoked for uploading
+        self.choker = None
+        # time the last block was recieved from the peer (snubbing)
+        self.last_block_time = time.monotonic()
+
         # peer logger object with unique ID
         logger_name = "peer" + self.unique_id
         self.peer_logger = torrent_logger(logger_name, PEER_LOG_FILE, DEBUG)
@@ -116,39 +179,30 @@ class Peer:
         self.keep_alive_timer = None
 
     """
-        initializes the socket for seeding the torrent
+        initializes the socket for seeding the torrent, connection callback
+        coroutine is scheduled on the event loop for every incoming connection
     """
 
-    def initialize_seeding(self):
+    async def initialize_seeding(self, connection_callback):
         # first make the socket start seeding
-        self.peer_sock.start_seeding()
+        await self.peer_sock.start_seeding(connection_callback)
 
     """
         sets all the bitfield values
     """
 
     def set_bitfield(self):
-        for i in range(self.torrent.pieces_count):
-            self.bitfield_pieces.add(i)
-
-    """
-        function attempts to recieve any external TCP connection
-        returns the connection socket and address if connection 
-        if recieved else returns None
-    """
-
-    def recieve_connection(self):
-        return self.peer_sock.accept_connection()
+        self.bitfield_pieces = piece_bitfield.full(self.torrent.pieces_count)
 
     """
         attempts to connect the peer using TCP connection 
         returns success/failure for the peer connection
     """
 
-    def send_connection(self):
+    async def send_connection(self):
         connection_log = "SEND CONNECTION STATUS : " + self.unique_id + " "
         connection_status = None
-        if self.peer_sock.request_connection():
+        if await self.peer_sock.request_connection():
             # user for EXCECUTION LOGGING
             connection_log += SUCCESS
             connection_status = True
@@ -167,21 +221,43 @@ class Peer:
     def close_peer_connection(self):
         self.state.set_null()
         self.peer_sock.disconnect()
+        # upload slot of the peer can be given to other peers
+        if self.choker is not None:
+            self.choker.remove_peer(self)
+        # pieces of the peer are no longer available in the swarm
+        self.remove_availability()
 
     """
         function helps in recieving data from peers
     """
 
-    def recieve(self, data_size):
-        return self.peer_sock.recieve_data(data_size)
+    async def recieve(self, data_size):
+        raw_data = await self.peer_sock.recieve_data(data_size)
+        # peer closed the connection while recieving
+        if not self.peer_sock.peer_connection_active():
+            self.close_peer_connection()
+        return raw_data
 
     """
         function helps send raw data to the peer connection
-        function sends the complete message to peer
+        function sends the complete message to peer given in one or more parts
     """
 
-    def send(self, raw_data):
-        if not self.peer_sock.send_data(raw_data):
+    async def send(self, *data_parts):
+        if not await self.peer_sock.send_data(*data_parts):
+            send_log = self.unique_id + " peer connection closed ! " + FAILURE
+            self.peer_logger.log(send_log)
+            self.close_peer_connection()
+
+    """
+        function helps in sending the header followed by the data of file
+        from the given position directly from the file (sendfile)
+    """
+
+    async def send_file(self, header, file_object, file_position, data_size):
+        if not await self.peer_sock.send_file(
+            header, file_object, file_position, data_size
+        ):
             send_log = self.unique_id + " peer connection closed ! " + FAILURE
             self.peer_logger.log(send_log)
             self.close_peer_connection()
@@ -191,13 +267,13 @@ class Peer:
         class object as an argument to the function
     """
 
-    def send_message(self, peer_request):
+    async def send_message(self, peer_request):
         if self.handshake_flag:
             # used for EXCECUTION LOGGING
             peer_request_log = "sending message  -----> " + peer_request.__str__()
             self.peer_logger.log(peer_request_log)
             # send the message
-            self.send(peer_request.message())
+            await self.send(*peer_request.message_parts())
 
     """
         functions helpes in recieving peer wire protocol messages. Note that 
@@ -206,55 +282,37 @@ class Peer:
         only one message is recieved by the given function at any time.
     """
 
-    def recieve_message(self):
-        # extract the peer wire message information by receiving chunks of data
-        # recieve the message length
-        raw_message_length = self.recieve(MESSAGE_LENGTH_SIZE)
-        if raw_message_length is None or len(raw_message_length) < MESSAGE_LENGTH_SIZE:
-            return None
-
-        # unpack the message length which is 4 bytes long
-        message_length = struct.unpack_from("!I", raw_message_length)[0]
-        # keep alive messages have no message ID and payload
-        if message_length == 0:
-            return peer_wire_message(message_length, None, None)
-
-        # attempt to recieve the message ID from message
-        raw_message_ID = self.recieve(MESSAGE_ID_SIZE)
-        if raw_message_ID is None:
-            return None
-
-        # unpack the message length which is 4 bytes long
-        message_id = struct.unpack_from("!B", raw_message_ID)[0]
-        # messages having no payload
-        if message_length == 1:
-            return peer_wire_message(message_length, message_id, None)
-
-        # extract all the payload
-        payload_length = message_length - 1
-
-        # extract the message payload
-        message_payload = self.recieve(payload_length)
-        if message_payload is None:
+    async def recieve_message(self):
+        # extract the peer wire message information from the framed reader
+        # which parses the length, ID and payload out of the recieved data
+        frame = await self.peer_sock.recieve_frame()
+        # peer closed the connection while recieving
+        if not self.peer_sock.peer_connection_active():
+            self.close_peer_connection()
+        if frame is None:
             return None
 
-        # keep alive timer updated
-        self.keep_alive_timer = time.time()
-        # return peer wire message object given the three parameters
-        return peer_wire_message(message_length, message_id, message_payload)
+        message_length, message_id, message_payload = frame
+        # keep alive timer updated (keep alive message updates it when handled)
+        if message_length != 0:
+            self.keep_alive_timer = time.time()
+        # decode the message type directly from the frame
+        return PEER_MESSAGE_DECODER.decode_frame(
+            message_length, message_id, message_payload
+        )
 
     """
         functions helps in initiating handshake with peer connection
         functions returns success/failure result of handshake 
     """
 
-    def initiate_handshake(self):
+    async def initiate_handshake(self):
         # only do handshake if not earlier and established TCP connection
-        if not self.handshake_flag and self.send_connection():
+        if not self.handshake_flag and await self.send_connection():
             # send handshake message
-            handshake_request = self.send_handshake()
+            handshake_request = await self.send_handshake()
             # recieve handshake message
-            raw_handshake_response = self.recieve_handshake()
+            raw_handshake_response = await self.recieve_handshake()
             if raw_handshake_response is None:
                 return False
             # validate the hanshake message recieved obtained
@@ -273,15 +331,18 @@ class Peer:
         function helps in responding to incoming handshakes
     """
 
-    def respond_handshake(self):
+    async def respond_handshake(self):
         # if handshake already done then return True
         if self.handshake_flag:
             return True
         # keep alive timer
         self.keep_alive_timer = time.time()
         # check if you recieve any handshake message from the peer
-        while not self.check_keep_alive_timeout():
-            raw_handshake_response = self.recieve_handshake()
+        raw_handshake_response = None
+        while self.peer_sock.peer_connection_active():
+            if self.check_keep_alive_timeout():
+                break
+            raw_handshake_response = await self.recieve_handshake()
             if raw_handshake_response is not None:
                 break
         # case where timeout occured and couldn't recieved message
@@ -294,7 +355,7 @@ class Peer:
         # extract the peer id
         self.peer_id = handshake_response.client_peer_id
         # send handshake message after validation
-        self.send_handshake()
+        await self.send_handshake()
         self.handshake_flag = True
         # handshake done successfully
         return True
@@ -314,11 +375,11 @@ class Peer:
         function returns the handshake request that is made 
     """
 
-    def send_handshake(self):
+    async def send_handshake(self):
         # create a handshake object instance for request
         handshake_request = self.build_handshake_message()
         # send the handshake message
-        self.send(handshake_request.message())
+        await self.send(handshake_request.message())
 
         # used for EXCECUTION LOGGING
         handshake_req_log = "Handshake initiated -----> " + self.unique_id
@@ -332,9 +393,9 @@ class Peer:
         function returns handshake recieved on success else returns None
     """
 
-    def recieve_handshake(self):
+    async def recieve_handshake(self):
         # recieve message for the peer
-        raw_handshake_response = self.recieve(HANDSHAKE_MESSAGE_LENGTH)
+        raw_handshake_response = await self.recieve(HANDSHAKE_MESSAGE_LENGTH)
         if raw_handshake_response is None:
             # used for EXCECUTION LOGGING
             handshake_res_log = "Handshake not recived from " + self.unique_id
@@ -379,7 +440,7 @@ class Peer:
         have messages in any order that condition is below implementation
     """
 
-    def initialize_bitfield(self):
+    async def initialize_bitfield(self):
         # peer connection not established
         if not self.peer_sock.peer_connection_active():
             return self.bitfield_pieces
@@ -390,10 +451,11 @@ class Peer:
         messages_begin_recieved = True
         while messages_begin_recieved:
             # handle responses recieved
-            response_message = self.handle_response()
+            response_message = await self.handle_response()
             # if you no respone message is recieved
             if response_message is None:
                 messages_begin_recieved = False
+        self.bitfield_initialized = True
         # returns bitfield obtained by the peer
         return self.bitfield_pieces
 
@@ -422,15 +484,10 @@ class Peer:
         and reacted, else returns None
     """
 
-    def handle_response(self):
-        # recieve messages from the peer
-        peer_response_message = self.recieve_message()
+    async def handle_response(self):
+        # recieve messages from the peer decoded into the peer wire message type
+        decoded_message = await self.recieve_message()
         # if there is no response from the peer
-        if peer_response_message is None:
-            return None
-
-        # DECODE the peer wire message into appropriate peer wire message type type
-        decoded_message = PEER_MESSAGE_DECODER.decode(peer_response_message)
         if decoded_message is None:
             return None
 
@@ -439,7 +496,7 @@ class Peer:
         self.peer_logger.log(recieved_message_log)
 
         # REACT to the message accordingly
-        self.handle_message(decoded_message)
+        await self.handle_message(decoded_message)
         return decoded_message
 
     """
@@ -447,11 +504,11 @@ class Peer:
         The function reacts to the message recieved by the peer
     """
 
-    def handle_message(self, decoded_message):
+    async def handle_message(self, decoded_message):
         # select the respective message handler
         message_handler = self.response_handler[decoded_message.message_id]
         # handle the deocode response message
-        return message_handler(decoded_message)
+        return await message_handler(decoded_message)
 
     """
         ======================================================================
@@ -463,7 +520,7 @@ class Peer:
         recieved keepalive      : indicates peer is still alive in file sharing
     """
 
-    def recieved_keep_alive(self, keep_alive_message):
+    async def recieved_keep_alive(self, keep_alive_message):
         # reset the timer when keep alive is recieved
         self.keep_alive_timer = time.time()
 
@@ -472,7 +529,7 @@ class Peer:
                                   peer will not response to clinet requests
     """
 
-    def recieved_choke(self, choke_message):
+    async def recieved_choke(self, choke_message):
         # peer is choking the client
         self.state.set_peer_choking()
         # client will also be not interested if peer is choking
@@ -483,9 +540,11 @@ class Peer:
                                   peer will respond to client requests
     """
 
-    def recieved_unchoke(self, unchoke_message):
+    async def recieved_unchoke(self, unchoke_message):
         # the peer is unchoking the client
         self.state.set_peer_unchoking()
+        # peer is snubbing the client if no blocks are sent after unchoking
+        self.last_block_time = time.monotonic()
         # the peer in also interested in the client
         self.state.set_client_interested()
 
@@ -493,7 +552,7 @@ class Peer:
         recieved interested     : peer is interested in downloading from client 
     """
 
-    def recieved_interested(self, interested_message):
+    async def recieved_interested(self, interested_message):
         # the peer is interested in client
         self.state.set_peer_interested()
 
@@ -501,7 +560,7 @@ class Peer:
         recieved uninterested   : peer is not interested in downloading from client
     """
 
-    def recieved_uninterested(self, uninterested_message):
+    async def recieved_uninterested(self, uninterested_message):
         # the peer is not interested in client
         self.state.set_peer_not_interested()
         # closing the connection
@@ -512,64 +571,97 @@ class Peer:
                                   after recieving the bitfields make client interested
     """
 
-    def recieved_bitfield(self, bitfield_message):
+    async def recieved_bitfield(self, bitfield_message):
+        # pieces of earlier bitfield are no longer counted in swarm
+        self.remove_availability()
         # extract the bitfield piece information from the message
-        self.bitfield_pieces = bitfield_message.extract_pieces()
+        self.bitfield_pieces = bitfield_message.extract_pieces(
+            self.torrent.pieces_count
+        )
+        # update the availability of pieces in swarm
+        if self.piece_picker is not None and self.peer_sock.peer_connection_active():
+            self.piece_picker.add_peer_bitfield(self.bitfield_pieces)
+            self.availability_counted = True
+            await self.piece_picker.notify_availability()
 
     """
         recieved have           : peer sends information of piece that it has
     """
 
-    def recieved_have(self, have_message):
+    async def recieved_have(self, have_message):
+        piece_index = have_message.piece_index
+        if self.have_piece(piece_index):
+            return
         # update the piece information in the peer bitfiled
-        self.bitfield_pieces.add(have_message.piece_index)
+        self.bitfield_pieces.add(piece_index)
+        # update the availability of piece in swarm
+        if self.piece_picker is None or not self.peer_sock.peer_connection_active():
+            return
+        if not self.availability_counted:
+            self.piece_picker.add_peer_bitfield(self.bitfield_pieces)
+            self.availability_counted = True
+        else:
+            self.piece_picker.increment(piece_index)
+        await self.piece_picker.notify_availability()
 
     """
         recieved request        : peer has requested some piece from client
     """
 
-    def recieved_request(self, request_message):
+    async def recieved_request(self, request_message):
         # extract block requested
         piece_index = request_message.piece_index
         block_offset = request_message.block_offset
         block_length = request_message.block_length
         # validate the block requested exits in file
-        if self.torrent.validate_piece_length(piece_index, block_offset, block_length):
-            # read the datablock
-            data_block = self.file_handler.read_block(
-                piece_index, block_offset, block_length
-            )
-            # create response piece message and send it the peer
-            response_message = piece(piece_index, block_offset, data_block)
-            self.send_message(response_message)
-        else:
+        if not self.torrent.validate_piece_length(
+            piece_index, block_offset, block_length
+        ):
             request_log = (
                 self.unique_id + " dropping request since invalid block requested !"
             )
             self.peer_logger.log(request_log)
+        elif self.state.am_choking:
+            request_log = self.unique_id + " dropping request since peer is choked !"
+            self.peer_logger.log(request_log)
+        elif len(self.upload_queue) >= self.max_queued_requests:
+            request_log = (
+                self.unique_id + " dropping request since too many are queued !"
+            )
+            self.peer_logger.log(request_log)
+        else:
+            # block is uploaded after the buffered messages are handled
+            self.upload_queue.append((piece_index, block_offset, block_length))
 
     """
         recieved piece          : peer has responed with the piece to client
-                                  after recieving any piece, it is written into file
+                                  blocks are assembled in the shared buffer of
+                                  piece and written once piece is validated
     """
 
-    def recieved_piece(self, piece_message):
-        # write the block of piece into the file
-        self.file_handler.write_block(piece_message)
+    async def recieved_piece(self, piece_message):
+        # block is placed in its piece by the download scheduler
+        pass
 
     """ 
         recieved cancel         : message to cancel a block request from client
     """
 
-    def recieved_cancel(self, cancel_message):
-        # TODO : implementation coming soon
-        pass
+    async def recieved_cancel(self, cancel_message):
+        block_request = (
+            cancel_message.piece_index,
+            cancel_message.block_offset,
+            cancel_message.block_length,
+        )
+        # block is not uploaded if it is still in the upload queue
+        if block_request in self.upload_queue:
+            self.upload_queue.remove(block_request)
 
     """ 
         recieved port           : 
     """
 
-    def recieved_port(self, cancel_message):
+    async def recieved_port(self, cancel_message):
         # TODO : implementation coming soon
         pass
 
@@ -583,16 +675,16 @@ class Peer:
         send keep alive         : client message to keep the peer connection alive
     """
 
-    def send_keep_alive(self):
-        self.send_message(keep_alive())
+    async def send_keep_alive(self):
+        await self.send_message(keep_alive())
 
     """
         send choke              : peer is choked by the client
                                   client will not response to peer requests
     """
 
-    def send_choke(self):
-        self.send_message(choke())
+    async def send_choke(self):
+        await self.send_message(choke())
         self.state.set_client_choking()
 
     """
@@ -600,171 +692,229 @@ class Peer:
                                   peer will respond to client requests
     """
 
-    def send_unchoke(self):
-        self.send_message(unchoke())
+    async def send_unchoke(self):
+        await self.send_message(unchoke())
         self.state.set_client_unchoking()
 
     """
         send interested         : client is interested in the peer
     """
 
-    def send_interested(self):
-        self.send_message(interested())
+    async def send_interested(self):
+        await self.send_message(interested())
         self.state.set_client_interested()
 
     """
         send uninterested       : client is not interested in the peer 
     """
 
-    def send_uninterested(self):
-        self.send_message(uninterested())
+    async def send_uninterested(self):
+        await self.send_message(uninterested())
         self.state.set_client_not_interested()
 
     """
         send have               : client has the given piece to offer the peer
     """
 
-    def send_have(self, piece_index):
-        self.send_message(have(piece_index))
+    async def send_have(self, piece_index):
+        await self.send_message(have(piece_index))
 
     """
         send bitfield           : client sends the bitfield message of pieces
     """
 
-    def send_bitfield(self):
-        bitfield_payload = create_bitfield_message(
-            self.bitfield_pieces, self.torrent.pieces_count
-        )
-        self.send_message(bitfield(bitfield_payload))
+    async def send_bitfield(self):
+        await self.send_message(create_bitfield_message(self.bitfield_pieces))
 
     """
         send request            : client sends request to the peer for piece
     """
 
-    def send_request(self, piece_index, block_offset, block_length):
-        self.send_message(request(piece_index, block_offset, block_length))
+    async def send_request(self, piece_index, block_offset, block_length):
+        await self.send_message(request(piece_index, block_offset, block_length))
 
     """
         send piece              : client sends file's piece data to the peer 
     """
 
-    def send_piece(self, piece_index, block_offset, block_data):
-        self.send_message(piece(piece_index, block_offset, block_data))
+    async def send_piece(self, piece_index, block_offset, block_data):
+        await self.send_message(piece(piece_index, block_offset, block_data))
+
+    """
+        send piece from file    : client sends the block to peer directly from
+                                  the file (sendfile) after piece message header
+    """
+
+    async def send_piece_from_file(
+        self, piece_index, block_offset, block_length, file_object, file_position
+    ):
+        if not self.handshake_flag:
+            return
+        # used for EXCECUTION LOGGING
+        peer_request_log = "sending message  -----> PIECE (from file) : "
+        peer_request_log += "(piece index : " + str(piece_index) + ", "
+        peer_request_log += "block offset : " + str(block_offset) + ", "
+        peer_request_log += "block length : " + str(block_length) + ")"
+        self.peer_logger.log(peer_request_log)
+        header = piece.block_header(piece_index, block_offset, block_length)
+        await self.send_file(header, file_object, file_position, block_length)
+
+    """
+        send cancel             : client cancels the block requested earlier
+    """
+
+    async def send_cancel(self, piece_index, block_offset, block_length):
+        await self.send_message(cancel(piece_index, block_offset, block_length))
 
     """
         downloading finite state machine(FSM) for bittorrent client 
-        the below function implements the FSM for downloading piece from peer
+        the below function implements the FSM for downloading blocks from peer
+        the blocks to be requested are given by the download scheduler which
+        shares the blocks of pieces being downloaded among all the peers
+        function returns the partial piece completed by the block recieved
+        from the peer else returns None
     """
 
-    def piece_downlaod_FSM(self, piece_index):
-        # if the peer doesn't have the piece
-        if not self.have_piece(piece_index):
-            return False
+    async def block_downlaod_FSM(self, download_scheduler):
+        # initial messages with peer must be exchanged before downloading
+        if not self.bitfield_initialized:
+            return None
         # initializing keep alive timer
         self.keep_alive_timer = time.time()
-        # download status of piece
-        download_status = False
+        # piece completed by blocks recieved from the peer
+        completed_piece = None
         # exchanges message with
         exchange_messages = True
         while exchange_messages:
             # checking for timeouts in states
             if self.check_keep_alive_timeout():
                 self.state.set_null()
+            download_state = self.state.download_state()
             # client state 0    : (client = not interested, peer = choking)
-            if self.state == DSTATE0:
-                self.send_interested()
+            if download_state == DSTATE0:
+                await self.send_interested()
             # client state 1    : (client = interested,     peer = choking)
-            elif self.state == DSTATE1:
-                response_message = self.handle_response()
+            elif download_state == DSTATE1:
+                response_message = await self.handle_response()
+                # peer must not timeout the client while client is choked
+                if response_message is None:
+                    await self.send_keep_alive()
             # client state 2    : (client = interested,     peer = not choking)
-            elif self.state == DSTATE2:
-                download_status = self.download_piece(piece_index)
+            elif download_state == DSTATE2:
+                completed_piece = await self.download_blocks(download_scheduler)
                 exchange_messages = False
             # client state 3    : (client = None,           peer = None)
-            elif self.state == DSTATE3:
+            elif download_state == DSTATE3:
                 exchange_messages = False
-        return download_status
+            # (client = not interested, peer = not choking) : client must be
+            # interested for requesting, loop never runs without awaiting
+            else:
+                await self.send_interested()
+        # requests are lost when peer chokes client or connection is closed
+        if not self.download_possible():
+            await self.release_requests(download_scheduler)
+        return completed_piece
+
+    """
+        function helps in downloading blocks from the peer untill any piece
+        is completed, note that blocks of pieces are recieved from several
+        peers, hence the piece may be completed by block from this peer.
+        Block requests are pipelined, the request window decides how many
+        block requests can be outstanding with peer at any time
+        function returns the completed partial piece else returns None if
+        there are no more blocks to download from the peer
+    """
+
+    async def download_blocks(self, download_scheduler):
+        while self.download_possible():
+            # keep the request window full of outstanding requests
+            while self.request_window.has_room():
+                block_request = download_scheduler.next_block(self)
+                if block_request is None:
+                    break
+                await self.send_request(*block_request)
+                self.request_window.add(*block_request)
+
+            # nothing to be requested or recieved from the peer
+            if len(self.request_window) == 0:
+                return None
+
+            block = await self.download_block()
+            if block is None:
+                continue
+            piece_index, block_offset, block_data = block
+            block_length = len(block_data)
+            # in endgame mode the block is also requested from other peers
+            duplicate_peers = download_scheduler.duplicate_requests(
+                self, piece_index, block_offset
+            )
+            # place the block in shared buffer of piece irrespective of order
+            completed_piece = download_scheduler.block_recieved(
+                self, piece_index, block_offset, block_data
+            )
+            for other_peer in duplicate_peers:
+                await other_peer.cancel_request(piece_index, block_offset, block_length)
+            if completed_piece is not None:
+                # used for EXCECUTION LOGGING
+                download_log = self.unique_id + " completed piece : "
+                download_log += str(piece_index)
+                self.peer_logger.log(download_log)
+                return completed_piece
+        return None
 
     """
-        function helps in downloading the given piece from the peer
-        function returns success/failure depending upon that piece is 
-        downloaed successfully and validated successfully
+        function cancels the outstanding block request with the peer since
+        the block is already recieved from some other peer
     """
 
-    def download_piece(self, piece_index):
-        if not self.have_piece(piece_index) or not self.download_possible():
-            return False
-
-        # recieved piece data from the peer
-        recieved_piece = b""
-        # block offset for downloading the piece
-        block_offset = 0
-        # block length
-        block_length = 0
-        # piece length for torrent
-        piece_length = self.torrent.get_piece_length(piece_index)
-
-        # loop untill you download all the blocks in the piece
-        while self.download_possible() and block_offset < piece_length:
-            # find out how much max length of block that can be requested
-            if piece_length - block_offset >= self.max_block_length:
-                block_length = self.max_block_length
-            else:
-                block_length = piece_length - block_offset
-
-            block_data = self.download_block(piece_index, block_offset, block_length)
-            if block_data:
-                # increament offset according to size of data block recieved
-                recieved_piece += block_data
-                block_offset += block_length
-
-        # check for connection timeout
-        if self.check_keep_alive_timeout():
-            return False
-
-        # validate the piece and update the peer downloaded bitfield
-        if not self.validate_piece(recieved_piece, piece_index):
-            return False
+    async def cancel_request(self, piece_index, block_offset, block_length):
+        if self.request_window.remove(piece_index, block_offset):
+            await self.send_cancel(piece_index, block_offset, block_length)
 
-        # used for EXCECUTION LOGGING
-        download_log = self.unique_id + " downloaded piece : "
-        download_log += str(piece_index) + " " + SUCCESS
-        self.peer_logger.log(download_log)
+    """
+        function drops all the outstanding requests with the peer and gives
+        the requested blocks back to download scheduler for other peers
+    """
 
-        # successfully downloaded and validated piece
-        return True
+    async def release_requests(self, download_scheduler):
+        if len(self.request_window) == 0:
+            return
+        for piece_index, block_offset in self.request_window.outstanding:
+            download_scheduler.release_block(self, piece_index, block_offset)
+        self.request_window.clear()
+        # blocks can now be downloaded by the other peers
+        if self.piece_picker is not None:
+            await self.piece_picker.notify_availability()
 
     """
-        function helps in downlaoding given block of the piece from peer
-        function returns block of data if requested block is successfully 
-        downloaded else returns None 
+        function helps in recieving the response for outstanding block requests
+        function returns (piece index, block offset, block data) if any
+        requested block is successfully downloaded else returns None 
     """
 
-    def download_block(self, piece_index, block_offset, block_length):
-        # create a request message for given piece index and block offset
-        request_message = request(piece_index, block_offset, block_length)
-        # send request message to peer
-        self.send_message(request_message)
-
-        # torrent statistics starting the timer
-        self.torrent.statistics.start_time()
+    async def download_block(self):
         # recieve response message and handle the response
-        response_message = self.handle_response()
-        # torrent statistics stopping the timer
-        self.torrent.statistics.stop_time()
+        response_message = await self.handle_response()
 
         # if the message recieved was a piece message
         if not response_message or response_message.message_id != PIECE:
             return None
-        # validate if correct response is recieved for the piece message
-        if not self.validate_request_piece_messages(request_message, response_message):
+        # match the piece message with the outstanding requests
+        piece_index = response_message.piece_index
+        block_offset = response_message.block_offset
+        block_length = len(response_message.block)
+        request_time = self.request_window.match(
+            piece_index, block_offset, block_length
+        )
+        if request_time is None:
             return None
+        self.last_block_time = time.monotonic()
 
-        # update the torrent statistics for downloading
-        self.torrent.statistics.update_download_rate(piece_index, block_length)
+        # update the download rate meter of peer (and of swarm)
+        self.statistics.block_downloaded(block_length)
 
-        # successfully downloaded and validated block of piece
-        return response_message.block
+        # successfully downloaded block of piece
+        return piece_index, block_offset, response_message.block
 
     """ 
         piece can be only downloaded only upon given conditions
@@ -783,7 +933,7 @@ class Peer:
         if not self.handshake_flag:
             return False
         # finally check if peer is interested and peer is not choking
-        if self.state != DSTATE2:
+        if self.state.download_state() != DSTATE2:
             return False
         if self.check_keep_alive_timeout():
             return False
@@ -795,10 +945,7 @@ class Peer:
     """
 
     def have_piece(self, piece_index):
-        if piece_index in self.bitfield_pieces:
-            return True
-        else:
-            return False
+        return piece_index in self.bitfield_pieces
 
     """
         function adds file handler abstraction object by which client 
@@ -809,63 +956,75 @@ class Peer:
         self.file_handler = file_handler
 
     """
-        function validates if correct block was recieved from peer for the request
+        function adds the availability index of swarm, the index is updated
+        with pieces the peer has from BITFIELD and HAVE messages recieved and
+        the pieces are removed from index when peer disconnects or times out
     """
 
-    def validate_request_piece_messages(self, request, piece):
-        if request.piece_index != piece.piece_index:
-            return False
-        if request.block_offset != piece.block_offset:
-            return False
-        if request.block_length != len(piece.block):
-            return False
-        return True
+    def add_piece_picker(self, piece_picker):
+        self.piece_picker = piece_picker
 
     """
-        function validates piece recieved and given the piece index.
-        validation is comparing the sha1 hash of the recieved piece 
-        with the torrent file pieces value at particular index.
+        function adds the limiters of download and upload rate of the peer,
+        the limiters include the global limits shared by all the peers
     """
 
-    def validate_piece(self, piece, piece_index):
-        # compare the length of the piece recieved
-        piece_length = self.torrent.get_piece_length(piece_index)
-        if len(piece) != piece_length:
-            # used for EXCECUTION LOGGING
-            download_log = self.unique_id + "unable to downloaded piece "
-            download_log += str(piece_index) + " due to validation failure : "
-            download_log += "incorrect lenght " + str(len(piece)) + " piece recieved "
-            download_log += FAILURE
-            self.peer_logger.log(download_log)
-            return False
+    def add_rate_limiters(self, download_limiter, upload_limiter):
+        self.peer_sock.set_rate_limiters(download_limiter, upload_limiter)
+
+    """
+        function adds the choker of swarm which decides if client can upload
+        to the peer, all the interested peers are unchoked without choker
+    """
 
-        piece_hash = hashlib.sha1(piece).digest()
-        index = piece_index * 20
-        torrent_piece_hash = self.torrent.torrent_metadata.pieces[index : index + 20]
+    def add_choker(self, choker):
+        self.choker = choker
 
-        # compare the pieces hash with torrent file piece hash
-        if piece_hash != torrent_piece_hash:
-            # used for EXCECUTION LOGGING
-            download_log = self.unique_id + "unable to downloaded piece "
-            download_log += str(piece_index) + " due to validation failure : "
-            download_log += "info hash of piece not matched " + FAILURE
-            self.peer_logger.log(download_log)
+    # returns true if the client can unchoke and upload to the peer
+    def upload_allowed(self):
+        return self.choker is None or self.choker.upload_allowed(self)
+
+    # current rates (bytes per second) of downloading from and uploading to
+    # the peer measured by the rate meters of the peer
+    def download_rate(self):
+        return self.statistics.download_meter.rate()
+
+    def upload_rate(self):
+        return self.statistics.upload_meter.rate()
+
+    """
+        function adds the statistics of swarm, rate meters of the peer also
+        update the rate meters of swarm for every block recieved/sent
+    """
+
+    def add_swarm_statistics(self, statistics):
+        self.statistics.add_parent_statistics(statistics)
+
+    # peer is snubbing client if no block is recieved for long time while
+    # peer is unchoking the client
+    def is_snubbed(self, current_time):
+        if self.state.peer_choking is not False:
             return False
-        # return true if valid
-        return True
+        return current_time - self.last_block_time >= SNUBBED_TIMEOUT
+
+    """
+        function removes the pieces of peer from the availability index
+    """
+
+    def remove_availability(self):
+        if self.availability_counted:
+            self.piece_picker.remove_peer_bitfield(self.bitfield_pieces)
+            self.availability_counted = False
 
     """
         function does initial handshake and immediately sends bitfields to peer
     """
 
-    def initial_seeding_messages(self):
-        if not self.respond_handshake():
+    async def initial_seeding_messages(self):
+        if not await self.respond_handshake():
             return False
         # after handshake immediately send the bitfield response
-        bitfield = create_bitfield_message(
-            self.bitfield_pieces, self.torrent.pieces_count
-        )
-        self.send_message(bitfield)
+        await self.send_message(create_bitfield_message(self.bitfield_pieces))
         return True
 
     """
@@ -873,7 +1032,7 @@ class Peer:
         the below function implements the FSM for uploading pieces to peer
     """
 
-    def piece_upload_FSM(self):
+    async def piece_upload_FSM(self):
         # initializing keep alive timer
         self.keep_alive_timer = time.time()
         # download status of piece
@@ -884,19 +1043,31 @@ class Peer:
             # checking for timeouts in states
             if self.check_keep_alive_timeout():
                 self.state.set_null()
+            upload_state = self.state.upload_state()
             # client state 0    : (client = not interested, peer = choking)
-            if self.state == USTATE0:
-                response_message = self.handle_response()
+            if upload_state == USTATE0:
+                response_message = await self.handle_response()
             # client state 1    : (client = interested,     peer = choking)
-            elif self.state == USTATE1:
-                self.send_unchoke()
+            elif upload_state == USTATE1:
+                # peer is unchoked only if choker gives it an upload slot
+                if self.upload_allowed():
+                    await self.send_unchoke()
+                elif await self.handle_response() is None:
+                    await self.send_keep_alive()
             # client state 2    : (client = interested,     peer = not choking)
-            elif self.state == USTATE2:
-                self.upload_pieces()
-                exchange_messages = False
+            elif upload_state == USTATE2:
+                await self.upload_pieces()
+                # choker has given the upload slot of peer to other peer
+                if self.state.upload_state() == USTATE2:
+                    await self.send_choke()
+                    self.upload_queue.clear()
             # client state 3    : (client = None,           peer = None)
-            elif self.state == USTATE3:
+            elif upload_state == USTATE3:
                 exchange_messages = False
+            # (client = not choking, peer = not interested) : wait for peer
+            # to be interested again, loop never runs without awaiting
+            else:
+                await self.handle_response()
 
     """
         function helps in uploading the torrent file with peer, the function 
@@ -904,19 +1075,39 @@ class Peer:
         pieces of the file that client has in the seeding file
     """
 
-    def upload_pieces(self):
-        while self.upload_possible():
-            # torrent statistics starting the timer
-            self.torrent.statistics.start_time()
-            # handle all the request messages
-            request_message = self.handle_response()
-            # torrent statistics starting the timer
-            self.torrent.statistics.stop_time()
-            if request_message and request_message.message_id == REQUEST:
-                piece_index = request_message.piece_index
-                block_length = request_message.block_length
-                self.torrent.statistics.update_upload_rate(piece_index, block_length)
-                self.peer_logger.log(self.torrent.statistics.get_upload_statistics())
+    async def upload_pieces(self):
+        while self.upload_possible() and self.upload_allowed():
+            # handle all the messages recieved before uploading any block, so
+            # the requests cancelled by the peer are never uploaded
+            if not self.upload_queue or self.peer_sock.message_available():
+                await self.handle_response()
+                continue
+            piece_index, block_offset, block_length = self.upload_queue.popleft()
+            await self.upload_block(piece_index, block_offset, block_length)
+            # update the upload rate meter of peer (and of swarm)
+            self.statistics.block_uploaded(block_length)
+            self.peer_logger.log(self.statistics.get_upload_statistics())
+
+    """
+        function reads the requested block from file and sends it to the peer
+    """
+
+    async def upload_block(self, piece_index, block_offset, block_length):
+        # block stored in the file is sent directly from the file
+        file_span = self.file_handler.block_file_span(
+            piece_index, block_offset, block_length
+        )
+        if file_span is not None:
+            await self.send_piece_from_file(
+                piece_index, block_offset, block_length, *file_span
+            )
+            return
+        # read the datablock in worker thread without blocking the event loop
+        data_block = await asyncio.to_thread(
+            self.file_handler.read_block, piece_index, block_offset, block_length
+        )
+        # create response piece message and send it the peer
+        await self.send_piece(piece_index, block_offset, data_block)
 
     """ 
         piece can be only uploaded only upon given conditions
@@ -935,7 +1126,7 @@ class Peer:
         if not self.handshake_flag:
             return False
         # finally check if peer is interested and peer is not choking
-        if self.state != USTATE2:
+        if self.state.upload_state() != USTATE2:
             return False
         if self.check_keep_alive_timeout():
             return False
@@ -0,0 +1,364 @@
+import asyncio
+import struct
+
+from py_bit_torrent.protocol.peer_wire_messages import MESSAGE_LENGTH_SIZE
+
+"""
+    module implements the framed reader for the peer wire protocol messages
+
+    The event loop receives the socket data with recv_into directly into one
+    reusable bytearray buffer (asyncio buffered protocol), and the complete
+    messages are parsed out of the buffer and handed out as memoryview slices
+    of it, thus no intermediate bytes objects are created for received data.
+"""
+
+# initial capacity of the receive buffer
+RECIEVE_BUFFER_SIZE = 2**18
+
+# errors raised before any data is sent if sendfile can't be used, i.e. no
+# sendfile system call for file (SendfileNotAvailableError) or transport
+# without sendfile support (RuntimeError, NotImplementedError eg. uvloop)
+SENDFILE_UNSUPPORTED_ERRORS = (
+    asyncio.SendfileNotAvailableError,
+    RuntimeError,
+    NotImplementedError,
+)
+
+# minimum free space handed to the event loop for recv_into
+MINIMUM_READ_SIZE = 2**14
+
+# largest peer wire message accepted from a peer
+MAX_MESSAGE_LENGTH = 2**22
+
+# unread data after which reading from socket is paused
+MAX_BUFFERED_DATA = 2**22
+
+
+"""
+    frame buffer is a reusable receive buffer with read and write positions.
+    The space of parsed messages is reclaimed by moving the unparsed data to
+    start of the buffer, note that the last message handed out is never moved
+    since consumer holds memoryview of it untill it asks for the next message
+"""
+
+
+class frame_buffer:
+
+    def __init__(self, capacity=RECIEVE_BUFFER_SIZE):
+        self.buffer = bytearray(capacity)
+        # data between read and write positions is not yet parsed
+        self.read_position = 0
+        self.write_position = 0
+        # true if the consumer holds memoryview into the buffer
+        self.loaned = False
+
+    """
+        returns the writable memoryview where new data must be received
+    """
+
+    def get_buffer(self, size_hint=-1):
+        required_size = max(size_hint, MINIMUM_READ_SIZE)
+        if len(self.buffer) - self.write_position < required_size:
+            self.reclaim(required_size)
+        return memoryview(self.buffer)[self.write_position :]
+
+    """
+        makes free space of given size at end of the buffer by either moving
+        the unparsed data to start of the buffer or by moving it to a new
+        larger buffer, old buffer stays alive while memoryviews refer it
+    """
+
+    def reclaim(self, required_size):
+        unparsed_length = self.write_position - self.read_position
+        capacity = len(self.buffer)
+        if self.loaned or unparsed_length + required_size > capacity:
+            capacity = max(capacity, 2 * (unparsed_length + required_size))
+            new_buffer = bytearray(capacity)
+            new_buffer[:unparsed_length] = memoryview(self.buffer)[
+                self.read_position : self.write_position
+            ]
+            self.buffer = new_buffer
+            self.loaned = False
+        elif unparsed_length:
+            buffer_view = memoryview(self.buffer)
+            buffer_view[:unparsed_length] = buffer_view[
+                self.read_position : self.write_position
+            ]
+        self.read_position = 0
+        self.write_position = unparsed_length
+
+    """
+        updates the buffer after given number of bytes are received
+    """
+
+    def buffer_updated(self, data_length):
+        self.write_position += data_length
+
+    """
+        returns the number of bytes received but not yet parsed
+    """
+
+    def buffered(self):
+        return self.write_position - self.read_position
+
+    """
+        releases the memoryview handed out earlier to the consumer
+    """
+
+    def release(self):
+        self.loaned = False
+        if self.read_position == self.write_position:
+            self.read_position = 0
+            self.write_position = 0
+
+    """
+        function returns exactly given size of data as bytes if it is
+        buffered else returns None (used for the fixed size handshake)
+    """
+
+    def read_exactly(self, data_size):
+        if self.buffered() < data_size:
+            return None
+        self.release()
+        data_end = self.read_position + data_size
+        raw_data = bytes(memoryview(self.buffer)[self.read_position : data_end])
+        self.read_position = data_end
+        return raw_data
+
+    """
+        function returns true if complete message is received in the buffer
+    """
+
+    def frame_available(self):
+        if self.buffered() < MESSAGE_LENGTH_SIZE:
+            return False
+        message_length = struct.unpack_from("!I", self.buffer, self.read_position)[0]
+        return self.buffered() >= MESSAGE_LENGTH_SIZE + message_length
+
+    """
+        function parses the next complete peer wire message in the buffer
+        returns (message length, message id, payload memoryview) or None if
+        complete message is not yet received. Note that payload memoryview
+        is valid only untill the next message is requested from the buffer
+    """
+
+    def read_frame(self):
+        self.release()
+        if self.buffered() < MESSAGE_LENGTH_SIZE:
+            return None
+        message_length = struct.unpack_from("!I", self.buffer, self.read_position)[0]
+        if message_length > MAX_MESSAGE_LENGTH:
+            raise ValueError("message length " + str(message_length) + " too large")
+        if self.buffered() < MESSAGE_LENGTH_SIZE + message_length:
+            return None
+
+        message_start = self.read_position + MESSAGE_LENGTH_SIZE
+        self.read_position = message_start + message_length
+        # keep alive messages have no message ID and payload
+        if message_length == 0:
+            return message_length, None, None
+        message_id = self.buffer[message_start]
+        # messages having no payload
+        if message_length == 1:
+            return message_length, message_id, None
+        self.loaned = True
+        payload = memoryview(self.buffer)[message_start + 1 : self.read_position]
+        return message_length, message_id, payload
+
+
+"""
+    asyncio buffered protocol for a peer connection, the event loop calls
+    recv_into on the frame buffer and coroutines wait for complete messages
+"""
+
+
+class peer_protocol(asyncio.BufferedProtocol):
+
+    def __init__(self, connection_callback=None):
+        # coroutine function called with the protocol on new connection
+        self.connection_callback = connection_callback
+        self.connection_task = None
+
+        self.transport = None
+        self.frames = frame_buffer()
+        self.connection_closed = False
+
+        # future waiting for more data to be received
+        self.data_waiter = None
+        # future waiting for transport write buffer to drain
+        self.drain_waiter = None
+        self.writing_paused = False
+        self.reading_paused = False
+
+        # limiters of the rate at which data is recieved and sent (if any)
+        self.download_limiter = None
+        self.upload_limiter = None
+        # true while reading socket is paused for the download rate limit
+        self.reading_throttled = False
+
+    def connection_made(self, transport):
+        self.transport = transport
+        if self.connection_callback is not None:
+            self.connection_task = asyncio.ensure_future(self.connection_callback(self))
+
+    def connection_lost(self, exc):
+        self.connection_closed = True
+        self.wake_up(self.data_waiter)
+        self.wake_up(self.drain_waiter)
+
+    def set_rate_limiters(self, download_limiter, upload_limiter):
+        self.download_limiter = download_limiter
+        self.upload_limiter = upload_limiter
+
+    def get_buffer(self, size_hint):
+        buffer = self.frames.get_buffer(size_hint)
+        # data recieved at once is limited so the download rate is smooth
+        if self.download_limiter is not None:
+            return buffer[: self.download_limiter.read_size()]
+        return buffer
+
+    def buffer_updated(self, data_length):
+        self.frames.buffer_updated(data_length)
+        # stop reading socket untill recieved data is within the rate limit
+        if self.download_limiter is not None:
+            delay = self.download_limiter.consume(data_length)
+            if delay > 0:
+                self.throttle_reading(delay)
+        # stop reading socket if consumer is not keeping up with peer
+        if self.frames.buffered() > MAX_BUFFERED_DATA:
+            self.transport.pause_reading()
+            self.reading_paused = True
+        self.wake_up(self.data_waiter)
+
+    # pauses reading the socket for given seconds, the unread data is kept
+    # by the kernel hence peer is slowed down by the TCP flow control
+    def throttle_reading(self, delay):
+        self.transport.pause_reading()
+        self.reading_throttled = True
+        asyncio.get_running_loop().call_later(delay, self.resume_throttled_reading)
+
+    def resume_throttled_reading(self):
+        self.reading_throttled = False
+        if not self.reading_paused and not self.connection_closed:
+            self.transport.resume_reading()
+
+    def eof_received(self):
+        self.connection_closed = True
+        self.wake_up(self.data_waiter)
+        return False
+
+    def pause_writing(self):
+        self.writing_paused = True
+
+    def resume_writing(self):
+        self.writing_paused = False
+        self.wake_up(self.drain_waiter)
+
+    # completes the given waiting future
+    def wake_up(self, waiter):
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    # waits untill more data is received from the peer
+    async def wait_for_data(self):
+        if self.connection_closed:
+            raise ConnectionError("peer connection closed")
+        if self.reading_paused:
+            self.reading_paused = False
+            if not self.reading_throttled:
+                self.transport.resume_reading()
+        self.data_waiter = asyncio.get_running_loop().create_future()
+        try:
+            await self.data_waiter
+        finally:
+            self.data_waiter = None
+
+    """
+        coroutine returns exactly given size of data from the peer
+    """
+
+    async def read_exactly(self, data_size):
+        raw_data = self.frames.read_exactly(data_size)
+        while raw_data is None:
+            await self.wait_for_data()
+            raw_data = self.frames.read_exactly(data_size)
+        return raw_data
+
+    # true if complete message is recieved and can be read without waiting
+    def frame_available(self):
+        return self.frames.frame_available()
+
+    """
+        coroutine returns the next complete peer wire message from the peer
+    """
+
+    async def read_frame(self):
+        frame = self.frames.read_frame()
+        while frame is None:
+            await self.wait_for_data()
+            frame = self.frames.read_frame()
+        return frame
+
+    """
+        writes the data and waits untill the transport can accept more data
+        (data waits for the upload rate limit before being written),
+        multiple data parts are written with writelines, which the selector
+        event loop sends with a single sendmsg call (scatter/gather)
+    """
+
+    async def write(self, *data_parts):
+        if self.connection_closed:
+            raise ConnectionError("peer connection closed")
+        if self.upload_limiter is not None:
+            await self.upload_limiter.acquire(sum(map(len, data_parts)))
+        if len(data_parts) == 1:
+            self.transport.write(data_parts[0])
+        else:
+            self.transport.writelines(data_parts)
+        await self.drain()
+
+    """
+        writes the header and sends the data of file (of given size from the
+        given position) with sendfile system call, the data is sent from the
+        page cache to the socket without copying it into user space buffers.
+        Data is read and written normally if sendfile can't be used for the
+        file or the transport. Note that the event loop waits for the write
+        buffer to be empty before sending the file, hence no other coroutine
+        must write to the peer while the file is being sent
+    """
+
+    async def sendfile(self, header, file_object, file_position, data_size):
+        if self.connection_closed:
+            raise ConnectionError("peer connection closed")
+        if self.upload_limiter is not None:
+            await self.upload_limiter.acquire(len(header) + data_size)
+        self.transport.write(header)
+        if self.transport.is_closing():
+            raise ConnectionError("peer connection closed")
+        event_loop = asyncio.get_running_loop()
+        try:
+            data_sent = await event_loop.sendfile(
+                self.transport, file_object, file_position, data_size, fallback=False
+            )
+        except SENDFILE_UNSUPPORTED_ERRORS:
+            data = await asyncio.to_thread(file_object.pread, data_size, file_position)
+            data_sent = len(data)
+            self.transport.write(data)
+        # peer is expecting the complete data after the header
+        if data_sent != data_size:
+            self.close()
+            raise ConnectionError("file data shorter than expected")
+        await self.drain()
+
+    async def drain(self):
+        while self.writing_paused and not self.connection_closed:
+            # every coroutine writing to the peer waits on the same future
+            if self.drain_waiter is None or self.drain_waiter.done():
+                self.drain_waiter = asyncio.get_running_loop().create_future()
+            await asyncio.shield(self.drain_waiter)
+        if self.connection_closed:
+            raise ConnectionError("peer connection closed")
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
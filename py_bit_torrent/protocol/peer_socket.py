@@ -1,35 +1,35 @@
+import asyncio
 import sys
 from logging import DEBUG
-from socket import *
-from threading import *
 
+from py_bit_torrent.protocol.peer_protocol import peer_protocol
 from py_bit_torrent.protocol.torrent_logger import SOCKET_LOG_FILE, torrent_logger
 
 """
     module handles the creating the socket for peers, and operations that
     peer socket can peform
 
-    Note that all the current socket operations written are blocking 
+    Note that all the socket operations are coroutines driven by the asyncio
+    event loop, the data is received through the buffered peer protocol
 """
 
 
 # class for general peer socket
 class peer_socket:
 
-    def __init__(self, peer_IP, peer_port, psocket=None):
-        if psocket is None:
-            # initializing a peer socket for TCP communiction
-            self.peer_sock = socket(AF_INET, SOCK_STREAM)
+    def __init__(self, peer_IP, peer_port, connection=None):
+        if connection is None:
+            # peer protocol is created once connection is made
+            self.connection = None
             # peer connection
             self.peer_connection = False
         else:
+            # initializing using the constructor argument peer protocol
+            self.connection = connection
             # peer connection
             self.peer_connection = True
-            # initializing using the constructor argument socket
-            self.peer_sock = psocket
 
         self.timeout = 3
-        self.peer_sock.settimeout(self.timeout)
 
         # IP and port of the peer
         self.IP = peer_IP
@@ -39,81 +39,153 @@ class peer_socket:
         # the maximum peer request that seeder can handle
         self.max_peer_requests = 50
 
-        # socket locks for synchronization
-        self.socket_lock = Lock()
+        # listening server used while seeding
+        self.seeding_server = None
+
+        # limiters of the download and upload rate of the connection
+        self.download_limiter = None
+        self.upload_limiter = None
 
         # logger for peer socket
-        self.socket_logger = torrent_logger(
-            self.unique_id, SOCKET_LOG_FILE, DEBUG
-        )
+        self.socket_logger = torrent_logger(self.unique_id, SOCKET_LOG_FILE, DEBUG)
 
     """
-        function returns raw data of given data size which is recieved 
+        function returns raw data of given data size which is recieved
         function returns the exact length data as recieved else return None
     """
 
-    def recieve_data(self, data_size):
+    async def recieve_data(self, data_size):
         if not self.peer_connection:
-            return
-        peer_raw_data = b""
-        recieved_data_length = 0
-        request_size = data_size
-
-        # loop untill you recieve all the data from the peer
-        while recieved_data_length < data_size:
-            # attempt recieving requested data size in chunks
-            try:
-                chunk = self.peer_sock.recv(request_size)
-            except:
-                chunk = b""
-            if len(chunk) == 0:
-                return None
-            peer_raw_data += chunk
-            request_size -= len(chunk)
-            recieved_data_length += len(chunk)
+            return None
+        # attempt recieving requested data size within the socket timeout
+        try:
+            peer_raw_data = await asyncio.wait_for(
+                self.connection.read_exactly(data_size), self.timeout
+            )
+        except asyncio.TimeoutError:
+            return None
+        except Exception:
+            # the TCP connection is broken
+            self.disconnect()
+            return None
 
         # return required size data recieved from peer
         return peer_raw_data
 
     """
-        function helps send raw data by the socket
+        function returns next peer wire message recieved as a tuple of
+        (message length, message id, payload) else returns None, note that
+        payload is memoryview valid only untill the next recieve call
+    """
+
+    async def recieve_frame(self):
+        if not self.peer_connection:
+            return None
+        # attempt recieving complete message within the socket timeout
+        try:
+            frame = await asyncio.wait_for(self.connection.read_frame(), self.timeout)
+        except asyncio.TimeoutError:
+            return None
+        except Exception:
+            # the TCP connection is broken or peer sent invalid message
+            self.disconnect()
+            return None
+
+        # return the message recieved from peer
+        return frame
+
+    """
+        function returns true if the next peer wire message is already
+        recieved, i.e. recieve frame would return without waiting
+    """
+
+    def message_available(self):
+        if not self.peer_connection:
+            return False
+        return self.connection.frame_available()
+
+    """
+        function helps send raw data by the socket, data given in multiple
+        parts is sent with a single scatter/gather write without joining
         function sends the complete message, returns success/failure depending
         upon if it has successfully send the data
     """
 
-    def send_data(self, raw_data):
+    async def send_data(self, *data_parts):
+        if not self.peer_connection:
+            return False
+        try:
+            # attempting to send data, waits for the transport flow control
+            await self.connection.write(*data_parts)
+        except Exception:
+            # the TCP connection is broken
+            return False
+        return True
+
+    """
+        function sends the header followed by the data of file from given
+        position directly from the file (sendfile), returns success/failure
+        depending upon if it has successfully sent the data
+    """
+
+    async def send_file(self, header, file_object, file_position, data_size):
         if not self.peer_connection:
             return False
-        data_length_send = 0
-        while data_length_send < len(raw_data):
-            try:
-                # attempting to send data
-                data_length_send += self.peer_sock.send(raw_data[data_length_send:])
-            except:
-                # the TCP connection is broken
-                return False
+        try:
+            await self.connection.sendfile(
+                header, file_object, file_position, data_size
+            )
+        except Exception:
+            # the TCP connection is broken
+            return False
         return True
 
+    """
+        sets the limiters of the rate at which the data is recieved from and
+        sent to the peer, the limiters are applied to the connection once the
+        connection is made with the peer
+    """
+
+    def set_rate_limiters(self, download_limiter, upload_limiter):
+        self.download_limiter = download_limiter
+        self.upload_limiter = upload_limiter
+        if self.connection is not None:
+            self.connection.set_rate_limiters(download_limiter, upload_limiter)
+
     """
         binds the socket that IP and port and starts listening over it
+        every accepted connection is handed to the given connection callback
+        coroutine function with the peer protocol of the connection
     """
 
-    def start_seeding(self):
+    async def start_seeding(self, connection_callback):
         try:
-            self.peer_sock.bind((self.IP, self.port))
-            self.peer_sock.listen(self.max_peer_requests)
+            loop = asyncio.get_running_loop()
+            self.seeding_server = await loop.create_server(
+                lambda: peer_protocol(connection_callback),
+                self.IP,
+                self.port,
+                backlog=self.max_peer_requests,
+            )
         except Exception as err:
             binding_log = "Seeding socket binding failed ! " + self.unique_id + " : "
             self.socket_logger.log(binding_log + err.__str__())
             sys.exit(0)
 
     """
-        attempts to connect the peer using TCP connection 
+        attempts to connect the peer using TCP connection
     """
 
-    def request_connection(self):
+    async def request_connection(self):
         try:
-            self.peer_sock.connect((self.IP, self.port))
+            loop = asyncio.get_running_loop()
+            _, self.connection = await asyncio.wait_for(
+                loop.create_connection(peer_protocol, self.IP, self.port),
+                self.timeout,
+            )
+            self.connection.set_rate_limiters(
+                self.download_limiter, self.upload_limiter
+            )
             self.peer_connection = True
         except Exception as err:
             self.peer_connection = False
@@ -121,26 +193,6 @@ class peer_socket:
             self.socket_logger.log(connection_log + err.__str__())
         return self.peer_connection
 
-    """
-        accepts an incomming connection
-        return connection socket and ip address of incoming connection
-    """
-
-    def accept_connection(self):
-        connection_log = ""
-        try:
-            connection = self.peer_sock.accept()
-            connection_log += "Socket connection recieved !"
-        except Exception as err:
-            connection = None
-            connection_log = (
-                    "Socket accept connection for seeder " + self.unique_id + " : "
-            )
-            connection_log += str(err)
-        self.socket_logger.log(connection_log)
-        # successfully return connection
-        return connection
-
     """
         checks if the peer connection is active or not
     """
@@ -153,7 +205,10 @@ class peer_socket:
     """
 
     def disconnect(self):
-        self.peer_sock.close()
+        if self.connection is not None:
+            self.connection.close()
+        if self.seeding_server is not None:
+            self.seeding_server.close()
         self.peer_connection = False
 
     """
@@ -1,60 +1,110 @@
 """
     maintains the state of peer participating in uploading / downloading
+
+    The state is encoded as a small int with one bit for each of the four
+    flags, thus the FSM compares the state with the FSM states (ints) in
+    every iteration without any function call. Null state (peer connection
+    closed or timed out) is a separate bit, the state of closed connection
+    stays null irrespective of the messages handled after closing
+
+    Downloading FSM depends only on client interested and peer choking and
+    uploading FSM only on client choking and peer interested, the other two
+    flags are masked out before comparing, e.g. peer interested in client
+    while client is downloading does not change the downloading state
 """
+# bits of the state flags
+AM_CHOKING          = 1                 # client choking peer
+AM_INTERESTED       = 2                 # client interested in peer
+PEER_CHOKING        = 4                 # peer choking client
+PEER_INTERESTED     = 8                 # peer interested in clinet
+NULL_STATE          = 16                # all the flags are None
+
+# initial state of the peer : client and peer choking, none interested
+INITIAL_STATE       = AM_CHOKING | PEER_CHOKING
+
+# flags deciding the state of downloading / uploading FSM
+DOWNLOAD_FLAGS      = AM_INTERESTED | PEER_CHOKING | NULL_STATE
+UPLOAD_FLAGS        = AM_CHOKING | PEER_INTERESTED | NULL_STATE
+
 class peer_state():
+    __slots__ = ('value',)
+
     def __init__(self):
-        # Initialize the states of the peer 
-        self.am_choking         = True              # client choking peer
-        self.am_interested      = False             # client interested in peer
-        self.peer_choking       = True              # peer choking client
-        self.peer_interested    = False             # peer interested in clinet
-    
+        # Initialize the states of the peer
+        self.value = INITIAL_STATE
+
+    # sets/clears given flag bit, null state is never changed
+    def set_flag(self, flag):
+        if self.value != NULL_STATE:
+            self.value |= flag
+    def clear_flag(self, flag):
+        if self.value != NULL_STATE:
+            self.value &= ~flag
+
+    # returns the given flag, None if the state is null
+    def get_flag(self, flag):
+        if self.value == NULL_STATE:
+            return None
+        return self.value & flag != 0
+    def update_flag(self, flag, is_set):
+        if is_set:
+            self.set_flag(flag)
+        else:
+            self.clear_flag(flag)
+
     def set_client_choking(self):
-        self.am_choking = True
+        self.set_flag(AM_CHOKING)
     def set_client_unchoking(self):
-        self.am_choking = False
- 
+        self.clear_flag(AM_CHOKING)
+
     def set_client_interested(self):
-        self.am_interested = True
+        self.set_flag(AM_INTERESTED)
     def set_client_not_interested(self):
-        self.am_interested = False
+        self.clear_flag(AM_INTERESTED)
 
     def set_peer_choking(self):
-        self.peer_choking = True
+        self.set_flag(PEER_CHOKING)
     def set_peer_unchoking(self):
-        self.peer_choking = False
+        self.clear_flag(PEER_CHOKING)
 
     def set_peer_interested(self):
-        self.peer_interested = True
+        self.set_flag(PEER_INTERESTED)
     def set_peer_not_interested(self):
-        self.peer_interested = False
-    
+        self.clear_flag(PEER_INTERESTED)
+
 
     def set_null(self):
-        self.am_choking         = None
-        self.am_interested      = None
-        self.peer_choking       = None
-        self.peer_interested    = None
+        self.value = NULL_STATE
+
+    # states of downloading / uploading FSM (DSTATE / USTATE)
+    def download_state(self):
+        return self.value & DOWNLOAD_FLAGS
+    def upload_state(self):
+        return self.value & UPLOAD_FLAGS
+
+    # flags of the state (used outside the FSM loops)
+    am_choking      = property(lambda self: self.get_flag(AM_CHOKING),
+                               lambda self, is_set: self.update_flag(AM_CHOKING, is_set))
+    am_interested   = property(lambda self: self.get_flag(AM_INTERESTED),
+                               lambda self, is_set: self.update_flag(AM_INTERESTED, is_set))
+    peer_choking    = property(lambda self: self.get_flag(PEER_CHOKING),
+                               lambda self, is_set: self.update_flag(PEER_CHOKING, is_set))
+    peer_interested = property(lambda self: self.get_flag(PEER_INTERESTED),
+                               lambda self, is_set: self.update_flag(PEER_INTERESTED, is_set))
 
     # overaloading == operation for comparsion with states
-    def __eq__(self, other): 
-        if self.am_choking      != other.am_choking :
-            return False
-        if self.am_interested   != other.am_interested:
-            return False
-        if self.peer_choking    != other.peer_choking: 
-            return False
-        if self.peer_interested != other.peer_interested:
-            return False
-        return True
-    
+    def __eq__(self, other):
+        if isinstance(other, peer_state):
+            other = other.value
+        return self.value == other
+
     # overaloading != operation for comparsion with states
     def  __ne__(self, other):
         return not self.__eq__(other)
 
     def __str__(self):
         peer_state_log  = '[ client choking : '     + str(self.am_choking)
-        peer_state_log += ', client interested : '  + str(self.am_interested) 
+        peer_state_log += ', client interested : '  + str(self.am_interested)
         peer_state_log += ', peer choking : '       + str(self.peer_choking)
         peer_state_log += ', peer interested : '    + str(self.peer_interested) + ']'
         return peer_state_log
@@ -64,38 +114,28 @@ class peer_state():
         Initializing the downloading states for BTP FSM
 """
 # initial state     : client = not interested,  peer = choking
-DSTATE0 = peer_state()
+DSTATE0 = PEER_CHOKING
 
 # client state 1    : client = interested,      peer = choking
-DSTATE1 = peer_state()
-DSTATE1.am_interested   = True
-    
+DSTATE1 = AM_INTERESTED | PEER_CHOKING
+
 # client state 2    : client = interested,      peer = not choking
-DSTATE2 = peer_state()
-DSTATE2.am_interested   = True
-DSTATE2.peer_choking    = False
+DSTATE2 = AM_INTERESTED
 
 # client state 3    : client : None,            peer = None
-DSTATE3 = peer_state()
-DSTATE3.set_null()
+DSTATE3 = NULL_STATE
 
 """
         Initializing the uploading states for BTP FSM
 """
 # initial state     : client = choking,         peer = not interested
-USTATE0 = peer_state()
+USTATE0 = AM_CHOKING
 
 # client state 1    : client = choking,         peer = interested
-USTATE1 = peer_state()
-USTATE1.peer_interested = True
-   
+USTATE1 = AM_CHOKING | PEER_INTERESTED
+
 # client state 2    : client = not choking,     peer = interested
-USTATE2 = peer_state()
-USTATE2.peer_interested = True
-USTATE2.am_choking = False
+USTATE2 = PEER_INTERESTED
 
 # client state 3    : client : None,            peer = None
-USTATE3 = peer_state()
-USTATE3.set_null()
-
-
+USTATE3 = NULL_STATE
@@ -1,6 +1,7 @@
 import struct
 
 from py_bit_torrent.protocol import torrent_error
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
 
 """
     As per Peer Wire Protocol all the messages exchanged in between 
@@ -42,6 +43,8 @@ MESSAGE_ID_SIZE = 1
 
 
 class peer_wire_message:
+    # messages are created for every block, attributes are kept in slots
+    __slots__ = ("message_length", "message_id", "payload")
 
     # initalizes the attributes of peer wire message
     def __init__(self, message_length, message_id, payload):
@@ -61,6 +64,11 @@ class peer_wire_message:
             message += self.payload
         return message
 
+    # returns the list of buffers which together make the peer message
+    # buffers are sent with single scatter/gather write without joining
+    def message_parts(self):
+        return [self.message()]
+
     # printing the peer wire message
     def __str__(self):
         message = "PEER WIRE MESSAGE : "
@@ -80,6 +88,8 @@ class peer_wire_message:
 
 
 class handshake:
+    __slots__ = ("protocol_name", "info_hash", "client_peer_id")
+
     # initialize the handshake with the paylaod
     def __init__(self, info_hash, client_peer_id):
         # protocol name : BTP
@@ -148,6 +158,8 @@ class handshake:
 
 
 class keep_alive(peer_wire_message):
+    __slots__ = ()
+
     def __init__(self):
         message_length = 0  # 4 bytes message length
         message_id = KEEP_ALIVE  # no message ID
@@ -168,6 +180,8 @@ class keep_alive(peer_wire_message):
 
 
 class choke(peer_wire_message):
+    __slots__ = ()
+
     def __init__(self):
         message_length = 1  # 4 bytes message length
         message_id = CHOKE  # 1 byte message ID
@@ -188,6 +202,8 @@ class choke(peer_wire_message):
 
 
 class unchoke(peer_wire_message):
+    __slots__ = ()
+
     def __init__(self):
         message_length = 1  # 4 bytes message length
         message_id = UNCHOKE  # 1 byte message ID
@@ -209,6 +225,8 @@ class unchoke(peer_wire_message):
 
 
 class interested(peer_wire_message):
+    __slots__ = ()
+
     def __init__(self):
         message_length = 1  # 4 bytes message length
         message_id = INTERESTED  # 1 byte message ID
@@ -230,6 +248,8 @@ class interested(peer_wire_message):
 
 
 class uninterested(peer_wire_message):
+    __slots__ = ()
+
     def __init__(self):
         message_length = 1  # 4 bytes message length
         message_id = UNINTERESTED  # 1 byte message ID
@@ -251,6 +271,8 @@ class uninterested(peer_wire_message):
 
 
 class have(peer_wire_message):
+    __slots__ = ("piece_index",)
+
     # initializes the message with given paylaod
     def __init__(self, piece_index):
         message_length = 5  # 4 bytes message length
@@ -276,6 +298,8 @@ class have(peer_wire_message):
 
 
 class bitfield(peer_wire_message):
+    __slots__ = ("pieces_info",)
+
     # initialize the message with pieces information
     def __init__(self, pieces_info):
         message_length = 1 + len(pieces_info)  # 4 bytes message length
@@ -286,17 +310,12 @@ class bitfield(peer_wire_message):
         self.pieces_info = pieces_info
 
     # extract downloaded pieces from bitfield send by peer
-    def extract_pieces(self):
-        bitfield_pieces = set([])
-        # for every bytes value in payload check for its bits
-        for i, byte_value in enumerate(self.payload):
-            for j in range(8):
-                # check if jth bit is set
-                if (byte_value >> j) & 1:
-                    piece_number = i * 8 + 7 - j
-                    bitfield_pieces.add(piece_number)
+    def extract_pieces(self, pieces_count=None):
+        # all the bits of payload are pieces if count of pieces is not known
+        if pieces_count is None:
+            pieces_count = 8 * len(self.payload)
         # return the extracted bitfield pieces
-        return bitfield_pieces
+        return piece_bitfield.from_payload(self.payload, pieces_count)
 
     def __str__(self):
         message = "BITFIELD : "
@@ -314,19 +333,35 @@ class bitfield(peer_wire_message):
 
 
 class request(peer_wire_message):
+    __slots__ = ("piece_index", "block_offset", "block_length")
+
     # request message for any given block from any piece
     def __init__(self, piece_index, block_offset, block_length):
         message_length = 13  # 4 bytes message length
         message_id = REQUEST  # 1 byte message id
-        payload = struct.pack("!I", piece_index)  # 12 bytes payload
-        payload += struct.pack("!I", block_offset)
-        payload += struct.pack("!I", block_length)
+        payload = None  # 12 bytes payload packed in message
         super().__init__(message_length, message_id, payload)
         # actual payload data to be associated with object
         self.piece_index = piece_index
         self.block_offset = block_offset
         self.block_length = block_length
 
+    # decodes the request message from the payload of peer message
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(*struct.unpack_from("!III", payload))
+
+    # packs the complete request message at once
+    def message(self):
+        return struct.pack(
+            "!IBIII",
+            self.message_length,
+            self.message_id,
+            self.piece_index,
+            self.block_offset,
+            self.block_length,
+        )
+
     def __str__(self):
         message = "REQUEST : "
         message += "(message paylaod : [ "
@@ -340,23 +375,49 @@ class request(peer_wire_message):
     This message is used to exchange the data among the peers. The payload for
     the message as given below
     | index(index of piece) | begin(offest within piece) | block(actual data) |
+
+    Note that block is never copied into a payload, received piece messages
+    refer the block as memoryview of the received data and piece messages
+    sent are written as separate header and block buffers
 """
 
 
 class piece(peer_wire_message):
+    __slots__ = ("piece_index", "block_offset", "block")
+
     # the piece message for any block data from file
     def __init__(self, piece_index, block_offset, block):
         message_length = 9 + len(block)  # 4 bytes message length
         message_id = PIECE  # 1 byte message id
-        payload = struct.pack("!I", piece_index)  # variable length payload
-        payload += struct.pack("!I", block_offset)
-        payload += block
+        payload = None  # header is packed in message, block is kept as is
         super().__init__(message_length, message_id, payload)
         # actual payload data to be associated with object
         self.piece_index = piece_index
         self.block_offset = block_offset
         self.block = block
 
+    # decodes the piece message as a view over the payload of peer message
+    @classmethod
+    def from_payload(cls, payload):
+        piece_index, block_offset = struct.unpack_from("!II", payload)
+        return cls(piece_index, block_offset, memoryview(payload)[8:])
+
+    # header of piece message : length, id, piece index and block offset
+    def header(self):
+        return piece.block_header(self.piece_index, self.block_offset, len(self.block))
+
+    # header of piece message whose block of given length is sent separately
+    # after the header (eg. directly from the file using sendfile)
+    @staticmethod
+    def block_header(piece_index, block_offset, block_length):
+        return struct.pack("!IBII", 9 + block_length, PIECE, piece_index, block_offset)
+
+    def message(self):
+        return self.header() + self.block
+
+    def message_parts(self):
+        return [self.header(), self.block]
+
     def __str__(self):
         message = "PIECE : "
         message += "(message paylaod : [ "
@@ -367,86 +428,115 @@ class piece(peer_wire_message):
 
 
 """
-    function helps in creating the bitfield message given the bitfield set
-"""
-
+    This message is used to cancel the block request sent earlier, the payload
+    is same as the payload of request message
+    | index(index of piece) | begin(offset within piece) | length(block length) |
 
-def create_bitfield_message(bitfield_pieces, total_pieces):
-    bitfield_payload = b""
-    piece_byte = 0
-    # check for every torrent piece in bitfield
-    for i in range(total_pieces):
-        if i in bitfield_pieces:
-            piece_byte = piece_byte | (2**8)
-            piece_byte = piece_byte >> 1
-        if (i + 1) % 8 == 0:
-            bitfield_payload += struct.pack("!B", piece_byte)
-            piece_byte = 0
-
-    # adding the last piece_bytes
-    if total_pieces % 8 != 0:
-        bitfield_payload += struct.pack("!B", piece_byte)
-
-    return bitfield(bitfield_payload)
-
-
-""" 
-    The class helps in decoding any general peer wire message into its 
-    appropriate message type object instance
+    Cancel messages are sent in endgame mode when the block requested from
+    several peers is recieved from any one of them
 """
 
 
-class peer_message_decoder:
+class cancel(peer_wire_message):
+    __slots__ = ("piece_index", "block_offset", "block_length")
 
-    # initialize peer_message_decoder with given peer wire message instance
-    def decode(self, peer_message):
+    # cancel message for the requested block of any piece
+    def __init__(self, piece_index, block_offset, block_length):
+        message_length = 13  # 4 bytes message length
+        message_id = CANCEL  # 1 byte message id
+        payload = None  # 12 bytes payload packed in message
+        super().__init__(message_length, message_id, payload)
+        # actual payload data to be associated with object
+        self.piece_index = piece_index
+        self.block_offset = block_offset
+        self.block_length = block_length
+
+    # decodes the cancel message from the payload of peer message
+    @classmethod
+    def from_payload(cls, payload):
+        return cls(*struct.unpack_from("!III", payload))
 
-        # deocdes the given peer_message
-        if peer_message.message_id == KEEP_ALIVE:
-            self.peer_decoded_message = keep_alive()
+    # packs the complete cancel message at once
+    def message(self):
+        return struct.pack(
+            "!IBIII",
+            self.message_length,
+            self.message_id,
+            self.piece_index,
+            self.block_offset,
+            self.block_length,
+        )
 
-        elif peer_message.message_id == CHOKE:
-            self.peer_decoded_message = choke()
+    def __str__(self):
+        message = "CANCEL : "
+        message += "(message paylaod : [ "
+        message += "piece index : " + str(self.piece_index) + ", "
+        message += "block offest : " + str(self.block_offset) + ", "
+        message += "block length : " + str(self.block_length) + " ])"
+        return message
 
-        elif peer_message.message_id == UNCHOKE:
-            self.peer_decoded_message = unchoke()
 
-        elif peer_message.message_id == INTERESTED:
-            self.peer_decoded_message = interested()
+"""
+    function helps in creating the bitfield message given the piece bitfield
+"""
 
-        elif peer_message.message_id == UNINTERESTED:
-            self.peer_decoded_message = uninterested()
 
-        elif peer_message.message_id == HAVE:
-            piece_index = struct.unpack_from("!I", peer_message.payload)[0]
-            self.peer_decoded_message = have(piece_index)
+def create_bitfield_message(bitfield_pieces):
+    return bitfield(bitfield_pieces.to_payload())
 
-        elif peer_message.message_id == BITFIELD:
-            self.peer_decoded_message = bitfield(peer_message.payload)
 
-        elif peer_message.message_id == REQUEST:
-            piece_index = struct.unpack_from("!I", peer_message.payload, 0)[0]
-            block_offset = struct.unpack_from("!I", peer_message.payload, 4)[0]
-            block_length = struct.unpack_from("!I", peer_message.payload, 8)[0]
-            self.peer_decoded_message = request(piece_index, block_offset, block_length)
+"""
+    messages without payload are same for every peer, decoder returns the
+    single instance of these messages instead of creating them every time
+"""
+KEEP_ALIVE_MESSAGE = keep_alive()
+CHOKE_MESSAGE = choke()
+UNCHOKE_MESSAGE = unchoke()
+INTERESTED_MESSAGE = interested()
+UNINTERESTED_MESSAGE = uninterested()
+
+
+# functions decoding the message of given ID from the payload
+MESSAGE_DECODERS = {
+    CHOKE: lambda payload: CHOKE_MESSAGE,
+    UNCHOKE: lambda payload: UNCHOKE_MESSAGE,
+    INTERESTED: lambda payload: INTERESTED_MESSAGE,
+    UNINTERESTED: lambda payload: UNINTERESTED_MESSAGE,
+    HAVE: lambda payload: have(struct.unpack_from("!I", payload)[0]),
+    BITFIELD: bitfield,
+    REQUEST: request.from_payload,
+    PIECE: piece.from_payload,
+    CANCEL: cancel.from_payload,
+    # TODO : implement port
+}
 
-        elif peer_message.message_id == PIECE:
-            piece_index = struct.unpack_from("!I", peer_message.payload, 0)[0]
-            begin_offset = struct.unpack_from("!I", peer_message.payload, 4)[0]
-            block = peer_message.payload[8:]
-            self.peer_decoded_message = piece(piece_index, begin_offset, block)
 
-        # TODO : implement cancel and port
-        elif peer_message.message_id == CANCEL:
-            self.peer_decoded_message = None
+""" 
+    The class helps in decoding any general peer wire message into its 
+    appropriate message type object instance
+"""
 
-        elif peer_message.message_id == PORT:
-            self.peer_decoded_message = None
-        else:
-            self.peer_decoded_message = None
 
-        # returns the peer decoded message
-        return self.peer_decoded_message
+class peer_message_decoder:
+    __slots__ = ()
+
+    # decodes the message from the length, ID and payload of recieved frame
+    # without creating the general peer wire message in between
+    def decode_frame(self, message_length, message_id, payload):
+        # keep alive messages have no message ID and payload
+        if message_id == KEEP_ALIVE:
+            return KEEP_ALIVE_MESSAGE
+        decode_payload = MESSAGE_DECODERS.get(message_id)
+        # unknown messages and port messages are not decoded
+        if decode_payload is None:
+            return None
+        return decode_payload(payload)
+
+    # decodes the given general peer wire message instance
+    def decode(self, peer_message):
+        return self.decode_frame(
+            peer_message.message_length, peer_message.message_id, peer_message.payload
+        )
 
 
 # creating object instance of type decoder
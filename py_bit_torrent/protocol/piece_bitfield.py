@@ -0,0 +1,130 @@
+"""
+    Piece bitfield keeps track of the pieces of torrent file as one bit per
+    piece stored in a bytearray, in exactly the format of BITFIELD message
+    payload, i.e. highest bit of first byte stands for the piece index 0.
+
+    The class provides set like operations over pieces, note that bulk
+    operations (AND, ANDNOT and popcount) are done over the whole bitfield
+    at once by converting the bytes into python big integers.
+"""
+
+
+class piece_bitfield:
+
+    # initializes the bitfield with no pieces given count of pieces
+    def __init__(self, pieces_count):
+        self.pieces_count = pieces_count
+        self.bits = bytearray((pieces_count + 7) // 8)
+        # number of pieces set in the bitfield
+        self.count = 0
+
+    # creates the bitfield from BITFIELD message payload
+    @classmethod
+    def from_payload(cls, payload, pieces_count):
+        bitfield_pieces = cls(pieces_count)
+        payload = bytes(payload[: len(bitfield_pieces.bits)])
+        bitfield_pieces.bits[: len(payload)] = payload
+        bitfield_pieces.clear_spare_bits()
+        bitfield_pieces.count = bitfield_pieces.popcount()
+        return bitfield_pieces
+
+    # creates the bitfield with all the pieces
+    @classmethod
+    def full(cls, pieces_count):
+        bitfield_pieces = cls(pieces_count)
+        bitfield_pieces.bits[:] = b"\xff" * len(bitfield_pieces.bits)
+        bitfield_pieces.clear_spare_bits()
+        bitfield_pieces.count = pieces_count
+        return bitfield_pieces
+
+    # creates the bitfield given the python integer with the bits
+    @classmethod
+    def from_int(cls, value, pieces_count):
+        bitfield_pieces = cls(pieces_count)
+        bitfield_pieces.bits[:] = value.to_bytes(len(bitfield_pieces.bits), "big")
+        bitfield_pieces.count = value.bit_count()
+        return bitfield_pieces
+
+    # payload of the BITFIELD message for the bitfield
+    def to_payload(self):
+        return bytes(self.bits)
+
+    # bitfield as python integer for bulk bitwise operations
+    def to_int(self):
+        return int.from_bytes(self.bits, "big")
+
+    # spare bits at end of last byte must always be cleared
+    def clear_spare_bits(self):
+        spare_bits = 8 * len(self.bits) - self.pieces_count
+        if spare_bits:
+            self.bits[-1] &= (0xFF << spare_bits) & 0xFF
+
+    # number of pieces set in the bitfield
+    def popcount(self):
+        return self.to_int().bit_count()
+
+    # sets the given piece index in the bitfield
+    def add(self, piece_index):
+        if not 0 <= piece_index < self.pieces_count:
+            return
+        mask = 0x80 >> (piece_index & 7)
+        if not self.bits[piece_index >> 3] & mask:
+            self.bits[piece_index >> 3] |= mask
+            self.count += 1
+
+    # clears the given piece index in the bitfield
+    def discard(self, piece_index):
+        if piece_index not in self:
+            return
+        self.bits[piece_index >> 3] &= ~(0x80 >> (piece_index & 7)) & 0xFF
+        self.count -= 1
+
+    # returns true if all the pieces are set in the bitfield
+    def is_complete(self):
+        return self.count == self.pieces_count
+
+    def copy(self):
+        bitfield_pieces = piece_bitfield(self.pieces_count)
+        bitfield_pieces.bits[:] = self.bits
+        bitfield_pieces.count = self.count
+        return bitfield_pieces
+
+    # pieces set in both bitfields (AND)
+    def __and__(self, other):
+        return piece_bitfield.from_int(
+            self.to_int() & other.to_int(), self.pieces_count
+        )
+
+    # pieces set in this bitfield but not in other (ANDNOT)
+    # eg. peer.bitfield_pieces - client bitfield : pieces peer has that I lack
+    def __sub__(self, other):
+        return piece_bitfield.from_int(
+            self.to_int() & ~other.to_int(), self.pieces_count
+        )
+
+    def __contains__(self, piece_index):
+        if not 0 <= piece_index < self.pieces_count:
+            return False
+        return bool(self.bits[piece_index >> 3] & (0x80 >> (piece_index & 7)))
+
+    def __len__(self):
+        return self.count
+
+    # iterates the piece indices set in the bitfield
+    def __iter__(self):
+        for byte_index, byte_value in enumerate(self.bits):
+            if not byte_value:
+                continue
+            for bit in range(8):
+                if byte_value & (0x80 >> bit):
+                    yield byte_index * 8 + bit
+
+    def __eq__(self, other):
+        if not isinstance(other, piece_bitfield):
+            return NotImplemented
+        return self.pieces_count == other.pieces_count and self.bits == other.bits
+
+    def __str__(self):
+        return (
+            "BITFIELD : (" + str(self.count) + "/" + str(self.pieces_count) + " pieces)"
+        )
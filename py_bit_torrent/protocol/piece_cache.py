@@ -0,0 +1,74 @@
+import threading
+from collections import OrderedDict
+
+"""
+    Piece cache keeps the recently read pieces of the file in memory while
+    seeding, many leechers joining together request the same (early and
+    rare) pieces again and again, so the blocks of such hot pieces are given
+    from memory instead of reading them from the file again.
+
+    The cache holds whole pieces in least recently used order, the pieces
+    are evicted once the total size of cached pieces is over the memory
+    budget. The cache is used from the threads reading blocks, hence every
+    operation is done with the cache lock acquired
+"""
+
+
+class piece_cache:
+
+    def __init__(self, cache_size):
+        # memory budget of the cache in bytes
+        self.cache_size = cache_size
+        # total size of the pieces in cache
+        self.cached_size = 0
+        # cached pieces in least recently used order : piece index -> data
+        self.pieces = OrderedDict()
+        self.cache_lock = threading.Lock()
+
+        # counters of the cache statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # returns the cached piece data given piece index else returns None
+    def get(self, piece_index):
+        with self.cache_lock:
+            piece_data = self.pieces.get(piece_index)
+            if piece_data is None:
+                self.misses += 1
+                return None
+            self.pieces.move_to_end(piece_index)
+            self.hits += 1
+            return piece_data
+
+    # adds the piece into the cache, least recently used pieces are evicted
+    # untill the cache is within budget, pieces larger than cache are skipped
+    def put(self, piece_index, piece_data):
+        if len(piece_data) > self.cache_size:
+            return
+        with self.cache_lock:
+            self.remove_piece(piece_index)
+            self.pieces[piece_index] = piece_data
+            self.cached_size += len(piece_data)
+            while self.cached_size > self.cache_size:
+                evicted_piece = self.pieces.popitem(last=False)[1]
+                self.cached_size -= len(evicted_piece)
+                self.evictions += 1
+
+    # removes the piece from cache (eg. piece is written again)
+    def discard(self, piece_index):
+        with self.cache_lock:
+            self.remove_piece(piece_index)
+
+    # note that function must be called with cache lock acquired
+    def remove_piece(self, piece_index):
+        piece_data = self.pieces.pop(piece_index, None)
+        if piece_data is not None:
+            self.cached_size -= len(piece_data)
+
+    def __str__(self):
+        cache_log = "piece cache : [hits = " + str(self.hits)
+        cache_log += ", misses = " + str(self.misses)
+        cache_log += ", evictions = " + str(self.evictions)
+        cache_log += ", cached = " + str(self.cached_size // 2**10) + " KB]"
+        return cache_log
@@ -0,0 +1,224 @@
+import asyncio
+import random
+from collections import Counter
+
+"""
+    Piece picker maintains the availability index of pieces in the swarm,
+    i.e. how many peers have the given piece, for the pieces that client
+    is missing. The missing pieces are kept in buckets by their availability
+
+        buckets[count] = [pieces that exactly count peers in swarm have]
+
+    and every piece knows its position in the bucket, so moving a piece to
+    next/previous bucket on BITFIELD/HAVE/disconnect is O(1) (swap with the
+    last piece of bucket and pop), and selecting the N rarest pieces only
+    walks the lowest non empty buckets which is O(N + number of buckets).
+"""
+
+# position of pieces which are not in any bucket (already downloaded)
+NOT_MISSING = -1
+
+
+class piece_picker:
+
+    def __init__(self, pieces_count):
+        self.pieces_count = pieces_count
+
+        # count of peers in swarm having the piece
+        self.availability = [0] * pieces_count
+
+        # all the missing pieces are initially not available with any peer
+        self.buckets = [list(range(pieces_count))]
+        self.bucket_position = list(range(pieces_count))
+
+        # missing pieces which are available atleast with one peer
+        self.available_pieces = 0
+
+        # condition on which scheduler waits for pieces to become available
+        self.availability_condition = asyncio.Condition()
+
+    """
+        moves the missing piece from its current bucket to given bucket
+    """
+
+    def move_piece(self, piece_index, old_count, new_count):
+        # remove from old bucket by swapping with last piece of bucket
+        old_bucket = self.buckets[old_count]
+        position = self.bucket_position[piece_index]
+        last_piece = old_bucket[-1]
+        old_bucket[position] = last_piece
+        self.bucket_position[last_piece] = position
+        old_bucket.pop()
+
+        # append at the end of new bucket
+        while len(self.buckets) <= new_count:
+            self.buckets.append([])
+        new_bucket = self.buckets[new_count]
+        self.bucket_position[piece_index] = len(new_bucket)
+        new_bucket.append(piece_index)
+
+        # update count of missing pieces that can be downloaded
+        if old_count == 0:
+            self.available_pieces += 1
+        elif new_count == 0:
+            self.available_pieces -= 1
+
+    """
+        one more peer in swarm has the given piece
+    """
+
+    def increment(self, piece_index):
+        if not 0 <= piece_index < self.pieces_count:
+            return
+        count = self.availability[piece_index]
+        self.availability[piece_index] = count + 1
+        if self.bucket_position[piece_index] != NOT_MISSING:
+            self.move_piece(piece_index, count, count + 1)
+
+    """
+        one less peer in swarm has the given piece
+    """
+
+    def decrement(self, piece_index):
+        if not 0 <= piece_index < self.pieces_count:
+            return
+        count = self.availability[piece_index]
+        if count == 0:
+            return
+        self.availability[piece_index] = count - 1
+        if self.bucket_position[piece_index] != NOT_MISSING:
+            self.move_piece(piece_index, count, count - 1)
+
+    """
+        updates the availability from bitfield of peer that joined swarm
+    """
+
+    def add_peer_bitfield(self, bitfield_pieces):
+        for piece_index in bitfield_pieces:
+            self.increment(piece_index)
+
+    """
+        updates the availability from bitfield of peer that left swarm
+    """
+
+    def remove_peer_bitfield(self, bitfield_pieces):
+        for piece_index in bitfield_pieces:
+            self.decrement(piece_index)
+
+    """
+        removes the downloaded piece from the availability index
+    """
+
+    def mark_downloaded(self, piece_index):
+        position = self.bucket_position[piece_index]
+        if position == NOT_MISSING:
+            return
+        count = self.availability[piece_index]
+        bucket = self.buckets[count]
+        last_piece = bucket[-1]
+        bucket[position] = last_piece
+        self.bucket_position[last_piece] = position
+        bucket.pop()
+        self.bucket_position[piece_index] = NOT_MISSING
+        if count != 0:
+            self.available_pieces -= 1
+
+    """
+        adds the piece back in the availability index, the piece marked as
+        downloaded is missing again (eg. its data couldn't be written)
+    """
+
+    def mark_missing(self, piece_index):
+        if self.bucket_position[piece_index] != NOT_MISSING:
+            return
+        count = self.availability[piece_index]
+        while len(self.buckets) <= count:
+            self.buckets.append([])
+        bucket = self.buckets[count]
+        self.bucket_position[piece_index] = len(bucket)
+        bucket.append(piece_index)
+        if count != 0:
+            self.available_pieces += 1
+
+    """
+        returns true if piece is not yet downloaded by the client
+    """
+
+    def is_missing(self, piece_index):
+        return self.bucket_position[piece_index] != NOT_MISSING
+
+    """
+        returns true if any missing piece is available in the swarm
+    """
+
+    def has_available_pieces(self):
+        return self.available_pieces > 0
+
+    """
+        function returns atmost given count of rarest missing pieces that
+        are available in the swarm, the pieces given in exclude and pieces
+        for which the piece_filter returns false are skipped.
+        Among the pieces of same rarity the pieces are selected starting
+        from a random position in the bucket.
+    """
+
+    def rarest_pieces(self, pieces_count, exclude=(), piece_filter=None):
+        rarest_pieces = []
+        for bucket in self.buckets[1:]:
+            bucket_length = len(bucket)
+            if bucket_length == 0:
+                continue
+            start = random.randrange(bucket_length)
+            for i in range(bucket_length):
+                piece_index = bucket[(start + i) % bucket_length]
+                if piece_index in exclude:
+                    continue
+                if piece_filter and not piece_filter(piece_index):
+                    continue
+                rarest_pieces.append(piece_index)
+                if len(rarest_pieces) == pieces_count:
+                    return rarest_pieces
+        return rarest_pieces
+
+    """
+        function returns the availability histogram of the swarm as a
+        dictionary : count of peers -> number of pieces with that count
+        either for all the pieces or only for the pieces client is missing
+    """
+
+    def availability_histogram(self, missing_only=False):
+        if missing_only:
+            return {
+                count: len(bucket)
+                for count, bucket in enumerate(self.buckets)
+                if len(bucket) != 0
+            }
+        return dict(sorted(Counter(self.availability).items()))
+
+    """
+        coroutine waits untill any missing piece is available in the swarm
+    """
+
+    async def wait_for_available_pieces(self):
+        async with self.availability_condition:
+            await self.availability_condition.wait_for(self.has_available_pieces)
+
+    """
+        coroutine waits untill availability of pieces changes in the swarm
+        or the given timeout in seconds expires
+    """
+
+    async def wait_for_availability_change(self, timeout):
+        async with self.availability_condition:
+            try:
+                await asyncio.wait_for(self.availability_condition.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    """
+        coroutine wakes up the coroutines waiting for the availability
+    """
+
+    async def notify_availability(self):
+        async with self.availability_condition:
+            self.availability_condition.notify_all()
@@ -0,0 +1,122 @@
+import asyncio
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+"""
+    Piece verifier validates the downloaded pieces against the SHA1 hashes
+    of the torrent file in a dedicated pool of threads, hashlib releases the
+    GIL while hashing large buffers so the pieces are hashed in parallel on
+    all the cores while the event loop keeps reading from the peers.
+
+    The queue of pieces waiting for verification is bounded, submitting a
+    piece waits for a free slot, hence the pieces (and memory) held by the
+    verifier are limited when hashing can't keep up with the downloads.
+    Once the piece is verified the completion callback is awaited on the
+    event loop with the result, to mark the piece done or request it again
+"""
+
+# maximum pieces waiting for (or being) verified per thread of the pool
+PENDING_PIECES_PER_THREAD = 2
+
+
+class piece_verifier:
+
+    def __init__(self, torrent, threads_count=None):
+        self.torrent = torrent
+        # hashing threads, by default one for each core
+        self.threads_count = threads_count or os.cpu_count() or 1
+        self.executor = ThreadPoolExecutor(
+            self.threads_count, thread_name_prefix="piece_verifier"
+        )
+        # free slots in the queue of pieces waiting for verification
+        self.pending_slots = asyncio.Semaphore(
+            self.threads_count * PENDING_PIECES_PER_THREAD
+        )
+        # verifications that are not yet completed
+        self.pending_tasks = set()
+
+    """
+        function validates the length and hash of the piece, note that the
+        function runs in the threads of pool and never on event loop
+    """
+
+    def validate_piece(self, piece_index, piece_data):
+        # compare the length of the piece recieved
+        if len(piece_data) != self.torrent.get_piece_length(piece_index):
+            return False
+        return self.validate_digest(piece_index, hashlib.sha1(piece_data).digest())
+
+    # compare the pieces hash with torrent file piece hash
+    def validate_digest(self, piece_index, piece_digest):
+        index = piece_index * 20
+        torrent_piece_hash = self.torrent.torrent_metadata.pieces[index : index + 20]
+        return piece_digest == torrent_piece_hash
+
+    """
+        function queues the piece for verification, waits only if the queue
+        is full, the callback is awaited with the result of verification.
+        The pieces hashed while downloading (digest given) are not hashed
+        again, only the digest is compared hence they never wait in queue
+    """
+
+    async def submit(self, piece_index, piece_data, callback, piece_digest=None):
+        if piece_digest is None:
+            await self.pending_slots.acquire()
+        verify_task = asyncio.create_task(
+            self.verify_piece(piece_index, piece_data, callback, piece_digest)
+        )
+        self.pending_tasks.add(verify_task)
+        verify_task.add_done_callback(self.pending_tasks.discard)
+
+    async def verify_piece(self, piece_index, piece_data, callback, piece_digest):
+        if piece_digest is not None:
+            is_piece_valid = self.validate_digest(piece_index, piece_digest)
+        else:
+            try:
+                is_piece_valid = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.validate_piece, piece_index, piece_data
+                )
+            finally:
+                self.pending_slots.release()
+        await callback(is_piece_valid)
+
+    """
+        function checks all the pieces already in the files against their
+        hashes (eg. when download is restarted without trusted resume file)
+        pieces are read and hashed in the threads of pool, atmost as many
+        pieces as the queue can hold are checked at once
+        function returns the indexes of the valid pieces
+    """
+
+    async def recheck_pieces(self, file_handler):
+        event_loop = asyncio.get_running_loop()
+        piece_indexes = iter(range(self.torrent.pieces_count))
+        valid_pieces = []
+
+        # every worker checks the next piece untill all pieces are checked
+        async def recheck_worker():
+            for piece_index in piece_indexes:
+                if await event_loop.run_in_executor(
+                    self.executor, self.validate_file_piece, file_handler, piece_index
+                ):
+                    valid_pieces.append(piece_index)
+
+        workers_count = self.threads_count * PENDING_PIECES_PER_THREAD
+        await asyncio.gather(*[recheck_worker() for _ in range(workers_count)])
+        return sorted(valid_pieces)
+
+    # reads the piece from the file and validates it
+    def validate_file_piece(self, file_handler, piece_index):
+        return self.validate_piece(piece_index, file_handler.read_piece(piece_index))
+
+    # waits untill all the submitted pieces are verified
+    async def join(self):
+        await asyncio.gather(*self.pending_tasks)
+
+    # cancels the pending verifications and stops the threads of pool
+    async def close(self):
+        for verify_task in self.pending_tasks:
+            verify_task.cancel()
+        await asyncio.gather(*self.pending_tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False, cancel_futures=True)
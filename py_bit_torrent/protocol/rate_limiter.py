@@ -0,0 +1,90 @@
+import asyncio
+import sys
+import time
+
+"""
+    Rate limiter limits the rate at which the data is recieved from and sent
+    to the peers using token buckets. The bucket is refilled continuously at
+    the given rate (tokens are computed from the time elapsed), the data of
+    any size is allowed by taking the tokens in advance (bucket goes into
+    debt) and the next data waits untill the debt is refilled, thus the long
+    term rate is exact irrespective of the size of the data.
+
+    Every peer has its own limiter whose buckets are the peer bucket and the
+    global bucket shared by all the peers, the data waits for both of them
+"""
+
+# seconds of tokens the bucket can save while data is not being transferred
+REFILL_INTERVAL = 0.05
+
+# minimum tokens the bucket can save (a fraction of block message)
+MINIMUM_BURST = 2**12
+
+
+class token_bucket:
+
+    def __init__(self, rate, clock=time.monotonic):
+        # rate in bytes per second
+        self.rate = rate
+        # maximum tokens saved while the bucket is not used
+        self.burst = max(int(rate * REFILL_INTERVAL), MINIMUM_BURST)
+        self.clock = clock
+        self.tokens = self.burst
+        self.refill_time = clock()
+
+    # adds the tokens for the time elapsed since the last refill
+    def refill(self):
+        current_time = self.clock()
+        self.tokens += (current_time - self.refill_time) * self.rate
+        self.tokens = min(self.tokens, self.burst)
+        self.refill_time = current_time
+
+    """
+        function takes the tokens for the data of given size and returns the
+        seconds for which the data must wait untill the bucket is out of debt
+    """
+
+    def consume(self, data_size):
+        self.refill()
+        self.tokens -= data_size
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+
+class rate_limiter:
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+
+    # takes tokens from all the buckets and returns the seconds to wait
+    def consume(self, data_size):
+        return max(bucket.consume(data_size) for bucket in self.buckets)
+
+    # waits untill the data of given size can be transferred within limits
+    async def acquire(self, data_size):
+        delay = self.consume(data_size)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    # maximum data that must be recieved from socket at once
+    def read_size(self):
+        return min(bucket.burst for bucket in self.buckets)
+
+
+"""
+    function creates the limiter for the given rate in KB/s along with the
+    buckets of the parent limiter, returns None if there is no limit at all
+    (rate given by client request is sys.maxsize when it is not limited)
+"""
+
+
+def create_rate_limiter(rate, parent_limiter=None):
+    buckets = []
+    if rate is not None and rate < sys.maxsize:
+        buckets.append(token_bucket(rate * 2**10))
+    if parent_limiter is not None:
+        buckets.extend(parent_limiter.buckets)
+    if not buckets:
+        return None
+    return rate_limiter(buckets)
@@ -0,0 +1,93 @@
+import math
+import time
+
+"""
+    Rate meter measures the rate of data transferred (bytes per second) as an
+    exponentially weighted moving average over time, i.e. the data recently
+    transferred counts more than the data transferred long time ago and the
+    data older than few time constants is practically forgotten
+
+        rate = sum of (data size * e ^ -(age of data / time constant))
+               ----------------------------------------------------------
+                                  time constant
+
+    The decayed sum is updated in O(1) for every block, hence the meters are
+    updated on every block recieved or sent. Meter of a peer updates also
+    the meter of its parent (the meter of swarm), so the rates of peers and
+    the rate of the whole torrent are measured from the same blocks
+"""
+
+# seconds over which the rate is averaged
+RATE_TIME_CONSTANT = 5
+
+# rate is never measured over less than a second (first blocks)
+MINIMUM_ELAPSED_TIME = 1
+
+
+class rate_meter:
+
+    def __init__(self, parent_meter=None, time_constant=RATE_TIME_CONSTANT):
+        self.parent_meter = parent_meter
+        self.time_constant = time_constant
+        # decayed sum of data at the time of last update
+        self.decayed_rate = 0.0
+        self.update_time = None
+        # time of first update and total data transferred
+        self.start_time = None
+        self.total_bytes = 0
+
+    # updates the meter with the data of given size transferred now
+    def update(self, data_size, current_time=None):
+        if current_time is None:
+            current_time = time.monotonic()
+        if self.start_time is None:
+            self.start_time = current_time
+            self.update_time = current_time
+        self.decayed_rate = self.decay(current_time) + data_size / self.time_constant
+        self.update_time = current_time
+        self.total_bytes += data_size
+        if self.parent_meter is not None:
+            self.parent_meter.update(data_size, current_time)
+
+    # decayed sum of data at the given time
+    def decay(self, current_time):
+        elapsed_time = current_time - self.update_time
+        return self.decayed_rate * math.exp(-elapsed_time / self.time_constant)
+
+    # elapsed seconds since first update
+    def elapsed_time(self, current_time):
+        return max(current_time - self.start_time, MINIMUM_ELAPSED_TIME)
+
+    """
+        function returns the current rate in bytes per second, the rate of
+        meter started recently is corrected for the time before it started
+        (which would otherwise count as time without any data transferred)
+    """
+
+    def rate(self, current_time=None):
+        if self.start_time is None:
+            return 0.0
+        if current_time is None:
+            current_time = time.monotonic()
+        elapsed_time = self.elapsed_time(current_time)
+        correction = 1 - math.exp(-elapsed_time / self.time_constant)
+        return self.decay(current_time) / correction
+
+    # average rate in bytes per second since the first update
+    def average_rate(self, current_time=None):
+        if self.start_time is None:
+            return 0.0
+        if current_time is None:
+            current_time = time.monotonic()
+        return self.total_bytes / self.elapsed_time(current_time)
+
+    """
+        function returns the estimated seconds to transfer the data of given
+        size at the current rate, None if nothing is being transferred
+    """
+
+    def remaining_time(self, data_size, current_time=None):
+        current_rate = self.rate(current_time)
+        if current_rate == 0:
+            return None
+        return data_size / current_rate
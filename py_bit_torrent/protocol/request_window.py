@@ -0,0 +1,158 @@
+import math
+import time
+
+"""
+    Request window keeps track of the block requests that client has sent to
+    a peer and not yet got the piece response for. Requests are pipelined so
+    that many blocks are on the link at any time instead of one block per
+    round trip, and the responses are matched back to requests in any order.
+
+    The size of window is adapted from measured round trip time and download
+    throughput of the peer in spirit of the bandwidth-delay product
+        window size = bdp factor * throughput * base RTT / block length
+"""
+
+# default maximum number of outstanding requests per peer
+MAX_OUTSTANDING_REQUESTS = 64
+
+# minimum number of outstanding requests per peer
+MIN_OUTSTANDING_REQUESTS = 2
+
+
+class request_window:
+
+    def __init__(self, block_length, max_size=MAX_OUTSTANDING_REQUESTS):
+        # length of the block requested
+        self.block_length = block_length
+
+        # bounds on the number of outstanding requests
+        self.min_size = min(MIN_OUTSTANDING_REQUESTS, max_size)
+        self.max_size = max_size
+
+        # current window size, starts small untill first measurements
+        self.size = min(4, max_size)
+
+        # outstanding requests : (piece index, block offset) -> (length, time)
+        self.outstanding = {}
+
+        # smoothed and minimum round trip time observed in seconds
+        self.rtt = None
+        self.base_rtt = None
+
+        # smoothed download throughput in bytes per second
+        self.throughput = None
+
+        # bytes recieved in current throughput measurement interval
+        self.interval_bytes = 0
+        self.interval_start = None
+
+        # weight of new sample in the moving averages
+        self.alpha = 0.25
+
+        # window holds twice the bandwidth-delay product so that window
+        # can grow while it is the limiting factor of throughput
+        self.bdp_factor = 2
+
+    """
+        function returns true if more requests can be sent to peer
+    """
+
+    def has_room(self):
+        return len(self.outstanding) < self.size
+
+    """
+        function records the block request that is sent to the peer
+    """
+
+    def add(self, piece_index, block_offset, block_length, now=None):
+        if now is None:
+            now = time.time()
+        self.outstanding[(piece_index, block_offset)] = (block_length, now)
+        if self.interval_start is None:
+            self.interval_start = now
+
+    """
+        function matches the piece response with outstanding requests
+        function returns the time request was sent if the block was
+        requested else returns None for unsolicited blocks
+    """
+
+    def match(self, piece_index, block_offset, block_length, now=None):
+        key = (piece_index, block_offset)
+        outstanding_request = self.outstanding.get(key)
+        if outstanding_request is None or outstanding_request[0] != block_length:
+            return None
+        del self.outstanding[key]
+
+        request_time = outstanding_request[1]
+        if now is None:
+            now = time.time()
+        self.update_rtt(now - request_time)
+        self.update_throughput(block_length, now)
+        return request_time
+
+    """
+        function removes the given outstanding request without any response
+    """
+
+    def remove(self, piece_index, block_offset):
+        return self.outstanding.pop((piece_index, block_offset), None) is not None
+
+    """
+        function drops all the outstanding requests (eg. peer choked client)
+    """
+
+    def clear(self):
+        self.outstanding.clear()
+        self.interval_bytes = 0
+        self.interval_start = None
+
+    """
+        updates smoothed round trip time given new round trip sample
+    """
+
+    def update_rtt(self, rtt_sample):
+        if self.rtt is None:
+            self.rtt = rtt_sample
+            self.base_rtt = rtt_sample
+        else:
+            self.rtt += self.alpha * (rtt_sample - self.rtt)
+            self.base_rtt = min(self.base_rtt, rtt_sample)
+
+    """
+        updates the throughput once every measurement interval (atleast
+        one RTT long) and resizes the window from the new measurement
+    """
+
+    def update_throughput(self, block_length, now):
+        self.interval_bytes += block_length
+        interval = now - self.interval_start
+        if interval < max(self.rtt, 0.01):
+            return
+        throughput_sample = self.interval_bytes / interval
+        if self.throughput is None:
+            self.throughput = throughput_sample
+        else:
+            self.throughput += self.alpha * (throughput_sample - self.throughput)
+        self.interval_bytes = 0
+        self.interval_start = now
+        self.resize()
+
+    """
+        window size from the bandwidth-delay product of peer connection
+    """
+
+    def resize(self):
+        bdp = self.throughput * self.base_rtt / self.block_length
+        size = math.ceil(self.bdp_factor * bdp)
+        self.size = max(self.min_size, min(self.max_size, size))
+
+    def __len__(self):
+        return len(self.outstanding)
+
+    def __str__(self):
+        window_log = "REQUEST WINDOW : (size : " + str(self.size) + ", "
+        window_log += "outstanding : " + str(len(self.outstanding)) + ", "
+        window_log += "rtt : " + str(self.rtt) + ", "
+        window_log += "throughput : " + str(self.throughput) + ")"
+        return window_log
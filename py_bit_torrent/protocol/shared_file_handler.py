@@ -1,5 +1,30 @@
+import mmap
 import os
-from threading import *
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+
+from py_bit_torrent.protocol.piece_cache import piece_cache
+
+# file allocation modes before downloading the file
+ALLOCATION_SPARSE   = "sparse"  # file size is set, blocks allocated on writes
+ALLOCATION_FULL     = "full"    # all the blocks of file allocated on disk
+ALLOCATION_NONE     = "none"    # file grows as the pieces are written
+ALLOCATION_MODES    = (ALLOCATION_SPARSE, ALLOCATION_FULL, ALLOCATION_NONE)
+
+# storage backends for reading/writing the file
+STORAGE_FILE        = "file"    # positional reads/writes on file descriptor
+STORAGE_MMAP        = "mmap"    # reads/writes in memory mapping of file
+STORAGE_BACKENDS    = (STORAGE_FILE, STORAGE_MMAP)
+
+# maximum files of multi file torrent kept open at the same time
+MAX_OPEN_FILES      = 64
+
+# maximum buffers written by one vectored write system call
+if hasattr(os, "sysconf") and "SC_IOV_MAX" in os.sysconf_names:
+    IOV_MAX         = os.sysconf("SC_IOV_MAX")
+else:
+    IOV_MAX         = 16
 
 """
     General file input and output class, provides read and write data options
@@ -19,13 +44,62 @@ class file_io():
     def read(self, buffer_size):
         byte_stream = os.read(self.file_descriptor, buffer_size)
         return byte_stream
+
+    # writes the bitstream at given position in file without moving the
+    # file descriptor, hence it can be called concurrently without any lock
+    def pwrite(self, byte_stream, file_position):
+        byte_stream = memoryview(byte_stream)
+        while len(byte_stream) > 0:
+            written = os.pwrite(self.file_descriptor, byte_stream, file_position)
+            byte_stream = byte_stream[written:]
+            file_position += written
+
+    # writes all the bitstreams one after other from the given position in
+    # file with vectored writes (pwritev), i.e. one system call for many
+    # buffers, falls back to pwrite if platform doesn't have pwritev
+    def pwritev(self, byte_streams, file_position):
+        if not hasattr(os, "pwritev"):
+            for byte_stream in byte_streams:
+                self.pwrite(byte_stream, file_position)
+                file_position += len(byte_stream)
+            return
+        byte_streams = [memoryview(byte_stream) for byte_stream in byte_streams]
+        stream_index = 0
+        while stream_index < len(byte_streams):
+            written = os.pwritev(self.file_descriptor,
+                                 byte_streams[stream_index : stream_index + IOV_MAX],
+                                 file_position)
+            file_position += written
+            # skip the bitstreams written completely by system call
+            while stream_index < len(byte_streams) and \
+                    written >= len(byte_streams[stream_index]):
+                written -= len(byte_streams[stream_index])
+                stream_index += 1
+            # bitstream written partially is written from where write stopped
+            if written:
+                byte_streams[stream_index] = byte_streams[stream_index][written:]
+
+    # reads given size of data from the given position in file without
+    # moving the file descriptor, hence it can be called concurrently
+    def pread(self, buffer_size, file_position):
+        byte_stream = os.pread(self.file_descriptor, buffer_size, file_position)
+        # short reads happen only at the end of file
+        while 0 < len(byte_stream) < buffer_size:
+            remaining_data = os.pread(self.file_descriptor,
+                                      buffer_size - len(byte_stream),
+                                      file_position + len(byte_stream))
+            if not remaining_data:
+                break
+            byte_stream += remaining_data
+        return byte_stream
     
-    # writes file with all values to 0(null) given the size of file
-    def write_null_values(self, data_size):
+    # writes file with all values to 0(null) given the size of data to be
+    # written and the position from where data is written (start of file)
+    def write_null_values(self, data_size, file_position=0):
         # maximum write buffer
         max_write_buffer = (2 ** 14)
         # move the file descriptor position
-        self.move_descriptor_position(0)
+        self.move_descriptor_position(file_position)
         while(data_size > 0):
             if data_size >= max_write_buffer:
                 data_size = data_size - max_write_buffer
@@ -35,17 +109,86 @@ class file_io():
                 data_size = 0
             self.write(data)
         
+    # sets the size of file without writing any data, the file system
+    # allocates the blocks of sparse file only when data is written
+    def truncate(self, file_size):
+        os.ftruncate(self.file_descriptor, file_size)
+
+    # allocates all the blocks of file on disk without writing any data
+    # function returns false if the platform / file system can't allocate
+    def allocate(self, file_size):
+        if not hasattr(os, "posix_fallocate"):
+            return False
+        try:
+            os.posix_fallocate(self.file_descriptor, 0, file_size)
+        except OSError:
+            return False
+        return True
+
     # moves the file descripter to the given index position from start of file
     def move_descriptor_position(self, index_position):
         os.lseek(self.file_descriptor, index_position, os.SEEK_SET)
 
+    # size of the file in bytes
+    def size(self):
+        return os.fstat(self.file_descriptor).st_size
+
+    # advises the kernel that the data of given size from given position
+    # will be read soon, so the kernel starts reading it ahead in page cache
+    def advise_willneed(self, file_position, data_size):
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(self.file_descriptor, file_position, data_size,
+                             os.POSIX_FADV_WILLNEED)
+
+    # file descriptor of file (eg. for sending data with sendfile)
+    def fileno(self):
+        return self.file_descriptor
+
+    # closes the file descriptor
+    def close(self):
+        os.close(self.file_descriptor)
+
+
+"""
+    function allocates the file of given size on disk given the allocation
+    mode, no data already in the file is overwritten and file is truncated
+    only if its size is not correct (truncate updates modification time)
+"""
+def allocate_file(download_file, file_size, allocation_mode):
+    if allocation_mode == ALLOCATION_SPARSE:
+        if download_file.size() != file_size:
+            download_file.truncate(file_size)
+    elif allocation_mode == ALLOCATION_FULL:
+        # initialize the rest of file with the null values if the file
+        # system can't allocate the blocks by itself
+        existing_size = download_file.size()
+        if existing_size < file_size and not download_file.allocate(file_size):
+            download_file.write_null_values(file_size - existing_size,
+                                            existing_size)
+    elif allocation_mode != ALLOCATION_NONE:
+        raise ValueError("unknown allocation mode " + str(allocation_mode))
+
+
+"""
+    function creates the piece cache with the memory budget (in MB) requested
+    by the client, returns None if client hasn't requested the piece cache
+"""
+def create_piece_cache(torrent):
+    cache_size = torrent.client_request.get("piece cache size", 0)
+    if not cache_size:
+        return None
+    return piece_cache(int(cache_size) * (2 ** 20))
+
 
 """
     The peers use this class object to write pieces downloaded into file in 
     any order resulting into forming of orignal file using Bittorrent's 
     P2P architecture. Simply class helps in writing/reading pieces in file 
+
+    Note that reads and writes are positional (pread/pwrite) on the shared
+    file descriptor, there is no global lock, so the peers can read/write
+    different pieces in parallel (eg. from the threads of asyncio.to_thread)
 """
-# TODO : case of multiple torrent files initialization needs to be handled
 class torrent_shared_file_handler():
     
     # initialize the class with torrent and path where file needs to be downloaded
@@ -58,17 +201,37 @@ class torrent_shared_file_handler():
         # piece size in bytes of torrent file data
         self.piece_size = torrent.torrent_metadata.piece_length
 
-        # initlizes the file input/output object instance 
+        # opens the files in which the torrent data is stored
+        self.open_files()
+
+        # cache of the recently read pieces while seeding (if requested)
+        self.piece_cache = create_piece_cache(torrent)
+
+    # initlizes the file input/output object instance 
+    def open_files(self):
         self.download_file = file_io(self.download_file_path)
-        
-        # shared file lock
-        self.shared_file_lock = Lock()
+
+    # closes the files once the download / seeding is finished
+    def close(self):
+        self.download_file.close()
     
-    # initialize the file before downloading 
-    # function writes all null values in the file 
-    def initialize_for_download(self):
-        # initialize the file with all the null values 
-        self.download_file.write_null_values(self.file_size)
+    # initialize the file before downloading given the allocation mode
+    # (sparse / full / none), by default mode requested by client is used
+    # note that data already in the file is kept (download is resumed)
+    def initialize_for_download(self, allocation_mode=None):
+        if allocation_mode is None:
+            allocation_mode = self.torrent.client_request.get("allocation mode",
+                                                              ALLOCATION_SPARSE)
+        allocate_file(self.download_file, self.file_size, allocation_mode)
+
+    # paths of all the files in which the torrent data is stored
+    def get_file_paths(self):
+        return [self.download_file_path]
+
+    # makes sure the written data is in files, so the size and modification
+    # time of files are final (eg. before saving the resume file)
+    def flush(self):
+        pass
    
 
     # calculates the position index in file given piece index and block offset
@@ -76,15 +239,6 @@ class torrent_shared_file_handler():
         return piece_index * self.piece_size + block_offset
    
 
-    # initialize the file descriptor given the piece index and block offset
-    def initalize_file_descriptor(self, piece_index, block_offset):
-        
-        # calulcate the position in file using piece index and offset
-        file_descriptor_position = self.calculate_file_position(piece_index, block_offset)
-
-        # move the file descripter to the desired location 
-        self.download_file.move_descriptor_position(file_descriptor_position)
-
 
     """
         function helps in writing a block from piece message recieved
@@ -94,36 +248,522 @@ class torrent_shared_file_handler():
         piece_index     = piece_message.piece_index
         block_offset    = piece_message.block_offset
         data_block      = piece_message.block
-        
-        self.shared_file_lock.acquire()
 
-        # initialize the file descriptor at given piece index and block offset
-        self.initalize_file_descriptor(piece_index, block_offset)
+        # calulcate the position in file using piece index and offset
+        file_position = self.calculate_file_position(piece_index, block_offset)
 
         # write the block of data into the file
-        self.download_file.write(data_block)
+        self.download_file.pwrite(data_block, file_position)
+        if self.piece_cache is not None:
+            self.piece_cache.discard(piece_index)
+
+
+    """
+        function helps in writing the complete piece that is validated
+    """
+    def write_piece(self, piece_index, piece_data):
+        # calulcate the position in file of the start of piece
+        file_position = self.calculate_file_position(piece_index, 0)
 
-        self.shared_file_lock.release()
+        # write the piece data into the file
+        self.download_file.pwrite(piece_data, file_position)
+        if self.piece_cache is not None:
+            self.piece_cache.discard(piece_index)
+
+
+    """
+        function helps in writing the adjacent validated pieces starting from
+        the given piece index, pieces are written with one vectored write
+    """
+    def write_pieces(self, piece_index, pieces_data):
+        file_position = self.calculate_file_position(piece_index, 0)
+        self.download_file.pwritev(pieces_data, file_position)
+        if self.piece_cache is not None:
+            for written_piece in range(piece_index, piece_index + len(pieces_data)):
+                self.piece_cache.discard(written_piece)
 
 
     """
         function helps in reading a block for file given piece index and block offset
-        function returns the block of bytes class data that is read
+        function returns the block of data that is read, the blocks are read
+        from the piece cache if the client has requested the piece cache
     """
     def read_block(self, piece_index, block_offset, block_size):
-            
-        self.shared_file_lock.acquire()
-        
-        # initialize the file descriptor at given piece index and block offset
-        self.initalize_file_descriptor(piece_index, block_offset)
-        
-        # read the block of data into the file
-        data_block  = self.download_file.read(block_size)
+        if self.piece_cache is not None:
+            return self.read_cached_block(piece_index, block_offset, block_size)
+        return self.read_file_block(piece_index, block_offset, block_size)
+
+
+    """
+        function reads the block from file given piece index and block offset
+        function returns the block of bytes class data that is read
+    """
+    def read_file_block(self, piece_index, block_offset, block_size):
+
+        # calulcate the position in file using piece index and offset
+        file_position = self.calculate_file_position(piece_index, block_offset)
+
+        # read the block of data from the file
+        data_block  = self.download_file.pread(block_size, file_position)
 
-        self.shared_file_lock.release()
-        
         # return the read block of data
         return data_block
+
+
+    """
+        function reads the block from the cached piece, on cache miss the
+        complete piece is read ahead from the file and added in the cache
+        function returns the block as memoryview of the cached piece
+    """
+    def read_cached_block(self, piece_index, block_offset, block_size):
+        piece_data = self.piece_cache.get(piece_index)
+        if piece_data is None:
+            piece_length = self.torrent.get_piece_length(piece_index)
+            self.advise_piece(piece_index, piece_length)
+            piece_data = self.read_file_block(piece_index, 0, piece_length)
+            self.piece_cache.put(piece_index, piece_data)
+        return memoryview(piece_data)[block_offset : block_offset + block_size]
+
+
+    # advises the kernel to read ahead the complete piece from the file
+    def advise_piece(self, piece_index, piece_length):
+        file_position = self.calculate_file_position(piece_index, 0)
+        self.download_file.advise_willneed(file_position, piece_length)
+
+
+    """
+        function helps in reading the complete piece given the piece index
+        note that pieces read are never added in the piece cache
+    """
+    def read_piece(self, piece_index):
+        piece_length = self.torrent.get_piece_length(piece_index)
+        return self.read_file_block(piece_index, 0, piece_length)
+
+
+    """
+        function returns the (file, file position) of the block so the block
+        can be sent to peer directly from the file (sendfile) without reading
+        it, function returns None if the block must be read using read_block
+        (eg. blocks are given from the piece cache)
+    """
+    def block_file_span(self, piece_index, block_offset, block_size):
+        if self.piece_cache is not None:
+            return None
+        file_position = self.calculate_file_position(piece_index, block_offset)
+        return self.download_file, file_position
+
+
+"""
+    Memory mapped storage backend of the shared file handler, the blocks are
+    written directly into the mapping of file and blocks read for seeding
+    (and pieces read for hashing) are memoryviews of the mapping, hence no
+    copy of data is made in user space.
+
+    The file is mapped once it has its complete size, i.e. on creation for
+    seeding and after initialization for downloading. The handler falls back
+    to positional reads/writes of the shared file handler untill the file is
+    mapped or if the file can't be mapped (eg. file is too large for the
+    address space of the process)
+"""
+class torrent_mmap_file_handler(torrent_shared_file_handler):
+
+    def __init__(self, download_file_path, torrent):
+        super().__init__(download_file_path, torrent)
+        # memory mapping of the file and memoryview of the mapping
+        self.file_mapping   = None
+        self.file_view      = None
+        self.map_file()
+
+    # function maps the complete file into memory if possible
+    # function returns true if the file is mapped else returns false
+    def map_file(self):
+        if self.file_mapping is not None:
+            return True
+        # empty files can't be mapped (size 0 would map the whole file)
+        if self.file_size == 0:
+            return False
+        if self.download_file.size() < self.file_size:
+            return False
+        # files larger than the address space of process (eg. on 32-bit
+        # builds) can't be mapped, mmap fails for such files with OSError
+        # (no memory for the mapping) or OverflowError / ValueError (size
+        # doesn't fit in size_t)
+        try:
+            self.file_mapping = mmap.mmap(self.download_file.file_descriptor,
+                                          self.file_size)
+        except (OSError, OverflowError, ValueError):
+            return False
+        self.file_view = memoryview(self.file_mapping)
+        return True
+
+    # initialize the file before downloading, note that mapping needs the
+    # file of complete size, hence file is made sparse if not allocated
+    def initialize_for_download(self, allocation_mode=None):
+        super().initialize_for_download(allocation_mode)
+        if self.download_file.size() < self.file_size:
+            self.download_file.truncate(self.file_size)
+        self.map_file()
+
+    # writes the dirty pages of mapping into the file
+    def flush(self):
+        if self.file_mapping is not None:
+            self.file_mapping.flush()
+
+    # unmaps the file before closing it, note that mapping can't be closed
+    # while any block read from it is still in use, such mapping is closed
+    # once the last block is released
+    def close(self):
+        if self.file_mapping is not None:
+            self.file_view.release()
+            try:
+                self.file_mapping.close()
+            except BufferError:
+                pass
+            self.file_view    = None
+            self.file_mapping = None
+        super().close()
+
+
+    """
+        function helps in writing a block from piece message recieved
+    """
+    def write_block(self, piece_message):
+        if self.file_mapping is None:
+            return super().write_block(piece_message)
+        file_position = self.calculate_file_position(piece_message.piece_index,
+                                                     piece_message.block_offset)
+        block_end = file_position + len(piece_message.block)
+        self.file_view[file_position : block_end] = piece_message.block
+
+
+    """
+        function helps in writing the complete piece that is validated
+    """
+    def write_piece(self, piece_index, piece_data):
+        if self.file_mapping is None:
+            return super().write_piece(piece_index, piece_data)
+        file_position = self.calculate_file_position(piece_index, 0)
+        piece_end = file_position + len(piece_data)
+        self.file_view[file_position : piece_end] = piece_data
+
+
+    """
+        function helps in writing the adjacent validated pieces, pieces are
+        copied into the mapping one after other
+    """
+    def write_pieces(self, piece_index, pieces_data):
+        if self.file_mapping is None:
+            return super().write_pieces(piece_index, pieces_data)
+        for piece_data in pieces_data:
+            self.write_piece(piece_index, piece_data)
+            piece_index += 1
+
+
+    """
+        function helps in reading a block for file given piece index and block offset
+        blocks of the mapping are never cached since they are already given
+        from the page cache without any copy
+    """
+    def read_block(self, piece_index, block_offset, block_size):
+        if self.file_mapping is None:
+            return super().read_block(piece_index, block_offset, block_size)
+        return self.read_file_block(piece_index, block_offset, block_size)
+
+
+    """
+        function reads the block from file given piece index and block offset
+        function returns the block as memoryview of the mapping (no copy)
+    """
+    def read_file_block(self, piece_index, block_offset, block_size):
+        if self.file_mapping is None:
+            return super().read_file_block(piece_index, block_offset, block_size)
+        file_position = self.calculate_file_position(piece_index, block_offset)
+        block_end = min(file_position + block_size, self.file_size)
+        return self.file_view[file_position : block_end]
+
+
+    """
+        function returns None untill the file is mapped, blocks read from
+        the mapping are already sent without any copy in user space
+    """
+    def block_file_span(self, piece_index, block_offset, block_size):
+        if self.file_mapping is None:
+            return super().block_file_span(piece_index, block_offset, block_size)
+        return None
+
+
+"""
+    The files of multi file torrent are concatenated (in the order given in
+    torrent file) to form the torrent data that is divided into pieces. The
+    index maps the piece/block into (file index, file position, length)
+    spans of the files it covers, the spans of every piece are found once
+    using bisect over the cumulative offsets of the files in torrent data
+"""
+class file_span_index():
+
+    def __init__(self, file_lengths, piece_length, torrent_size):
+        # start offset of each file in the torrent data
+        self.file_offsets = []
+        file_offset = 0
+        for file_length in file_lengths:
+            self.file_offsets.append(file_offset)
+            file_offset += file_length
+        self.file_lengths = list(file_lengths)
+        self.torrent_size = torrent_size
+
+        # spans of files covered by each piece
+        self.piece_spans = []
+        for piece_position in range(0, torrent_size, piece_length):
+            piece_size = min(piece_length, torrent_size - piece_position)
+            self.piece_spans.append(self.locate(piece_position, piece_size))
+
+    # spans of files covering the data of given size at given position in
+    # torrent data, note that empty files never have any span
+    def locate(self, torrent_position, data_size):
+        spans = []
+        file_index = bisect_right(self.file_offsets, torrent_position) - 1
+        while data_size > 0 and file_index < len(self.file_lengths):
+            file_position = torrent_position - self.file_offsets[file_index]
+            span_length = min(self.file_lengths[file_index] - file_position,
+                              data_size)
+            if span_length > 0:
+                spans.append((file_index, file_position, span_length))
+                torrent_position += span_length
+                data_size -= span_length
+            file_index += 1
+        return spans
+
+    # spans of files covered by the block given piece index and block offset
+    def block_spans(self, piece_index, block_offset, block_size):
+        spans = []
+        for file_index, file_position, span_length in self.piece_spans[piece_index]:
+            # span lies before the block in the piece
+            if block_offset >= span_length:
+                block_offset -= span_length
+                continue
+            length = min(span_length - block_offset, block_size)
+            spans.append((file_index, file_position + block_offset, length))
+            block_size -= length
+            block_offset = 0
+            if block_size == 0:
+                break
+        return spans
+
+
+"""
+    Pool of the open files of multi file torrent, torrents can have more
+    files than the process can keep open hence only the recently used files
+    are kept open. A file in use by a read/write (in some thread) is never
+    closed, the pool lock is held only while acquiring/releasing the file
+"""
+class file_descriptor_pool():
+
+    def __init__(self, file_paths, max_open_files=MAX_OPEN_FILES):
+        self.file_paths     = file_paths
+        self.max_open_files = max_open_files
+        # open files in least recently used order : file index -> file_io
+        self.open_files     = OrderedDict()
+        # count of reads/writes in progress : file index -> count
+        self.file_users     = {}
+        self.pool_lock      = threading.Lock()
+
+    # gets the open file given the file index, file must be released after use
+    def acquire(self, file_index):
+        with self.pool_lock:
+            file_object = self.open_files.get(file_index)
+            if file_object is None:
+                file_path = self.file_paths[file_index]
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                file_object = file_io(file_path)
+                self.open_files[file_index] = file_object
+            else:
+                self.open_files.move_to_end(file_index)
+            self.file_users[file_index] = self.file_users.get(file_index, 0) + 1
+            self.close_idle_files()
+            return file_object
+
+    # releases the file acquired from the pool
+    def release(self, file_index):
+        with self.pool_lock:
+            self.file_users[file_index] -= 1
+            if self.file_users[file_index] == 0:
+                del self.file_users[file_index]
+            self.close_idle_files()
+
+    # closes the least recently used files not in use if too many are open
+    # note that function must be called with pool lock acquired
+    def close_idle_files(self):
+        for file_index in list(self.open_files):
+            if len(self.open_files) <= self.max_open_files:
+                break
+            if file_index not in self.file_users:
+                self.open_files.pop(file_index).close()
+
+    # closes all the open files in the pool
+    def close(self):
+        with self.pool_lock:
+            while self.open_files:
+                self.open_files.popitem()[1].close()
+
+
+"""
+    File handler of multi file torrent, the download path is the directory
+    (named by torrent) in which all the files are stored with their paths.
+    Every read/write is split into the spans of files covered by the block
+    and each span is read/written positionally in the file from the pool.
+
+    Note that memory mapped storage is not used for multi file torrents
+"""
+class torrent_multi_file_handler(torrent_shared_file_handler):
+
+    # files are opened lazily by the pool of file descriptors, note that
+    # file size is the total size of all files
+    def open_files(self):
+        # paths and lengths of the files in torrent data order
+        file_paths      = []
+        file_lengths    = []
+        for file_length, file_path in self.torrent.torrent_metadata.files:
+            file_paths.append(self.join_file_path(file_path))
+            file_lengths.append(file_length)
+        self.file_lengths = file_lengths
+
+        self.file_spans = file_span_index(file_lengths, self.piece_size,
+                                          self.file_size)
+        self.file_pool  = file_descriptor_pool(file_paths)
+
+    # closes all the files open in the pool
+    def close(self):
+        self.file_pool.close()
+
+    # path of file in the download directory, paths given in torrent file
+    # are never allowed to point outside of the download directory
+    def join_file_path(self, file_path):
+        file_path = os.path.normpath(file_path)
+        if os.path.isabs(file_path) or file_path.split(os.sep)[0] == os.pardir:
+            raise ValueError("invalid file path in torrent " + file_path)
+        return os.path.join(self.download_file_path, file_path)
+
+    # initialize all the files before downloading given the allocation mode
+    def initialize_for_download(self, allocation_mode=None):
+        if allocation_mode is None:
+            allocation_mode = self.torrent.client_request.get("allocation mode",
+                                                              ALLOCATION_SPARSE)
+        if allocation_mode not in ALLOCATION_MODES:
+            raise ValueError("unknown allocation mode " + str(allocation_mode))
+        for file_index, file_length in enumerate(self.file_lengths):
+            # files are created even if they are empty
+            download_file = self.file_pool.acquire(file_index)
+            try:
+                allocate_file(download_file, file_length, allocation_mode)
+            finally:
+                self.file_pool.release(file_index)
+
+    # paths of all the files in which the torrent data is stored
+    def get_file_paths(self):
+        return self.file_pool.file_paths
+
+    # writes the data into the spans of files
+    def write_spans(self, spans, data):
+        data = memoryview(data)
+        for file_index, file_position, span_length in spans:
+            download_file = self.file_pool.acquire(file_index)
+            try:
+                download_file.pwrite(data[:span_length], file_position)
+            finally:
+                self.file_pool.release(file_index)
+            data = data[span_length:]
+
+    # reads the data from the spans of files
+    def read_spans(self, spans):
+        data_blocks = []
+        for file_index, file_position, span_length in spans:
+            download_file = self.file_pool.acquire(file_index)
+            try:
+                data_block = download_file.pread(span_length, file_position)
+            finally:
+                self.file_pool.release(file_index)
+            data_blocks.append(data_block)
+            # file is shorter than expected, return the available data
+            if len(data_block) < span_length:
+                break
+        if len(data_blocks) == 1:
+            return data_blocks[0]
+        return b''.join(data_blocks)
+
+
+    """
+        function helps in writing a block from piece message recieved
+    """
+    def write_block(self, piece_message):
+        spans = self.file_spans.block_spans(piece_message.piece_index,
+                                            piece_message.block_offset,
+                                            len(piece_message.block))
+        self.write_spans(spans, piece_message.block)
+        if self.piece_cache is not None:
+            self.piece_cache.discard(piece_message.piece_index)
+
+
+    """
+        function helps in writing the complete piece that is validated
+    """
+    def write_piece(self, piece_index, piece_data):
+        spans = self.file_spans.block_spans(piece_index, 0, len(piece_data))
+        self.write_spans(spans, piece_data)
+        if self.piece_cache is not None:
+            self.piece_cache.discard(piece_index)
+
+
+    """
+        function helps in writing the adjacent validated pieces, every piece
+        is written into the spans of files it covers
+    """
+    def write_pieces(self, piece_index, pieces_data):
+        for piece_data in pieces_data:
+            self.write_piece(piece_index, piece_data)
+            piece_index += 1
+
+
+    """
+        function reads the block from files given piece index and block offset
+        function returns the block of bytes class data that is read
+    """
+    def read_file_block(self, piece_index, block_offset, block_size):
+        spans = self.file_spans.block_spans(piece_index, block_offset, block_size)
+        return self.read_spans(spans)
+
+
+    # advises the kernel to read ahead the complete piece from the files
+    def advise_piece(self, piece_index, piece_length):
+        for file_index, file_position, span_length in self.file_spans.piece_spans[piece_index]:
+            download_file = self.file_pool.acquire(file_index)
+            try:
+                download_file.advise_willneed(file_position, span_length)
+            finally:
+                self.file_pool.release(file_index)
+
+
+    """
+        function returns None since the files of pool can be closed while
+        the block is sent, hence the blocks are always read using read_block
+    """
+    def block_file_span(self, piece_index, block_offset, block_size):
+        return None
+
+
+"""
+    function creates the file handler with the storage backend requested by
+    the client for the torrent (positional file I/O by default), multi file
+    torrents are always stored using the multi file handler
+"""
+def create_shared_file_handler(download_file_path, torrent):
+    storage_backend = torrent.client_request.get("storage backend", STORAGE_FILE)
+    if storage_backend not in STORAGE_BACKENDS:
+        raise ValueError("unknown storage backend " + str(storage_backend))
+    if torrent.torrent_metadata.files:
+        return torrent_multi_file_handler(download_file_path, torrent)
+    if storage_backend == STORAGE_MMAP:
+        return torrent_mmap_file_handler(download_file_path, torrent)
+    return torrent_shared_file_handler(download_file_path, torrent)
     
 
 
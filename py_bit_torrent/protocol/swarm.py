@@ -1,12 +1,19 @@
-import random
+import asyncio
+import functools
 import sys
 import time
-from copy import deepcopy
 from datetime import timedelta
 from logging import DEBUG
-from threading import *
 
+from py_bit_torrent.protocol.choker import RECHOKE_INTERVAL, create_choker
+from py_bit_torrent.protocol.disk_writer import disk_writer
+from py_bit_torrent.protocol.download_scheduler import download_scheduler
 from py_bit_torrent.protocol.peer import Peer
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+from py_bit_torrent.protocol.piece_picker import piece_picker
+from py_bit_torrent.protocol.peer_wire_messages import piece
+from py_bit_torrent.protocol.piece_verifier import piece_verifier
+from py_bit_torrent.protocol.rate_limiter import create_rate_limiter
 from py_bit_torrent.protocol.torrent_error import FAILURE
 from py_bit_torrent.protocol.torrent_logger import (
     SWARM_LOG_FILE,
@@ -14,18 +21,30 @@ from py_bit_torrent.protocol.torrent_logger import (
     torrent_logger,
 )
 
+# seconds an idle peer waits for availability of pieces to change
+PEER_IDLE_TIMEOUT = 1
+
+# seconds after which the top peers are selected again
+PEER_SELECTION_INTERVAL = 10
+
 
 class swarm:
 
     def __init__(self, peers_data, torrent):
-        # initialize the peers class with peer data recieved
-        self.torrent = deepcopy(torrent)
+        # initialize the peers class with peer data recieved, the torrent is
+        # shared with all the peers (peers keep their own small statistics)
+        self.torrent = torrent
         self.interval = peers_data.get(
             "interval", 1800
         )  # Default interval if not provided
         self.seeders = peers_data.get("seeders", 0)  # Default to 0 if not provided
         self.leechers = peers_data.get("leechers", 0)  # Default to 0 if not provided
 
+        # global limits of download and upload rate shared by all the peers
+        client_request = self.torrent.client_request
+        self.download_limiter = create_rate_limiter(client_request["downloading rate"])
+        self.upload_limiter = create_rate_limiter(client_request["uploading rate"])
+
         # create a peer instance for all the peers recieved
         self.peers_list = []
 
@@ -37,11 +56,18 @@ class swarm:
             timestamp = peer.get("timestamp", None)
             self.peers_list.append(Peer(ip, port, torrent))
 
-        # bitfields from all peers
-        self.bitfield_pieces_count = dict()
+        # availability of the pieces from bitfields of all peers
+        self.piece_picker = piece_picker(self.torrent.pieces_count)
+        for peer in self.peers_list:
+            peer.add_piece_picker(self.piece_picker)
+            peer.add_swarm_statistics(self.torrent.statistics)
+            self.add_rate_limiters(peer)
 
         # selecting the top N peers / pieces
         self.top_n = self.torrent.client_request["max peers"]
+        # top peers selected and the time when they were selected
+        self.selected_peers = set()
+        self.peer_selection_time = None
 
         # peers logger object
         self.swarm_logger = torrent_logger("swarm", SWARM_LOG_FILE, DEBUG)
@@ -52,36 +78,46 @@ class swarm:
         self.torrent_stats_logger.set_console_logging()
 
         # bitfield for pieces downloaded from peers
-        self.bitfield_pieces_downloaded = set([])
+        self.bitfield_pieces_downloaded = piece_bitfield(self.torrent.pieces_count)
 
         # file handler for downloading / uploading file data
         self.file_handler = None
+        # write back stage of the verified pieces into the file
+        self.disk_writer = None
 
-        # minimum pieces to recieve randomly
+        # minimum pieces to recieve from all the peers
         self.minimum_pieces = 10
 
         # check if the torrent file is for seeding
         if torrent.client_request["seeding"] != None:
-            # client peer only need incase of seeding torrent
+            # client peer only need incase of seeding torrent, it starts
+            # listening once seeding begins on the event loop
             self.client_peer = Peer(
                 self.torrent.client_IP, self.torrent.client_port, self.torrent
             )
-            self.client_peer.initialize_seeding()
 
-        # swarm lock for required for updating the global state
-        self.swarm_lock = Lock()
+        # assigns the pieces to be downloaded to the peers in swarm
+        self.download_scheduler = download_scheduler(self.piece_picker, self.torrent)
+        # validates the downloaded pieces in the pool of hashing threads
+        self.piece_verifier = piece_verifier(self.torrent)
+        # fast resume file in which the state of download is saved
+        self.resume_file = None
 
-    """
-        Updates bitfield count values obtained from peers in swarm
-        global state of count of different pieces available in swarm
-    """
+        # choker decides the peers that client uploads to (upload slots)
+        self.choker = create_choker(self.torrent)
+        # peers connected to client for downloading pieces from client
+        self.upload_peers = []
+        # uploading tasks of the connected peers
+        self.upload_tasks = set()
+
+        # downloading tasks of the peers in swarm
+        self.peer_tasks = []
+        self.downloading = False
+        # set once all the pieces of file are downloaded
+        self.download_completed = asyncio.Event()
 
-    def update_bitfield_count(self, bitfield_pieces):
-        for piece in bitfield_pieces:
-            if piece in self.bitfield_pieces_count.keys():
-                self.bitfield_pieces_count[piece] += 1
-            else:
-                self.bitfield_pieces_count[piece] = 1
+        # Note that all peers are driven by coroutines on a single event loop
+        # hence the global state of swarm is updated without any locks
 
     """
         The peer class must handle the downloaded file writing and reading 
@@ -92,9 +128,26 @@ class swarm:
     def add_shared_file_handler(self, file_handler):
         # instantiate the torrent shared file handler class object
         self.file_handler = file_handler
+        self.disk_writer = disk_writer(file_handler)
         for peer in self.peers_list:
             peer.add_file_handler(self.file_handler)
 
+    """
+        function adds the rate limiters to the peer, every peer is limited by
+        its own peer limits and also by the global limits of the swarm
+    """
+
+    def add_rate_limiters(self, peer):
+        client_request = self.torrent.client_request
+        peer.add_rate_limiters(
+            create_rate_limiter(
+                client_request.get("peer downloading rate"), self.download_limiter
+            ),
+            create_rate_limiter(
+                client_request.get("peer uploading rate"), self.upload_limiter
+            ),
+        )
+
     """
         functions checks if the file handler has been added or not
     """
@@ -112,17 +165,57 @@ class swarm:
         initializing bitfields and updating the global bitfield count
     """
 
-    def connect_to_peer(self, peer_index):
+    async def connect_to_peer(self, peer):
         # perfrom handshake with peer
-        self.peers_list[peer_index].initiate_handshake()
-        # recieve the bitfields from peer
-        peer_bitfield_pieces = self.peers_list[peer_index].initialize_bitfield()
-        self.swarm_lock.acquire()
-        # update the bitfield count value in swarm
-        self.update_bitfield_count(peer_bitfield_pieces)
-        self.swarm_lock.release()
+        await peer.initiate_handshake()
+        # recieve the bitfields from peer, availability of pieces in swarm
+        # is updated by the peer from BITFIELD and HAVE messages recieved
+        await peer.initialize_bitfield()
         # used for EXCECUTION LOGGING
-        self.swarm_logger.log(self.peers_list[peer_index].get_handshake_log())
+        self.swarm_logger.log(peer.get_handshake_log())
+        self.swarm_logger.log(self.get_availability_log())
+
+    """
+        function adds new peer discovered while downloading to the swarm
+        and asynchronously starts downloading from the peer on event loop
+    """
+
+    def add_peer(self, peer_IP, peer_port):
+        peer = Peer(peer_IP, peer_port, self.torrent)
+        peer.add_piece_picker(self.piece_picker)
+        peer.add_swarm_statistics(self.torrent.statistics)
+        self.add_rate_limiters(peer)
+        if self.file_handler is not None:
+            peer.add_file_handler(self.file_handler)
+        self.peers_list.append(peer)
+        # peers added before downloading are started by download file
+        if self.downloading:
+            self.start_peer_download(peer)
+
+    """
+        function returns the availability histogram of pieces in swarm
+        count of peers having a piece -> number of pieces with that count
+    """
+
+    def get_availability_histogram(self, missing_only=False):
+        return self.piece_picker.availability_histogram(missing_only)
+
+    """
+        function returns the swarm health information for logging
+    """
+
+    def get_availability_log(self):
+        active_peers = 0
+        for peer in self.peers_list:
+            if peer.peer_sock.peer_connection_active():
+                active_peers += 1
+        availability_log = "SWARM AVAILABILITY : (active peers : "
+        availability_log += str(active_peers) + ") "
+        histogram = self.get_availability_histogram()
+        for count, pieces in histogram.items():
+            availability_log += "[" + str(count) + " peers : "
+            availability_log += str(pieces) + " pieces] "
+        return availability_log
 
     """
         function checks if there are any active connections in swarm
@@ -139,58 +232,33 @@ class swarm:
     """
 
     def download_complete(self):
-        return len(self.bitfield_pieces_downloaded) == self.torrent.pieces_count
+        return self.bitfield_pieces_downloaded.is_complete()
 
     """ 
         function helps in downloading torrrent file from peers
         implementation of rarest first algorithm as downloading stratergy
     """
 
-    def download_file(self):
+    async def download_file(self):
         # check if file handler is initialized
         if not self.have_file_handler():
             return False
-        # initialize bitfields asynchronously
-        for peer_index in range(len(self.peers_list)):
-            connect_peer_thread = Thread(
-                target=self.connect_to_peer, args=(peer_index,)
-            )
-            connect_peer_thread.start()
-        # asynchornously start downloading pieces of file from peers
-        download_thread = Thread(target=self.download_using_stratergies)
-        download_thread.start()
-
-    """
-        downloads the file from peers in swarm using some stratergies of peice
-        selection and peer selection respectively
-    """
-
-    def download_using_stratergies(self):
         self.download_start_time = time.time()
-        while not self.download_complete():
-            # select the pieces and peers for downloading
-            pieces = self.piece_selection_startergy()
-            peer_indices = self.peer_selection_startergy()
-
-            # asynchornously download the rarest pieces from the top four peers
-            downloading_thread_pool = []
-            for i in range(min(len(pieces), len(peer_indices))):
-                piece = pieces[i]
-                peer_index = peer_indices[i]
-
-                downloading_thread = Thread(
-                    target=self.download_piece,
-                    args=(
-                        piece,
-                        peer_index,
-                    ),
-                )
-                downloading_thread_pool.append(downloading_thread)
-                downloading_thread.start()
-            # wait untill you finish the downloading of the pieces
-            for downloading_thread in downloading_thread_pool:
-                downloading_thread.join()
-        self.download_end_time = time.time()
+        # every peer downloads pieces on its own coroutine
+        self.downloading = True
+        for peer in self.peers_list:
+            self.start_peer_download(peer)
+        # wait untill all the pieces are downloaded from the peers, state of
+        # download is saved even if the download is stopped (cancelled)
+        try:
+            await self.download_completed.wait()
+        finally:
+            self.download_end_time = time.time()
+            await self.stop_peer_downloads()
+            # all the verified pieces are written before download is finished
+            await self.disk_writer.flush()
+            await self.save_resume_file()
+            self.file_handler.close()
 
         # used for EXCECUTION LOGGING
         download_log = "File downloading time : "
@@ -198,95 +266,225 @@ class swarm:
             timedelta(seconds=(self.download_end_time - self.download_start_time))
         )
         download_log += " Average download rate : "
-        download_log += str(self.torrent.statistics.avg_download_rate) + " Kbps\n"
+        download_log += str(self.torrent.statistics.avg_download_rate) + " KB/s\n"
         download_log += "Happy Bittorrenting !"
         self.torrent_stats_logger.log(download_log)
+        return True
 
     """
-        function downloads piece given the peer index and updates the 
-        of downloaded pieces from the peers in swarm
-    """
-
-    def download_piece(self, piece, peer_index):
-        start_time = time.time()
-        is_piece_downloaded = self.peers_list[peer_index].piece_downlaod_FSM(piece)
-        end_time = time.time()
-        if is_piece_downloaded:
-            # acquire lock for update the global data items
-            self.swarm_lock.acquire()
-            # update the bifields pieces downloaded
-            self.bitfield_pieces_downloaded.add(piece)
-            # delete the pieces from the count of pieces
-            del self.bitfield_pieces_count[piece]
-            # update the torrent statistics
-            self.torrent.statistics.update_start_time(start_time)
-            self.torrent.statistics.update_end_time(end_time)
-            self.torrent.statistics.update_download_rate(
-                piece, self.torrent.piece_length
-            )
-            self.torrent_stats_logger.log(
-                self.torrent.statistics.get_download_statistics()
-            )
-            # release the lock after downloading
-            self.swarm_lock.release()
+        function stops downloading coroutines of the peers once the file is
+        downloaded, peers may still be waiting for duplicate endgame blocks
+    """
+
+    async def stop_peer_downloads(self):
+        self.downloading = False
+        for peer in self.peers_list:
+            peer.close_peer_connection()
+        for peer_task in self.peer_tasks:
+            peer_task.cancel()
+        await asyncio.gather(*self.peer_tasks, return_exceptions=True)
+        self.peer_tasks.clear()
+        await self.piece_verifier.close()
 
     """
-        piece selection stratergy is completely based on the bittorrent client
-        most used piece selection stratergies are random piece selection stratergy
-        and rarest first piece selection startergy
+        function starts the downloading coroutine for the given peer
     """
 
-    def piece_selection_startergy(self):
-        return self.rarest_pieces_first()
+    def start_peer_download(self, peer):
+        self.peer_tasks.append(asyncio.create_task(self.download_from_peer(peer)))
 
-    """ 
-        rarest first piece selection stratergy always selects the rarest piece
-        in the swarm, note if there are multiple rarest pieces then the
-        function returns any random rarest piece.
-    """
-
-    def rarest_pieces_first(self):
-        # check if bitfields are recieved else wait for some time
-        while len(self.bitfield_pieces_count) == 0:
-            time.sleep(5)
-        # get the rarest count of the pieces
-        rarest_piece_count = min(self.bitfield_pieces_count.values())
-        # find all the pieces with the rarest piece
-        rarest_pieces = [
-            piece
-            for piece in self.bitfield_pieces_count
-            if self.bitfield_pieces_count[piece] == rarest_piece_count
+    """
+        downloads the file from the given peer using the stratergies of piece
+        selection and peer selection. The peer keeps requesting blocks given
+        by the download scheduler (rarest pieces first) as soon as earlier
+        blocks arrive, hence the fast peers are never kept waiting for the
+        slow peers (no rounds of pieces across the peers) and the blocks of
+        one piece can be downloaded from several peers at once
+    """
+
+    async def download_from_peer(self, peer):
+        await self.connect_to_peer(peer)
+        self.download_scheduler.add_peer(peer)
+        while not self.download_complete():
+            if not peer.peer_sock.peer_connection_active():
+                break
+            # no blocks are downloaded while the disk is not keeping up
+            await self.disk_writer.wait_for_space()
+            # download blocks from peer untill any piece is completed
+            completed_piece = None
+            if self.peer_selection_startergy(peer):
+                completed_piece = await peer.block_downlaod_FSM(self.download_scheduler)
+            # nothing to download from peer, wait for availability to change
+            if completed_piece is None:
+                await self.piece_picker.wait_for_availability_change(PEER_IDLE_TIMEOUT)
+                continue
+            await self.download_piece(completed_piece, peer)
+        # blocks and pieces assigned to peer can be downloaded by other peers
+        await peer.release_requests(self.download_scheduler)
+        self.download_scheduler.remove_peer(peer)
+        await self.piece_picker.notify_availability()
+
+    """
+        function resumes the download from the state saved in resume file,
+        if the resume file can't be trusted the pieces already in the files
+        are checked again, function must be called before downloading file
+    """
+
+    async def resume_download(self, resume_file):
+        self.resume_file = resume_file
+        if resume_file.resume_data is not None:
+            downloaded_pieces = resume_file.downloaded_pieces()
+            for piece_index, block_offsets in resume_file.partial_pieces():
+                if piece_index in downloaded_pieces:
+                    continue
+                piece_data = await asyncio.to_thread(
+                    self.file_handler.read_piece, piece_index
+                )
+                self.download_scheduler.restore_partial_piece(
+                    piece_index, block_offsets, piece_data
+                )
+        elif resume_file.existing_data:
+            downloaded_pieces = await self.piece_verifier.recheck_pieces(
+                self.file_handler
+            )
+        else:
+            downloaded_pieces = []
+
+        for piece_index in downloaded_pieces:
+            self.bitfield_pieces_downloaded.add(piece_index)
+            self.piece_picker.mark_downloaded(piece_index)
+            self.torrent.statistics.downloaded.add(piece_index)
+        if self.download_complete():
+            self.download_completed.set()
+
+        # used for EXCECUTION LOGGING
+        resume_log = "Resumed download with " + str(len(downloaded_pieces))
+        resume_log += " pieces and " + str(len(self.download_scheduler.partial_pieces))
+        resume_log += " partial pieces"
+        self.swarm_logger.log(resume_log)
+
+    """
+        function saves the state of download in the resume file, recieved
+        blocks of partial pieces are written so they are not downloaded again
+    """
+
+    async def save_resume_file(self):
+        if self.resume_file is None or not self.have_file_handler():
+            return
+        partial_pieces = [
+            downloading_piece
+            for downloading_piece in self.download_scheduler.partial_pieces.values()
+            if not downloading_piece.is_complete()
         ]
-        # shuffle among the random pieces
-        random.shuffle(rarest_pieces)
-        # rarest pieces
-        return rarest_pieces[: self.top_n]
+        await asyncio.to_thread(self.write_resume_file, partial_pieces)
+
+    def write_resume_file(self, partial_pieces):
+        for downloading_piece in partial_pieces:
+            piece_view = memoryview(downloading_piece.piece_data)
+            for block_offset, block_length in downloading_piece.recieved_block_ranges():
+                data_block = piece_view[block_offset : block_offset + block_length]
+                self.file_handler.write_block(
+                    piece(downloading_piece.piece_index, block_offset, data_block)
+                )
+        self.file_handler.flush()
+        self.resume_file.save(self.bitfield_pieces_downloaded, partial_pieces)
 
     """
-        peer selection stratergy for selecting peer having particular piece
-        function returns the peer index from the list of peers in swarm
+        function queues the piece whose blocks are all downloaded for the
+        validation, peer continues downloading while the piece is verified
+        note that piece is already hashed while its blocks were recieved
     """
 
-    def peer_selection_startergy(self):
-        # select random peers untill you have some pieces
+    async def download_piece(self, completed_piece, peer):
+        await self.piece_verifier.submit(
+            completed_piece.piece_index,
+            completed_piece.piece_data,
+            functools.partial(self.piece_verified, completed_piece, peer),
+            completed_piece.piece_digest(),
+        )
+
+    """
+        function is called once the piece is validated, validated piece is
+        given to the disk writer for writing into file
+    """
+
+    async def piece_verified(self, completed_piece, peer, is_piece_downloaded):
+        piece_index = completed_piece.piece_index
+        self.download_scheduler.piece_finished(peer, piece_index, is_piece_downloaded)
+        if not is_piece_downloaded:
+            # used for EXCECUTION LOGGING
+            download_log = peer.unique_id + "unable to downloaded piece "
+            download_log += str(piece_index) + " due to validation failure " + FAILURE
+            peer.peer_logger.log(download_log)
+            # piece can be downloaded again from any of the peers
+            await self.piece_picker.notify_availability()
+            return False
+        # validated piece is written into the file by the disk writer, the
+        # piece is downloaded only once it is written
+        await self.disk_writer.write_piece(
+            piece_index, completed_piece.piece_data, self.piece_written
+        )
+        return True
+
+    """
+        function is called by the disk writer once the verified piece is
+        written into file, the piece that couldn't be written is downloaded
+        again, written pieces update the downloaded pieces of the swarm
+    """
+
+    async def piece_written(self, piece_index, is_piece_written):
+        if not is_piece_written:
+            # used for EXCECUTION LOGGING
+            write_log = "unable to write piece " + str(piece_index) + " " + FAILURE
+            self.swarm_logger.log(write_log)
+            self.piece_picker.mark_missing(piece_index)
+            await self.piece_picker.notify_availability()
+            return False
+        # update the bifields pieces downloaded
+        self.bitfield_pieces_downloaded.add(piece_index)
+        # update the torrent statistics
+        self.torrent.statistics.update_download_rate(piece_index)
+        self.torrent_stats_logger.log(self.torrent.statistics.get_download_statistics())
+        if self.download_complete():
+            self.download_completed.set()
+            # wake up the idle peers so they can stop downloading
+            await self.piece_picker.notify_availability()
+        return True
+
+    """
+        peer selection stratergy decides if the given peer can download
+        pieces, all the peers download untill client has some pieces and
+        then only the top peers with high download rates are selected
+    """
+
+    def peer_selection_startergy(self, peer):
+        # select all the peers untill you have some pieces
         if len(self.bitfield_pieces_downloaded) < self.minimum_pieces:
-            return self.select_random_peers()
+            return True
         # select the top peers with high download rates
         else:
-            return self.top_peers()
+            return peer in self.select_top_peers()
 
     """
-        random peer selection is implemented as given below.
+        function returns the top peers selected once in the selection
+        interval, peers are ranked for every peer only once per interval
+        (not for every piece), top peers are selected again earlier if any
+        of them is disconnected
     """
 
-    def select_random_peers(self):
-        peer_indices = []
-        # select all the peers that have pieces to offer
-        for index in range(len(self.peers_list)):
-            if len(self.peers_list[index].bitfield_pieces) != 0:
-                peer_indices.append(index)
-        random.shuffle(peer_indices)
-        return peer_indices[: self.top_n]
+    def select_top_peers(self, current_time=None):
+        if current_time is None:
+            current_time = time.monotonic()
+        if (
+            self.peer_selection_time is None
+            or current_time - self.peer_selection_time >= PEER_SELECTION_INTERVAL
+            or not all(
+                peer.peer_sock.peer_connection_active() for peer in self.selected_peers
+            )
+        ):
+            self.selected_peers = set(self.top_peers())
+            self.peer_selection_time = current_time
+        return self.selected_peers
 
     """
         selects the specific peer in the list(used only for testing of seeding)
@@ -297,58 +495,126 @@ class swarm:
         return peer_index
 
     """
-        selects the top fours peer having maximum download rates
-        sort the peers in by the rate of downloading and selects top four
+        selects the top fours peer having maximum download rates among the
+        connected peers that have pieces which client lacks
     """
 
     def top_peers(self):
-        # sort the peer list according peer comparator
-        self.peers_list = sorted(
-            self.peers_list, key=self.peer_comparator, reverse=True
-        )
-        return [
-            peer_index for peer_index in range(min(self.top_n, len(self.peers_list)))
-        ]
+        useful_peers = []
+        for peer in self.peers_list:
+            if not peer.bitfield_initialized:
+                continue
+            if not peer.peer_sock.peer_connection_active():
+                continue
+            if len(peer.bitfield_pieces - self.bitfield_pieces_downloaded) != 0:
+                useful_peers.append(peer)
+        # sort the peers according peer comparator
+        useful_peers.sort(key=self.peer_comparator, reverse=True)
+        return useful_peers[: self.top_n]
 
     """
         comparator function for sorting the peer with highest downloading rate
+        the current rate of peer is measured by its download rate meter
     """
 
     def peer_comparator(self, peer):
         if not peer.peer_sock.peer_connection_active():
             return -sys.maxsize
-        return peer.torrent.statistics.avg_download_rate
+        return peer.download_rate()
 
     """
         function helps in seeding the file in swarm
     """
 
-    def seed_file(self):
+    async def seed_file(self):
+        # start listening, every connection is served by its own coroutine
+        await self.client_peer.initialize_seeding(self.recieve_connection)
         seeding_log = "Seeding started by client at " + self.client_peer.unique_id
         self.swarm_logger.log(seeding_log)
-        seeding_file_forever = True
-        while seeding_file_forever:
-            recieved_connection = self.client_peer.recieve_connection()
-            if recieved_connection != None:
-                # extract the connection socket and IP address of connection
-                peer_socket, peer_address = recieved_connection
-                peer_IP, peer_port = peer_address
-                # make peer class object
-                peer_object = Peer(peer_IP, peer_port, self.torrent, peer_socket)
-                peer_object.set_bitfield()
-                peer_object.add_file_handler(self.file_handler)
-                # start uploading file pieces to this peer
-                Thread(target=self.upload_file, args=(peer_object,)).start()
-            else:
-                time.sleep(1)
+        # seed the file untill stopped (cancelled), the unchoked peers are
+        # decided periodically
+        try:
+            while True:
+                await asyncio.sleep(RECHOKE_INTERVAL)
+                self.rechoke_peers()
+                self.log_upload_statistics()
+        finally:
+            await self.stop_peer_uploads()
+            self.file_handler.close()
+
+    """
+        function stops listening and the uploading coroutines of the peers
+        once seeding is stopped, so no block is read after files are closed
+    """
+
+    async def stop_peer_uploads(self):
+        self.client_peer.close_peer_connection()
+        for peer in self.upload_peers:
+            peer.close_peer_connection()
+        for upload_task in self.upload_tasks:
+            upload_task.cancel()
+        await asyncio.gather(*self.upload_tasks, return_exceptions=True)
+
+    """
+        function decides the peers unchoked by the client, the peers that
+        lose the upload slot are choked by their uploading coroutines
+    """
+
+    def rechoke_peers(self):
+        seeding = self.torrent.client_request["seeding"] != None
+        unchoked_peers = self.choker.rechoke(self.upload_peers, seeding)
+        # used for EXCECUTION LOGGING
+        rechoke_log = "Rechoked " + str(len(self.upload_peers)) + " peers : "
+        rechoke_log += " ".join(peer.unique_id for peer in unchoked_peers)
+        rechoke_log += " unchoked"
+        self.swarm_logger.log(rechoke_log)
+
+    """
+        function logs the upload statistics of the torrent (including the
+        piece cache used for seeding) periodically while seeding
+    """
+
+    def log_upload_statistics(self):
+        self.torrent.statistics.update_upload_rate()
+        piece_cache = self.file_handler.piece_cache
+        if piece_cache is not None:
+            self.torrent.statistics.update_cache_statistics(piece_cache)
+        self.torrent_stats_logger.log(self.torrent.statistics.get_upload_statistics())
+
+    """
+        function is called by the event loop for every connection recieved
+        while seeding the file, given the peer protocol of the connection
+    """
+
+    async def recieve_connection(self, connection):
+        # extract the IP address of connection
+        peer_IP, peer_port = connection.transport.get_extra_info("peername")[:2]
+        # make peer class object
+        peer_object = Peer(peer_IP, peer_port, self.torrent, connection)
+        peer_object.set_bitfield()
+        peer_object.add_file_handler(self.file_handler)
+        peer_object.add_swarm_statistics(self.torrent.statistics)
+        self.add_rate_limiters(peer_object)
+        peer_object.add_choker(self.choker)
+        # start uploading file pieces to this peer
+        self.upload_peers.append(peer_object)
+        upload_task = asyncio.current_task()
+        self.upload_tasks.add(upload_task)
+        try:
+            await self.upload_file(peer_object)
+        finally:
+            self.upload_peers.remove(peer_object)
+            self.upload_tasks.discard(upload_task)
 
     """
         function helps in uploading the file pieces to given peer when requested
     """
 
-    def upload_file(self, peer):
+    async def upload_file(self, peer):
         # initial seeding messages
-        if not peer.initial_seeding_messages():
+        if not await peer.initial_seeding_messages():
+            peer.close_peer_connection()
             return
         # after inital messages start exchanging uploading message
-        peer.piece_upload_FSM()
+        await peer.piece_upload_FSM()
+        peer.close_peer_connection()
@@ -61,7 +61,9 @@ class torrent:
 
     # get validates piece length of given piece
     def validate_piece_length(self, piece_index, block_offset, block_length):
-        if block_length > self.block_length:
+        if not 0 <= piece_index < self.pieces_count:
+            return False
+        elif block_length <= 0 or block_length > self.block_length:
             return False
         elif block_length + block_offset > self.get_piece_length(piece_index):
             return False
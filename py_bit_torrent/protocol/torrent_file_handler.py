@@ -1,5 +1,6 @@
 # hashlib module for generating sha1 hash values
 import hashlib
+import os
 import sys
 # Ordered Dictionary module
 from collections import OrderedDict
@@ -46,7 +47,16 @@ class torrent_metadata:
         self.piece_length = piece_length  # int    : piece length in bytes
         self.pieces = pieces  # bytes  : sha1 hash concatination of file
         self.info_hash = info_hash  # sha1 hash of the info metadata
-        self.files = files  # list   : [length, path] (multifile torrent)
+        self.files = files  # list   : [length, relative path] (multifile torrent)
+
+        # metadata is shared by the swarm and all the peers hence it is never
+        # modified once the torrent file is read
+        self.frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, "frozen", False):
+            raise AttributeError("torrent metadata " + name + " can't be modified")
+        super().__setattr__(name, value)
 
 
 """
@@ -168,8 +178,11 @@ class torrent_file_reader(torrent_metadata):
                 torrent_extract[new_key] = list(
                     map(lambda x: self.extract_torrent_metadata(x), value)
                 )
+            # path of the file is list of directories and the file name
             elif type(value) == list and new_key == "path":
-                torrent_extract[new_key] = value[0].decode(self.encoding)
+                torrent_extract[new_key] = os.path.join(
+                    *[path_component.decode(self.encoding) for path_component in value]
+                )
             # url list parameter
             elif (
                     type(value) == list
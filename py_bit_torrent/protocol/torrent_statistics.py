@@ -1,116 +1,143 @@
-import time
 from datetime import timedelta
 
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+from py_bit_torrent.protocol.rate_meter import rate_meter
+
+"""
+    Peer statistics are the rates of downloading from and uploading to one
+    peer connection. The object is kept small since every connected peer has
+    one, the metadata of torrent is shared by all the peers and never copied
+"""
+class peer_statistics():
+    def __init__(self):
+        self.upload_rate            = 0.0       # upload rate   (KB/s)
+        self.download_rate          = 0.0       # download rate (KB/s)
+    
+        self.max_upload_rate        = 0.0       # max upload rate (KB/s)
+        self.max_download_rate      = 0.0       # max download rate (KB/s)
+
+        self.avg_upload_rate        = 0.0       # avg upload rate (KB/s)
+        self.avg_download_rate      = 0.0       # avg download rate (KB/s)
+        
+        self.download_meter         = rate_meter()  # bytes recieved rate
+        self.upload_meter           = rate_meter()  # bytes sent rate
+
+        self.num_pieces_uploaded    = 0         # blocks/pieces uplaoded
+
+    """
+        function makes the rate meters of these statistics (statistics of a
+        peer) update the rate meters of given statistics (swarm statistics)
+    """
+    def add_parent_statistics(self, statistics):
+        self.download_meter.parent_meter = statistics.download_meter
+        self.upload_meter.parent_meter   = statistics.upload_meter
+
+    """
+        functions update the rate meters for every block recieved/sent
+    """
+    def block_downloaded(self, block_length):
+        self.download_meter.update(block_length)
+
+    def block_uploaded(self, block_length):
+        self.upload_meter.update(block_length)
+        # update the num blocks uploaded
+        self.num_pieces_uploaded += 1
+        self.update_upload_rate()
+
+    """
+        function updates the uploading statistics from the upload meter
+    """
+    def update_upload_rate(self):
+        # current, average and max upload rate (KB/s)
+        self.upload_rate        = round(self.upload_meter.rate() / (2 ** 10), 2)
+        self.avg_upload_rate    = round(self.upload_meter.average_rate() / (2 ** 10), 2)
+        self.max_upload_rate    = max(self.max_upload_rate, self.upload_rate)
+
+    """
+        function returns the upload statistics
+    """
+    def get_upload_statistics(self):
+        upload_log  = 'uploaded : [upload rate = ' 
+        upload_log += str(self.upload_rate) + ' KB/s'
+        upload_log += ', avg uploading rate = '
+        upload_log += str(self.avg_upload_rate) + ' KB/s'
+        upload_log += ', max uploading rate = ' 
+        upload_log += str(self.max_upload_rate) + ' KB/s]'
+        return upload_log
+
+
 """
     Torrent statistics included number of pieces downloaded/uploaded. The
     downloading/uploading rate of the torrent file and other information.
     The class provides functionaility to updates the torrent information and
     measure the parameters of downloading/uploading
 """
-class torrent_statistics():
+class torrent_statistics(peer_statistics):
     # initialize all the torrent statics information
     def __init__(self, torrent_metadata):
-        self.uploaded               = set([])   # pieces uploaded
-        self.downloaded             = set([])   # pieces downloaded
-        self.upload_rate            = 0.0       # upload rate   (kbps)
-        self.download_rate          = 0.0       # download rate (kbps)
-    
-        self.max_upload_rate        = 0.0       # max upload rate (kbps)
-        self.max_download_rate      = 0.0       # max download rate (kbps)
-    
-        self.total_upload_rate      = 0.0       # sum upload rate (kbps)
-        self.total_download_rate    = 0.0       # sum download rate (kbps)
+        super().__init__()
+        # total pieces in file to be downloaded
+        self.total_pieces           = int(len(torrent_metadata.pieces) / 20)
 
-        self.avg_upload_rate        = 0.0       # avg upload rate (kbps)
-        self.avg_download_rate      = 0.0       # avg download rate (kbps)
-        
-        self.event_start_time       = 0         # start time of event
-        self.event_end_time         = 0         # end time of event
+        self.uploaded               = piece_bitfield(self.total_pieces)   # pieces uploaded
+        self.downloaded             = piece_bitfield(self.total_pieces)   # pieces downloaded
         
         self.num_pieces_downloaded  = 0         # blocks/pieces downloaded
-        self.num_pieces_uploaded    = 0         # blocks/pieces uplaoded
         self.num_pieces_left        = 0         # blocks/pieces left
+
+        self.cache_hits             = 0         # blocks read from piece cache
+        self.cache_misses           = 0         # pieces read in piece cache
+        self.cache_evictions        = 0         # pieces evicted from cache
+        self.cache_size             = 0         # size of cached pieces (bytes)
         
 
         # file in bytes to be downloaded
         self.file_size              = torrent_metadata.file_size
-        # total pieces in file to be downloaded
-        self.total_pieces           = int(len(torrent_metadata.pieces) / 20)
         # percentage of file downloaded by the client 
         self.file_downloading_percentage = 0.0
         # time remaining for complete download 
         self.expected_download_completion_time = 0.0
 
 
-    def start_time(self):
-        self.event_start_time = time.time()
-     
-    def stop_time(self):
-        self.event_end_time = time.time()
-    
-    def update_start_time(self, time_t):
-        self.event_start_time = time_t
-
-    def update_end_time(self, time_t):
-        self.event_end_time = time_t
-
     """
-        function updates the statistics after downloading 
-        given piece index with given piece size
+        function updates the statistics after downloading and validating
+        given piece index, the rates are measured by the download meter
     """
-    def update_download_rate(self, piece_index, piece_size):
-        # calculate the time for downloading
-        time = (self.event_end_time - self.event_start_time) / 2
-
-        piece_size_kb = piece_size / (2 ** 10)
-        self.download_rate = round(piece_size_kb / time, 2)
-        
+    def update_download_rate(self, piece_index):
         # update the downloaded piece set
         self.downloaded.add(piece_index)
-        # update the num blocks downloaded
+        # update the num pieces downloaded
         self.num_pieces_downloaded += 1
 
-        # update the avg download rate
-        self.total_download_rate += self.download_rate
-        self.avg_download_rate = self.total_download_rate / self.num_pieces_downloaded
-        self.avg_download_rate = round(self.avg_download_rate , 2)
+        # current, average and max download rate (KB/s)
+        self.download_rate      = round(self.download_meter.rate() / (2 ** 10), 2)
+        self.avg_download_rate  = round(self.download_meter.average_rate() / (2 ** 10), 2)
+        self.max_download_rate  = max(self.max_download_rate, self.download_rate)
 
-        # update the max download rate 
-        self.max_download_rate = max(self.max_download_rate, self.download_rate)
-        
         # file downloading percentage 
         self.file_downloading_percentage = round((len(self.downloaded) * 100)/self.total_pieces, 2)
-        # time remaining for complete download 
-        time_left = (self.total_pieces - (len(self.downloaded))) * time
-        self.expected_download_completion_time = timedelta(seconds=time_left)
+        # time remaining for complete download at the current rate
+        pieces_left = self.total_pieces - len(self.downloaded)
+        time_left   = self.download_meter.remaining_time(pieces_left * self.file_size / self.total_pieces)
+        if time_left is not None:
+            self.expected_download_completion_time = timedelta(seconds=round(time_left))
 
     """
-        function updates the downloading statistics 
+        function updates the statistics of the piece cache used for seeding
     """
-    def update_upload_rate(self, piece_index, piece_size):
-        # calculate the time for uploading
-        time = (self.event_end_time - self.event_start_time) / 2
+    def update_cache_statistics(self, piece_cache):
+        self.cache_hits         = piece_cache.hits
+        self.cache_misses       = piece_cache.misses
+        self.cache_evictions    = piece_cache.evictions
+        self.cache_size         = piece_cache.cached_size
 
-        piece_size_kb = piece_size / (2 ** 10)
-        self.upload_rate = round(piece_size_kb / time, 2)
-        
-        # update the num blocks downloaded
-        self.num_pieces_uploaded += 1
-
-        # update the avg download rate
-        self.total_upload_rate += self.upload_rate
-        self.avg_upload_rate = self.total_upload_rate / self.num_pieces_uploaded
-        self.avg_upload_rate = round(self.avg_upload_rate, 2)
-
-        # update the max download rate 
-        self.max_upload_rate = max(self.max_upload_rate, self.upload_rate)
-        
     """
         function returns the download statistics of the torrent file
     """
     def get_download_statistics(self):
         download_log  = 'File downloaded : ' + str(self.file_downloading_percentage) + ' % '
-        download_log += '(Average downloading rate : ' + str(self.avg_download_rate) + ' Kbps  '
+        download_log += '(Downloading rate : ' + str(self.download_rate) + ' KB/s  '
+        download_log += 'Average downloading rate : ' + str(self.avg_download_rate) + ' KB/s  '
         download_log += 'Time remaining : ' + str(self.expected_download_completion_time) + ')'
         return download_log
     
@@ -118,12 +145,13 @@ class torrent_statistics():
         function returns the upload statistics of the torrent file
     """
     def get_upload_statistics(self):
-        upload_log  = 'uploaded : [upload rate = ' 
-        upload_log += str(self.upload_rate) + ' Kbps'
-        upload_log += ', avg uploading rate = '
-        upload_log += str(self.avg_upload_rate) + ' Kbps'
-        upload_log += ', max uploading rate = ' 
-        upload_log += str(self.max_upload_rate) + ' Kbps]'
+        upload_log = super().get_upload_statistics()
+        # piece cache statistics if client is using the piece cache
+        if self.cache_hits + self.cache_misses > 0:
+            upload_log += ' cache : [hits = ' + str(self.cache_hits)
+            upload_log += ', misses = ' + str(self.cache_misses)
+            upload_log += ', evictions = ' + str(self.cache_evictions)
+            upload_log += ', cached = ' + str(self.cache_size // (2 ** 10)) + ' KB]'
         return upload_log
 
 
@@ -0,0 +1,38 @@
+import hashlib
+import os
+
+import pytest
+
+from py_bit_torrent.protocol.torrent_file_handler import torrent_metadata
+
+PIECE_LENGTH = 64 * 1024
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # loggers of the protocol write into ./torrent_logs/
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("torrent_logs")
+    return tmp_path
+
+
+def make_metadata(file_data, file_name="shared.bin", files=None):
+    pieces = b"".join(
+        hashlib.sha1(file_data[i : i + PIECE_LENGTH]).digest()
+        for i in range(0, len(file_data), PIECE_LENGTH)
+    )
+    info_hash = hashlib.sha1(pieces).digest()
+    return torrent_metadata(
+        [None], file_name, len(file_data), PIECE_LENGTH, pieces, info_hash, files
+    )
+
+
+def make_client_request(seeding=None, downloading=None, storage_backend="file"):
+    return {
+        "seeding": seeding,
+        "downloading": downloading,
+        "uploading rate": None,
+        "downloading rate": None,
+        "max peers": 4,
+        "storage backend": storage_backend,
+    }
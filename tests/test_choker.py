@@ -0,0 +1,85 @@
+from py_bit_torrent.protocol.choker import (
+    OPTIMISTIC_UNCHOKE_INTERVAL,
+    RECHOKE_INTERVAL,
+    SNUBBED_TIMEOUT,
+    choker,
+    tit_for_tat_choker,
+)
+from py_bit_torrent.protocol.peer_state import peer_state
+
+
+class simulated_socket:
+    def __init__(self):
+        self.connected = True
+
+    def peer_connection_active(self):
+        return self.connected
+
+
+class simulated_peer:
+    def __init__(self, rate, interested=True, last_block_time=0):
+        self.state = peer_state()
+        self.state.peer_interested = interested
+        self.state.peer_choking = False
+        self.peer_sock = simulated_socket()
+        self.rate = rate
+        self.last_block_time = last_block_time
+
+    def download_rate(self):
+        return self.rate
+
+    def upload_rate(self):
+        return self.rate
+
+    def is_snubbed(self, current_time):
+        return current_time - self.last_block_time >= SNUBBED_TIMEOUT
+
+
+def test_fastest_peers_and_one_optimistic_peer_are_unchoked():
+    peers = [simulated_peer(rate) for rate in [50, 10, 40, 30, 20, 60]]
+    peers.append(simulated_peer(100, interested=False))
+    tit_for_tat = tit_for_tat_choker(upload_slots=4)
+    unchoked_peers = tit_for_tat.rechoke(peers, seeding=True, current_time=0)
+    assert len(unchoked_peers) == 4
+    assert {peers[5], peers[0], peers[2]} < unchoked_peers
+    assert tit_for_tat.optimistic_peer in [peers[1], peers[3], peers[4]]
+    # slots are full untill the next rechoke
+    assert not tit_for_tat.upload_allowed(simulated_peer(70))
+    # every interested peer is unchoked by the earlier algorithm
+    assert choker().rechoke(peers, seeding=True) == set(peers[:6])
+
+
+def test_optimistic_unchoke_rotates_every_thirty_seconds():
+    peers = [simulated_peer(rate) for rate in [50, 40, 30, 20, 10]]
+    tit_for_tat = tit_for_tat_choker(upload_slots=3)
+    tit_for_tat.rechoke(peers, seeding=True, current_time=0)
+    optimistic_peer = tit_for_tat.optimistic_peer
+    assert optimistic_peer in peers[2:]
+    for current_time in range(0, OPTIMISTIC_UNCHOKE_INTERVAL, RECHOKE_INTERVAL):
+        tit_for_tat.rechoke(peers, seeding=True, current_time=current_time)
+        assert tit_for_tat.optimistic_peer is optimistic_peer
+    tit_for_tat.rechoke(peers, True, OPTIMISTIC_UNCHOKE_INTERVAL)
+    assert tit_for_tat.optimistic_unchoke_time == OPTIMISTIC_UNCHOKE_INTERVAL
+    # disconnected optimistic peer is replaced immediately
+    tit_for_tat.optimistic_peer.peer_sock.connected = False
+    disconnected_peer = tit_for_tat.optimistic_peer
+    unchoked_peers = tit_for_tat.rechoke(peers, True, OPTIMISTIC_UNCHOKE_INTERVAL + 1)
+    assert disconnected_peer not in unchoked_peers and len(unchoked_peers) == 3
+
+
+def test_snubbed_peers_lose_regular_slots_while_downloading():
+    current_time = SNUBBED_TIMEOUT + 5
+    fast_snubbing_peer = simulated_peer(1000, last_block_time=0)
+    peers = [fast_snubbing_peer] + [
+        simulated_peer(rate, last_block_time=current_time) for rate in [30, 20, 10]
+    ]
+    tit_for_tat = tit_for_tat_choker(upload_slots=3)
+    unchoked_peers = tit_for_tat.rechoke(peers, False, current_time)
+    assert {peers[1], peers[2]} < unchoked_peers
+    # snubbed peer can still get the optimistic unchoke
+    assert tit_for_tat.optimistic_peer in [fast_snubbing_peer, peers[3]]
+    # upload slot of disconnected peer is given to the interested peer
+    tit_for_tat.remove_peer(peers[1])
+    new_peer = simulated_peer(0)
+    assert tit_for_tat.upload_allowed(new_peer)
+    assert not tit_for_tat.upload_allowed(simulated_peer(0))
@@ -0,0 +1,70 @@
+import asyncio
+import errno
+import os
+
+from py_bit_torrent.protocol.disk_writer import disk_writer
+from py_bit_torrent.protocol.shared_file_handler import file_io
+
+
+class recording_file_handler:
+    def __init__(self, failing_pieces=()):
+        self.writes = []
+        self.failing_pieces = failing_pieces
+
+    def write_pieces(self, piece_index, pieces_data):
+        if piece_index in self.failing_pieces:
+            raise OSError(errno.ENOSPC, "No space left on device")
+        self.writes.append((piece_index, len(pieces_data)))
+
+
+async def test_adjacent_pieces_written_together_in_file_order():
+    file_handler = recording_file_handler()
+    writer = disk_writer(file_handler)
+    # pieces verified in random order while the disk is busy
+    for piece_index in [7, 2, 0, 3, 1, 9, 8]:
+        writer.dirty_pieces[piece_index] = bytes(4)
+        writer.dirty_size += 4
+    await writer.write_piece(5, bytes(4))
+    await writer.flush()
+    assert file_handler.writes == [(0, 4), (5, 1), (7, 3)]
+    assert writer.dirty_size == 0
+
+
+async def test_pieces_wait_for_space_when_buffer_is_full():
+    file_handler = recording_file_handler()
+    writer = disk_writer(file_handler, max_dirty_size=8)
+    await writer.write_piece(0, bytes(4))
+    await writer.write_piece(1, bytes(4))
+    assert not writer.has_space()
+    # next piece is added only after the dirty pieces are written
+    third_write = asyncio.create_task(writer.write_piece(2, bytes(4)))
+    await third_write
+    assert file_handler.writes[0] == (0, 2)
+    await writer.flush()
+    assert file_handler.writes == [(0, 2), (2, 1)]
+
+
+def test_vectored_write_of_many_buffers(tmp_path):
+    buffers = [os.urandom(size) for size in range(1, 3000)]
+    download_file = file_io(str(tmp_path / "download.bin"))
+    download_file.pwritev(buffers, 100)
+    assert download_file.pread(10**7, 100) == b"".join(buffers)
+    download_file.close()
+
+
+async def test_pieces_reported_only_after_their_run_is_written():
+    file_handler = recording_file_handler(failing_pieces=[4])
+    writer = disk_writer(file_handler)
+    written_pieces = {}
+
+    async def piece_written(piece_index, is_piece_written):
+        written_pieces[piece_index] = is_piece_written
+
+    for piece_index in [0, 1, 4, 5, 8]:
+        await writer.write_piece(piece_index, bytes(4), piece_written)
+    assert written_pieces == {}
+    await writer.flush()
+    # failed run of pieces never stops the other runs from being written
+    assert file_handler.writes == [(0, 2), (8, 1)]
+    assert written_pieces == {0: True, 1: True, 4: False, 5: False, 8: True}
+    assert writer.write_errors == 1 and writer.dirty_size == 0
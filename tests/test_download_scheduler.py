@@ -0,0 +1,127 @@
+import hashlib
+
+from py_bit_torrent.protocol.download_scheduler import download_scheduler
+from py_bit_torrent.protocol.partial_piece import partial_piece
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+from py_bit_torrent.protocol.piece_picker import piece_picker
+
+BLOCK_LENGTH = 4
+PIECE_LENGTH = 3 * BLOCK_LENGTH
+
+
+class fake_torrent:
+    block_length = BLOCK_LENGTH
+
+    def get_piece_length(self, piece_index):
+        return PIECE_LENGTH
+
+
+class fake_peer:
+    def __init__(self, pieces_count, pieces):
+        self.bitfield_pieces = piece_bitfield(pieces_count)
+        for piece_index in pieces:
+            self.bitfield_pieces.add(piece_index)
+
+
+def make_scheduler(pieces_count, *peers_pieces):
+    picker = piece_picker(pieces_count)
+    peers = []
+    for pieces in peers_pieces:
+        peer = fake_peer(pieces_count, pieces)
+        picker.add_peer_bitfield(peer.bitfield_pieces)
+        peers.append(peer)
+    return download_scheduler(picker, fake_torrent(), queue_length=2), peers
+
+
+def test_peers_are_never_assigned_the_same_piece():
+    scheduler, (first, second) = make_scheduler(8, range(8), range(8))
+    assigned = []
+    for _ in range(4):
+        assigned.append(scheduler.next_piece(first).piece_index)
+        assigned.append(scheduler.next_piece(second).piece_index)
+    assert sorted(assigned) == list(range(8))
+    assert scheduler.next_piece(first) is None
+
+
+def test_idle_peer_steals_queued_pieces():
+    scheduler, (slow, fast) = make_scheduler(4, range(4), range(4))
+    in_progress = scheduler.next_piece(slow).piece_index
+    # slow peer has one more piece queued, fast peer takes the other two
+    scheduler.next_piece(fast)
+    scheduler.next_piece(fast)
+    stolen = scheduler.next_piece(fast)
+    assert stolen is not None and stolen.piece_index != in_progress
+    assert not scheduler.peer_queues[slow]
+    assert scheduler.next_piece(fast) is None
+
+
+def test_blocks_of_piece_are_downloaded_from_several_peers():
+    scheduler, (first, second) = make_scheduler(1, [0], [0])
+    assert scheduler.next_block(first) == (0, 0, BLOCK_LENGTH)
+    # second peer is given the remaining blocks of the same piece
+    assert scheduler.next_block(second) == (0, 4, BLOCK_LENGTH)
+    assert scheduler.next_block(second) == (0, 8, BLOCK_LENGTH)
+    assert scheduler.in_endgame()
+
+    assert scheduler.block_recieved(second, 0, 8, b"cccc") is None
+    assert scheduler.block_recieved(second, 0, 4, b"bbbb") is None
+    completed_piece = scheduler.block_recieved(first, 0, 0, b"aaaa")
+    assert completed_piece.piece_data == b"aaaabbbbcccc"
+
+
+def test_released_blocks_are_requested_again():
+    scheduler, (first, second) = make_scheduler(1, [0], [0])
+    for _ in range(3):
+        scheduler.next_block(first)
+    scheduler.block_recieved(first, 0, 0, b"aaaa")
+    # first peer choked the client before sending the other blocks
+    scheduler.remove_peer(first)
+    assert scheduler.next_block(second) == (0, 4, BLOCK_LENGTH)
+    assert scheduler.next_block(second) == (0, 8, BLOCK_LENGTH)
+    # late block from the first peer is still accepted in the piece
+    assert scheduler.block_recieved(first, 0, 4, b"bbbb") is None
+    assert scheduler.block_recieved(second, 0, 8, b"cccc").is_complete()
+
+
+def test_failed_pieces_are_reassigned():
+    scheduler, (first, second) = make_scheduler(2, range(2), range(2))
+    piece_index = scheduler.next_piece(first).piece_index
+    scheduler.piece_finished(first, piece_index, downloaded=False)
+    scheduler.remove_peer(first)
+    reassigned = [scheduler.next_piece(second), scheduler.next_piece(second)]
+    assert sorted(piece.piece_index for piece in reassigned) == [0, 1]
+    scheduler.piece_finished(second, 0, downloaded=True)
+    assert not scheduler.piece_picker.is_missing(0)
+
+
+def test_endgame_requests_blocks_from_other_peers():
+    scheduler, (slow, fast) = make_scheduler(1, [0], [0])
+    for _ in range(3):
+        scheduler.next_block(slow)
+    assert scheduler.in_endgame()
+    # every remaining block is requested, fast peer requests them again
+    duplicates = [scheduler.next_block(fast) for _ in range(3)]
+    assert sorted(duplicates) == [(0, 0, 4), (0, 4, 4), (0, 8, 4)]
+    assert scheduler.next_block(fast) is None
+
+    # block recieved from fast peer, the request with slow peer is cancelled
+    assert scheduler.duplicate_requests(fast, 0, 4) == [slow]
+    scheduler.block_recieved(fast, 0, 4, b"bbbb")
+    assert scheduler.duplicate_requests(slow, 0, 4) == []
+    # block is still requested from fast peer when slow peer departs
+    scheduler.remove_peer(slow)
+    assert not scheduler.partial_pieces[0].missing_blocks
+
+
+def test_piece_hashed_as_contiguous_blocks_are_recieved():
+    piece = partial_piece(0, PIECE_LENGTH, BLOCK_LENGTH)
+    piece_data = b"abcdefghijkl"
+    # out of order block is hashed only once the gap before it is filled
+    assert piece.block_recieved(8, piece_data[8:])
+    assert piece.hashed_blocks == 0
+    assert piece.block_recieved(0, piece_data[:4])
+    assert piece.hashed_blocks == 1
+    assert piece.piece_digest() is None
+    assert piece.block_recieved(4, piece_data[4:8])
+    assert piece.hashed_blocks == 3
+    assert piece.piece_digest() == hashlib.sha1(piece_data).digest()
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from py_bit_torrent.protocol.fast_resume import fast_resume
+from py_bit_torrent.protocol.partial_piece import partial_piece
+from py_bit_torrent.protocol.shared_file_handler import create_shared_file_handler
+from py_bit_torrent.protocol.swarm import swarm
+from py_bit_torrent.protocol.torrent import torrent
+from tests.conftest import PIECE_LENGTH, make_client_request, make_metadata
+
+BLOCK_LENGTH = 16 * 1024
+
+
+# file handlers created by the test are closed after the test
+@pytest.fixture
+def file_handlers():
+    file_handlers = []
+    yield file_handlers
+    for file_handler in file_handlers:
+        file_handler.close()
+
+
+async def start_download(download_path, metadata, file_handlers):
+    leecher_torrent = torrent(metadata, make_client_request(None, download_path))
+    leecher_swarm = swarm({"peers": []}, leecher_torrent)
+    file_handler = create_shared_file_handler(download_path, leecher_torrent)
+    file_handlers.append(file_handler)
+    resume_file = fast_resume(
+        download_path + ".resume", leecher_torrent, file_handler.get_file_paths()
+    )
+    is_trusted = resume_file.load()
+    file_handler.initialize_for_download()
+    leecher_swarm.add_shared_file_handler(file_handler)
+    await leecher_swarm.resume_download(resume_file)
+    return leecher_swarm, is_trusted
+
+
+async def test_existing_pieces_are_rechecked_and_resumed(workdir, file_handlers):
+    file_data = os.urandom(PIECE_LENGTH * 4 + 1234)
+    metadata = make_metadata(file_data)
+    download_path = str(workdir / "download.bin")
+    # file has the pieces 0 and 2, other pieces are corrupted
+    existing_data = bytearray(file_data)
+    existing_data[PIECE_LENGTH] ^= 1
+    existing_data[PIECE_LENGTH * 3 :] = bytes(len(file_data) - PIECE_LENGTH * 3)
+    with open(download_path, "wb") as download_file:
+        download_file.write(existing_data)
+
+    leecher_swarm, is_trusted = await start_download(
+        download_path, metadata, file_handlers
+    )
+    assert not is_trusted
+    assert list(leecher_swarm.bitfield_pieces_downloaded) == [0, 2]
+
+    # piece 3 is partially downloaded when download is stopped
+    downloading_piece = partial_piece(3, PIECE_LENGTH, BLOCK_LENGTH)
+    leecher_swarm.download_scheduler.partial_pieces[3] = downloading_piece
+    block_data = file_data[PIECE_LENGTH * 3 + BLOCK_LENGTH :][:BLOCK_LENGTH]
+    downloading_piece.block_recieved(BLOCK_LENGTH, block_data)
+    await leecher_swarm.save_resume_file()
+
+    # restarted download trusts the resume file and never rechecks pieces
+    resumed_swarm, is_trusted = await start_download(
+        download_path, metadata, file_handlers
+    )
+    assert is_trusted
+    assert list(resumed_swarm.bitfield_pieces_downloaded) == [0, 2]
+    resumed_piece = resumed_swarm.download_scheduler.partial_pieces[3]
+    assert resumed_piece.recieved_block_ranges() == [(BLOCK_LENGTH, BLOCK_LENGTH)]
+    assert resumed_piece.piece_data[BLOCK_LENGTH : BLOCK_LENGTH * 2] == block_data
+
+    # modified file is not trusted anymore
+    with open(download_path, "r+b") as download_file:
+        download_file.write(b"modified")
+    resumed_swarm, is_trusted = await start_download(
+        download_path, metadata, file_handlers
+    )
+    assert not is_trusted
+    assert list(resumed_swarm.bitfield_pieces_downloaded) == [2]
@@ -0,0 +1,109 @@
+import asyncio
+import os
+import struct
+
+import pytest
+
+from py_bit_torrent.protocol.peer_protocol import frame_buffer, peer_protocol
+from py_bit_torrent.protocol.shared_file_handler import file_io
+
+
+def feed(frames, raw_data):
+    # emulates the event loop receiving data with recv_into
+    buffer = frames.get_buffer(len(raw_data))
+    buffer[: len(raw_data)] = raw_data
+    frames.buffer_updated(len(raw_data))
+
+
+def test_parses_all_buffered_messages():
+    frames = frame_buffer(64)
+    have = struct.pack("!IBI", 5, 4, 7)
+    piece = struct.pack("!IBII", 9 + 3, 7, 1, 0) + b"abc"
+    feed(frames, have + struct.pack("!I", 0) + piece + piece[:5])
+
+    assert frames.read_frame()[:2] == (5, 4)
+    assert frames.read_frame() == (0, None, None)
+    message_length, message_id, payload = frames.read_frame()
+    assert (message_length, message_id) == (12, 7)
+    assert isinstance(payload, memoryview)
+    assert bytes(payload[8:]) == b"abc"
+    # incomplete message is not parsed
+    assert frames.read_frame() is None
+
+
+def test_loaned_payload_survives_buffer_reclaim():
+    frames = frame_buffer(64)
+    block = bytes(range(40))
+    feed(frames, struct.pack("!IBII", 9 + len(block), 7, 0, 0) + block)
+    payload = frames.read_frame()[2]
+    # large data received while consumer still holds the payload
+    feed(frames, b"\x00" * 100)
+    assert bytes(payload[8:]) == block
+
+
+def test_read_exactly_handshake():
+    frames = frame_buffer(64)
+    feed(frames, b"x" * 68 + struct.pack("!IB", 1, 1))
+    assert frames.read_exactly(68) == b"x" * 68
+    assert frames.read_frame() == (1, 1, None)
+
+
+@pytest.mark.parametrize(
+    "sendfile_error", [None, asyncio.SendfileNotAvailableError, NotImplementedError]
+)
+async def test_sendfile_sends_header_and_file_data(
+    tmp_path, monkeypatch, unused_tcp_port, sendfile_error
+):
+    file_data = os.urandom(2**20)
+    (tmp_path / "seed.bin").write_bytes(file_data)
+    seed_file = file_io(str(tmp_path / "seed.bin"))
+    event_loop = asyncio.get_running_loop()
+    if sendfile_error is not None:
+        # data is read and written normally if sendfile can't be used for the
+        # file or the event loop (eg. uvloop raises NotImplementedError)
+        async def unavailable_sendfile(*args, **kwargs):
+            raise sendfile_error()
+
+        monkeypatch.setattr(event_loop, "sendfile", unavailable_sendfile)
+
+    async def send_block(connection):
+        await connection.sendfile(b"header", seed_file, 1000, 500000)
+        connection.close()
+
+    server = await event_loop.create_server(
+        lambda: peer_protocol(send_block), "127.0.0.1", unused_tcp_port
+    )
+    reader, writer = await asyncio.open_connection("127.0.0.1", unused_tcp_port)
+    assert await asyncio.wait_for(reader.read(), 10) == (
+        b"header" + file_data[1000:501000]
+    )
+    writer.close()
+    server.close()
+    seed_file.close()
+
+
+async def test_sendfile_over_transport_without_sendfile(tmp_path, unused_tcp_port):
+    file_data = os.urandom(2**18)
+    (tmp_path / "seed.bin").write_bytes(file_data)
+    seed_file = file_io(str(tmp_path / "seed.bin"))
+    event_loop = asyncio.get_running_loop()
+
+    async def send_block(connection):
+        # transport not supporting sendfile (eg. SSL transport), the event
+        # loop raises RuntimeError instead of SendfileNotAvailableError
+        connection.transport._sendfile_compatible = (
+            asyncio.constants._SendfileMode.UNSUPPORTED
+        )
+        await connection.sendfile(b"header", seed_file, 100, 2**17)
+        connection.close()
+
+    server = await event_loop.create_server(
+        lambda: peer_protocol(send_block), "127.0.0.1", unused_tcp_port
+    )
+    reader, writer = await asyncio.open_connection("127.0.0.1", unused_tcp_port)
+    assert await asyncio.wait_for(reader.read(), 10) == (
+        b"header" + file_data[100 : 100 + 2**17]
+    )
+    writer.close()
+    server.close()
+    seed_file.close()
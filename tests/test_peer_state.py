@@ -0,0 +1,42 @@
+from py_bit_torrent.protocol.peer_state import (
+    DSTATE0,
+    DSTATE1,
+    DSTATE2,
+    DSTATE3,
+    USTATE1,
+    USTATE2,
+    USTATE3,
+    peer_state,
+)
+
+
+def test_state_transitions_compare_as_small_ints():
+    state = peer_state()
+    assert not hasattr(state, "__dict__")
+    assert state.download_state() == DSTATE0
+    state.set_client_interested()
+    assert state.download_state() == DSTATE1
+    state.set_peer_unchoking()
+    assert state.download_state() == DSTATE2
+    assert (state.am_choking, state.am_interested) == (True, True)
+    assert (state.peer_choking, state.peer_interested) == (False, False)
+
+    state = peer_state()
+    state.peer_interested = True
+    assert state.upload_state() == USTATE1
+    state.set_client_unchoking()
+    assert state.upload_state() == USTATE2
+    # flags of the other FSM do not change the state
+    state.set_client_interested()
+    state.set_peer_unchoking()
+    assert state.upload_state() == USTATE2 and state.download_state() == DSTATE2
+
+
+def test_null_state_is_kept_after_connection_closed():
+    state = peer_state()
+    state.set_null()
+    state.set_client_interested()
+    state.peer_choking = False
+    assert state.download_state() == DSTATE3
+    assert state.upload_state() == USTATE3
+    assert state.am_interested is None and state.peer_choking is None
@@ -0,0 +1,99 @@
+import struct
+
+from py_bit_torrent.protocol.peer_wire_messages import (
+    CANCEL,
+    CHOKE,
+    HAVE,
+    PEER_MESSAGE_DECODER,
+    PIECE,
+    REQUEST,
+    bitfield,
+    cancel,
+    choke,
+    create_bitfield_message,
+    have,
+    keep_alive,
+    peer_wire_message,
+    piece,
+    request,
+)
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+
+
+def test_piece_decoded_as_view_of_payload():
+    payload = bytearray(struct.pack("!II", 3, 2**14) + b"block data")
+    message = peer_wire_message(9 + 10, PIECE, memoryview(payload))
+    decoded = PEER_MESSAGE_DECODER.decode(message)
+    assert (decoded.piece_index, decoded.block_offset) == (3, 2**14)
+    assert isinstance(decoded.block, memoryview)
+    assert decoded.block.obj is payload
+    assert bytes(decoded.block) == b"block data"
+
+
+def test_piece_encoded_as_header_and_block():
+    block = b"block data"
+    header, data = piece(3, 2**14, block).message_parts()
+    assert data is block
+    assert header == struct.pack("!IBII", 9 + len(block), PIECE, 3, 2**14)
+    assert piece(3, 2**14, block).message() == header + block
+
+
+def test_request_round_trip():
+    raw_message = request(5, 2**15, 2**14).message()
+    assert raw_message == struct.pack("!IBIII", 13, REQUEST, 5, 2**15, 2**14)
+    message = peer_wire_message(13, REQUEST, raw_message[5:])
+    decoded = PEER_MESSAGE_DECODER.decode(message)
+    assert (decoded.piece_index, decoded.block_offset) == (5, 2**15)
+    assert decoded.block_length == 2**14
+
+
+def test_cancel_round_trip():
+    raw_message = cancel(5, 2**15, 2**14).message()
+    assert raw_message == struct.pack("!IBIII", 13, CANCEL, 5, 2**15, 2**14)
+    message = peer_wire_message(13, CANCEL, raw_message[5:])
+    decoded = PEER_MESSAGE_DECODER.decode(message)
+    assert isinstance(decoded, cancel)
+    assert (decoded.piece_index, decoded.block_offset) == (5, 2**15)
+    assert decoded.block_length == 2**14
+
+
+def test_bitfield_wire_format_round_trip():
+    bitfield_pieces = piece_bitfield(11)
+    for piece_index in (0, 7, 8, 10):
+        bitfield_pieces.add(piece_index)
+    payload = create_bitfield_message(bitfield_pieces).payload
+    assert payload == bytes([0b10000001, 0b10100000])
+    extracted = bitfield(payload).extract_pieces(11)
+    assert extracted == bitfield_pieces
+    assert list(extracted) == [0, 7, 8, 10]
+    assert len(extracted) == 4
+
+
+def test_bitfield_bulk_operations():
+    peer_pieces = piece_bitfield.full(10)
+    client_pieces = piece_bitfield(10)
+    client_pieces.add(2)
+    client_pieces.add(9)
+    missing = peer_pieces - client_pieces
+    assert len(missing) == 8 and 2 not in missing and 3 in missing
+    assert list(peer_pieces & client_pieces) == [2, 9]
+    # spare bits of peer bitfield are ignored
+    assert len(piece_bitfield.from_payload(b"\xff\xff", 10)) == 10
+
+
+def test_frames_decoded_into_compact_messages():
+    payload = bytearray(struct.pack("!II", 3, 0) + b"block data")
+    decoded = PEER_MESSAGE_DECODER.decode_frame(19, PIECE, memoryview(payload))
+    assert not hasattr(decoded, "__dict__")
+    assert bytes(decoded.block) == b"block data"
+    assert (
+        PEER_MESSAGE_DECODER.decode_frame(5, HAVE, b"\x00\x00\x00\x07").piece_index == 7
+    )
+    # messages without payload are the same instance for every frame
+    assert isinstance(PEER_MESSAGE_DECODER.decode_frame(0, None, None), keep_alive)
+    first_choke = PEER_MESSAGE_DECODER.decode_frame(1, CHOKE, None)
+    assert isinstance(first_choke, choke)
+    assert PEER_MESSAGE_DECODER.decode_frame(1, CHOKE, None) is first_choke
+    assert PEER_MESSAGE_DECODER.decode(peer_wire_message(1, CHOKE, None)) is first_choke
+    assert PEER_MESSAGE_DECODER.decode_frame(3, 20, b"\x00\x00") is None
+    assert not hasattr(have(1), "__dict__")
@@ -0,0 +1,45 @@
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+from py_bit_torrent.protocol.piece_picker import piece_picker
+
+
+def make_bitfield(pieces_count, pieces):
+    bitfield_pieces = piece_bitfield(pieces_count)
+    for piece_index in pieces:
+        bitfield_pieces.add(piece_index)
+    return bitfield_pieces
+
+
+def test_rarest_pieces_selected_first():
+    picker = piece_picker(6)
+    assert not picker.has_available_pieces()
+    picker.add_peer_bitfield(make_bitfield(6, [0, 1, 2, 3]))
+    picker.add_peer_bitfield(make_bitfield(6, [0, 1, 4]))
+    picker.add_peer_bitfield(make_bitfield(6, [0]))
+    assert picker.has_available_pieces()
+    assert sorted(picker.rarest_pieces(3)) == [2, 3, 4]
+    assert sorted(picker.rarest_pieces(4)[3:]) == [1]
+    assert picker.rarest_pieces(6, exclude={2, 3, 4}) == [1, 0]
+    # piece 5 is not available with any peer
+    assert 5 not in picker.rarest_pieces(6)
+
+
+def test_downloaded_and_departed_pieces_leave_index():
+    picker = piece_picker(4)
+    bitfield_pieces = make_bitfield(4, [0, 1])
+    picker.add_peer_bitfield(bitfield_pieces)
+    picker.mark_downloaded(0)
+    assert picker.rarest_pieces(4) == [1]
+    picker.remove_peer_bitfield(bitfield_pieces)
+    assert picker.rarest_pieces(4) == []
+    assert not picker.has_available_pieces()
+    assert picker.availability[0] == 0 and not picker.is_missing(0)
+
+
+def test_availability_histogram():
+    picker = piece_picker(4)
+    picker.add_peer_bitfield(make_bitfield(4, [0, 1, 2]))
+    picker.add_peer_bitfield(make_bitfield(4, [0]))
+    picker.increment(1)
+    picker.mark_downloaded(2)
+    assert picker.availability_histogram() == {0: 1, 1: 1, 2: 2}
+    assert picker.availability_histogram(missing_only=True) == {0: 1, 2: 2}
@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import os
+import threading
+from types import SimpleNamespace
+
+from py_bit_torrent.protocol.piece_verifier import (
+    PENDING_PIECES_PER_THREAD,
+    piece_verifier,
+)
+
+PIECE_LENGTH = 1024
+
+
+def make_torrent(pieces_data):
+    pieces = b"".join(hashlib.sha1(piece).digest() for piece in pieces_data)
+    return SimpleNamespace(
+        torrent_metadata=SimpleNamespace(pieces=pieces),
+        get_piece_length=lambda piece_index: len(pieces_data[piece_index]),
+    )
+
+
+async def test_pieces_verified_with_callbacks():
+    pieces_data = [os.urandom(PIECE_LENGTH) for _ in range(8)]
+    verifier = piece_verifier(make_torrent(pieces_data), threads_count=2)
+    results = {}
+
+    async def piece_verified(piece_index, is_piece_valid):
+        results[piece_index] = is_piece_valid
+
+    for piece_index, piece_data in enumerate(pieces_data):
+        # corrupted, truncated and correct pieces
+        if piece_index == 3:
+            piece_data = os.urandom(PIECE_LENGTH)
+        elif piece_index == 5:
+            piece_data = piece_data[:-1]
+        callback = lambda is_valid, index=piece_index: piece_verified(index, is_valid)
+        await verifier.submit(piece_index, piece_data, callback)
+    await verifier.join()
+    await verifier.close()
+
+    assert results == {index: index not in (3, 5) for index in range(8)}
+
+
+async def test_submit_waits_when_queue_is_full():
+    pieces_data = [os.urandom(PIECE_LENGTH) for _ in range(4)]
+    verifier = piece_verifier(make_torrent(pieces_data), threads_count=1)
+    hashing_allowed = threading.Event()
+    validate_piece = verifier.validate_piece
+
+    # hashing threads are blocked untill the test allows them to continue
+    def blocked_validate_piece(piece_index, piece_data):
+        hashing_allowed.wait()
+        return validate_piece(piece_index, piece_data)
+
+    async def piece_verified(is_piece_valid):
+        assert is_piece_valid
+
+    verifier.validate_piece = blocked_validate_piece
+    for _ in range(PENDING_PIECES_PER_THREAD):
+        await verifier.submit(0, pieces_data[0], piece_verified)
+    blocked_submit = asyncio.create_task(
+        verifier.submit(1, pieces_data[1], piece_verified)
+    )
+    await asyncio.sleep(0.05)
+    assert not blocked_submit.done()
+
+    hashing_allowed.set()
+    await asyncio.wait_for(blocked_submit, 5)
+    await verifier.join()
+    await verifier.close()
+
+
+async def test_hashed_pieces_only_compare_digest():
+    pieces_data = [os.urandom(PIECE_LENGTH)]
+    verifier = piece_verifier(make_torrent(pieces_data), threads_count=1)
+    results = []
+
+    async def piece_verified(is_piece_valid):
+        results.append(is_piece_valid)
+
+    # piece data is never hashed when the digest is given
+    verifier.validate_piece = None
+    piece_digest = hashlib.sha1(pieces_data[0]).digest()
+    await verifier.submit(0, None, piece_verified, piece_digest)
+    await verifier.submit(0, None, piece_verified, bytes(20))
+    await verifier.join()
+    await verifier.close()
+    assert results == [True, False]
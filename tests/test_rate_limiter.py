@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+from py_bit_torrent.protocol.peer_protocol import peer_protocol
+from py_bit_torrent.protocol.rate_limiter import (
+    create_rate_limiter,
+    rate_limiter,
+    token_bucket,
+)
+
+RATE = 2**21
+TRANSFER_SIZE = 2**20
+BLOCK_LENGTH = 2**14
+
+
+class fake_clock:
+    def __init__(self):
+        self.current_time = 0.0
+
+    def __call__(self):
+        return self.current_time
+
+
+def test_bucket_waits_untill_debt_is_refilled():
+    clock = fake_clock()
+    bucket = token_bucket(1000 * 2**10, clock)
+    assert bucket.consume(bucket.burst) == 0
+    # data larger than tokens left puts the bucket into debt
+    assert bucket.consume(2**10) == 1 / 1000
+    clock.current_time += 1 / 1000
+    assert bucket.consume(2**11) == 2 / 1000
+    # tokens saved while idle are never more than burst
+    clock.current_time += 60
+    assert bucket.tokens < 0 and bucket.consume(0) == 0
+    assert bucket.tokens == bucket.burst
+
+
+def test_peer_limiter_waits_for_tighter_of_peer_and_global_limits():
+    global_limiter = create_rate_limiter(100)
+    peer_limiter = create_rate_limiter(10, global_limiter)
+    assert create_rate_limiter(None) is None
+    assert len(peer_limiter.buckets) == 2
+    assert peer_limiter.buckets[1] is global_limiter.buckets[0]
+    clock = fake_clock()
+    slow_bucket = token_bucket(10 * 2**10, clock)
+    fast_bucket = token_bucket(100 * 2**10, clock)
+    limiter = rate_limiter([slow_bucket, fast_bucket])
+    data_size = slow_bucket.burst + 2**10
+    assert limiter.consume(data_size) == 1 / 10
+    assert fast_bucket.tokens == fast_bucket.burst - data_size
+
+
+def is_accurate(expected_seconds, measured_seconds):
+    # rate limits are accurate within few percent
+    return abs(measured_seconds - expected_seconds) / expected_seconds < 0.05
+
+
+async def test_upload_and_download_rates_are_limited(unused_tcp_port):
+    limiter = create_rate_limiter(RATE // 2**10)
+    burst = limiter.read_size()
+    expected_seconds = (TRANSFER_SIZE - burst) / RATE
+
+    async def limited_upload(connection):
+        connection.set_rate_limiters(None, limiter)
+        for _ in range(TRANSFER_SIZE // BLOCK_LENGTH):
+            await connection.write(bytes(BLOCK_LENGTH))
+        connection.close()
+
+    server = await asyncio.get_running_loop().create_server(
+        lambda: peer_protocol(limited_upload), "127.0.0.1", unused_tcp_port
+    )
+    reader, writer = await asyncio.open_connection("127.0.0.1", unused_tcp_port)
+    start_time = time.perf_counter()
+    assert len(await reader.read()) == TRANSFER_SIZE
+    assert is_accurate(expected_seconds, time.perf_counter() - start_time)
+    writer.close()
+    server.close()
+
+    # peer sends data as fast as it can, client reads within download limit
+    async def unlimited_upload(connection):
+        await connection.write(bytes(TRANSFER_SIZE))
+        connection.close()
+
+    def limited_protocol():
+        connection = peer_protocol()
+        connection.set_rate_limiters(create_rate_limiter(RATE // 2**10), None)
+        return connection
+
+    server = await asyncio.get_running_loop().create_server(
+        lambda: peer_protocol(unlimited_upload), "127.0.0.1", 0
+    )
+    port = server.sockets[0].getsockname()[1]
+    _, connection = await asyncio.get_running_loop().create_connection(
+        limited_protocol, "127.0.0.1", port
+    )
+    start_time = time.perf_counter()
+    assert len(await connection.read_exactly(TRANSFER_SIZE)) == TRANSFER_SIZE
+    # data of the last read is returned before its tokens are refilled
+    seconds = time.perf_counter() - start_time + burst / RATE
+    assert is_accurate(expected_seconds, seconds)
+    connection.close()
+    server.close()
@@ -0,0 +1,39 @@
+import pytest
+
+from py_bit_torrent.protocol.rate_meter import RATE_TIME_CONSTANT, rate_meter
+
+BLOCK_LENGTH = 2**14
+
+
+def stream_blocks(meter, rate, seconds, start_time=0):
+    # blocks transferred at steady rate, returns time of the last block
+    block_interval = BLOCK_LENGTH / rate
+    for block in range(1, int(seconds / block_interval) + 1):
+        meter.update(BLOCK_LENGTH, start_time + block * block_interval)
+    return start_time + int(seconds / block_interval) * block_interval
+
+
+def test_steady_rate_is_measured_from_the_first_seconds():
+    swarm_meter = rate_meter()
+    meter = rate_meter(swarm_meter)
+    assert meter.rate(0) == 0.0 and meter.remaining_time(100, 0) is None
+    current_time = stream_blocks(meter, 2**20, 2)
+    assert meter.rate(current_time) == pytest.approx(2**20, rel=0.05)
+    current_time = stream_blocks(meter, 2**20, 20, current_time)
+    assert meter.rate(current_time) == pytest.approx(2**20, rel=0.01)
+    assert meter.remaining_time(2**22, current_time) == pytest.approx(4, rel=0.01)
+    # blocks of the peer are counted by the swarm meter
+    assert swarm_meter.total_bytes == meter.total_bytes
+    assert swarm_meter.rate(current_time) == meter.rate(current_time)
+
+
+def test_rate_follows_change_of_rate_and_decays_when_idle():
+    meter = rate_meter()
+    current_time = stream_blocks(meter, 2**20, 30)
+    current_time = stream_blocks(meter, 2**18, 5 * RATE_TIME_CONSTANT, current_time)
+    assert meter.rate(current_time) == pytest.approx(2**18, rel=0.05)
+    # old data is forgotten while the average counts all the data
+    assert meter.rate(current_time + 10 * RATE_TIME_CONSTANT) < 2**10
+    assert meter.average_rate(current_time) == pytest.approx(
+        (30 * 2**20 + 25 * 2**18) / current_time, rel=0.01
+    )
@@ -0,0 +1,65 @@
+from py_bit_torrent.protocol.request_window import (
+    MAX_OUTSTANDING_REQUESTS,
+    MIN_OUTSTANDING_REQUESTS,
+    request_window,
+)
+
+BLOCK_LENGTH = 2**14
+
+
+# sends blocks for given seconds at the given throughput, every block is
+# recieved after round trip time, returns the time the last block is recieved
+def transfer(window, seconds, rtt, throughput, now=0.0):
+    block_time = BLOCK_LENGTH / throughput
+    for block_index in range(round(seconds / block_time)):
+        window.add(block_index, 0, BLOCK_LENGTH, now)
+        now += block_time
+        assert window.match(block_index, 0, BLOCK_LENGTH, now + rtt) is not None
+    return now + rtt
+
+
+def test_window_sized_from_bandwidth_delay_product():
+    window = request_window(BLOCK_LENGTH)
+    assert window.size == 4 and window.has_room()
+    # 1.6 MB/s over 100 ms round trip : 10 blocks on the link
+    transfer(window, 5, rtt=0.1, throughput=100 * BLOCK_LENGTH)
+    # block is recieved after its transmission time and the round trip
+    assert abs(window.base_rtt - 0.11) < 1e-9
+    assert abs(window.throughput - 100 * BLOCK_LENGTH) / (100 * BLOCK_LENGTH) < 0.1
+    assert 18 <= window.size <= 22
+
+
+def test_window_grows_and_shrinks_within_bounds():
+    window = request_window(BLOCK_LENGTH)
+    now = transfer(window, 5, rtt=0.2, throughput=1000 * BLOCK_LENGTH)
+    assert window.size == MAX_OUTSTANDING_REQUESTS
+    # slow peer needs only the minimum window
+    transfer(window, 60, rtt=0.2, throughput=BLOCK_LENGTH, now=now)
+    assert window.size == MIN_OUTSTANDING_REQUESTS
+    # window never exceeds the "max outstanding requests" of client
+    small_window = request_window(BLOCK_LENGTH, max_size=8)
+    transfer(small_window, 5, rtt=0.2, throughput=1000 * BLOCK_LENGTH)
+    assert small_window.size == 8
+
+
+def test_responses_matched_in_any_order():
+    window = request_window(BLOCK_LENGTH)
+    window.add(3, 0, BLOCK_LENGTH, 1.0)
+    window.add(3, BLOCK_LENGTH, BLOCK_LENGTH, 1.5)
+    window.add(4, 0, BLOCK_LENGTH, 2.0)
+    window.add(4, BLOCK_LENGTH, BLOCK_LENGTH, 2.0)
+    assert not window.has_room()
+    assert window.remove(4, BLOCK_LENGTH)
+    assert window.match(4, 0, BLOCK_LENGTH, 2.25) == 2.0
+    assert window.match(3, BLOCK_LENGTH, BLOCK_LENGTH, 2.5) == 1.5
+    # round trip time samples : 0.25 s and 1 s
+    assert window.base_rtt == 0.25 and 0.25 < window.rtt < 1
+    # unknown, duplicate and wrongly sized blocks are rejected
+    assert window.match(5, 0, BLOCK_LENGTH, 3.0) is None
+    assert window.match(4, 0, BLOCK_LENGTH, 3.0) is None
+    assert window.match(3, 0, BLOCK_LENGTH // 2, 3.0) is None
+    assert len(window) == 1
+    assert window.remove(3, 0) and not window.remove(3, 0)
+    window.add(6, 0, BLOCK_LENGTH, 4.0)
+    window.clear()
+    assert len(window) == 0 and window.has_room()
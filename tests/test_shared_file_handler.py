@@ -0,0 +1,234 @@
+import errno
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from py_bit_torrent.protocol.piece_cache import piece_cache
+from py_bit_torrent.protocol.shared_file_handler import (
+    file_descriptor_pool,
+    file_io,
+    file_span_index,
+    torrent_multi_file_handler,
+    torrent_mmap_file_handler,
+    torrent_shared_file_handler,
+)
+
+
+def test_concurrent_positional_writes_and_reads(tmp_path):
+    piece_length = 4096
+    pieces = [os.urandom(piece_length) for _ in range(64)]
+    download_file = file_io(str(tmp_path / "download.bin"))
+
+    # pieces written in any order from many threads without any lock
+    with ThreadPoolExecutor(8) as executor:
+        for piece_index in reversed(range(len(pieces))):
+            executor.submit(
+                download_file.pwrite, pieces[piece_index], piece_index * piece_length
+            )
+
+    with open(tmp_path / "download.bin", "rb") as downloaded_file:
+        assert downloaded_file.read() == b"".join(pieces)
+    assert download_file.pread(10, 5 * piece_length) == pieces[5][:10]
+    # reading beyond end of file returns the available data
+    assert download_file.pread(100, 64 * piece_length - 10) == pieces[-1][-10:]
+
+
+def make_file_handler(
+    file_path,
+    file_size,
+    allocation_mode,
+    handler=torrent_shared_file_handler,
+    piece_cache_size=0,
+):
+    metadata = SimpleNamespace(file_size=file_size, piece_length=2**18)
+    torrent = SimpleNamespace(
+        torrent_metadata=metadata,
+        client_request={
+            "allocation mode": allocation_mode,
+            "piece cache size": piece_cache_size,
+        },
+        get_piece_length=lambda piece_index: 2**18,
+    )
+    return handler(str(file_path), torrent)
+
+
+def test_sparse_allocation_writes_no_data(tmp_path):
+    file_size = 2**30
+    file_handler = make_file_handler(tmp_path / "sparse.bin", file_size, "sparse")
+    file_handler.initialize_for_download()
+    file_stat = os.stat(tmp_path / "sparse.bin")
+    assert file_stat.st_size == file_size
+    # file system has not allocated the blocks of the file
+    assert file_stat.st_blocks * 512 < file_size
+
+
+def test_full_and_no_allocation(tmp_path):
+    file_handler = make_file_handler(tmp_path / "full.bin", 2**20, "full")
+    file_handler.initialize_for_download()
+    assert os.stat(tmp_path / "full.bin").st_size == 2**20
+
+    file_handler = make_file_handler(tmp_path / "none.bin", 2**20, "none")
+    file_handler.initialize_for_download()
+    assert os.stat(tmp_path / "none.bin").st_size == 0
+    # pieces written beyond end of file grow the file
+    file_handler.write_piece(3, b"data")
+    assert file_handler.read_block(3, 0, 4) == b"data"
+
+
+def test_mmap_handler_reads_views_of_mapping(tmp_path):
+    file_handler = make_file_handler(
+        tmp_path / "mmap.bin", 2**20, "none", torrent_mmap_file_handler
+    )
+    # file is mapped only once it has the complete size
+    assert file_handler.file_mapping is None
+    file_handler.initialize_for_download()
+    assert file_handler.file_mapping is not None
+
+    file_handler.write_piece(1, b"piece data")
+    data_block = file_handler.read_block(1, 6, 4)
+    assert isinstance(data_block, memoryview)
+    assert data_block == b"data"
+    with open(tmp_path / "mmap.bin", "rb") as mapped_file:
+        mapped_file.seek(2**18)
+        assert mapped_file.read(10) == b"piece data"
+
+
+def test_mmap_handler_falls_back_for_unmappable_file(tmp_path):
+    file_handler = make_file_handler(
+        tmp_path / "empty.bin", 0, "sparse", torrent_mmap_file_handler
+    )
+    file_handler.initialize_for_download()
+    assert file_handler.file_mapping is None
+    file_handler.write_piece(0, b"data")
+    assert file_handler.read_block(0, 0, 4) == b"data"
+
+
+def test_mmap_handler_falls_back_when_address_space_is_exhausted(tmp_path, monkeypatch):
+    # mapping of file larger than address space fails in mmap itself
+    def failing_mmap(*args):
+        raise OSError(errno.ENOMEM, "Cannot allocate memory")
+
+    monkeypatch.setattr(mmap, "mmap", failing_mmap)
+    file_handler = make_file_handler(
+        tmp_path / "large.bin", 2**20, "sparse", torrent_mmap_file_handler
+    )
+    file_handler.initialize_for_download()
+    assert file_handler.file_mapping is None
+    file_handler.write_piece(1, b"data")
+    assert file_handler.read_block(1, 0, 4) == b"data"
+    file_handler.close()
+
+
+def test_span_index_splits_pieces_across_files():
+    # files of 5, 0, 3 and 9 bytes in pieces of 4 bytes
+    file_spans = file_span_index([5, 0, 3, 9], 4, 17)
+    assert file_spans.piece_spans == [
+        [(0, 0, 4)],
+        [(0, 4, 1), (2, 0, 3)],
+        [(3, 0, 4)],
+        [(3, 4, 4)],
+        [(3, 8, 1)],
+    ]
+    assert file_spans.block_spans(1, 0, 1) == [(0, 4, 1)]
+    assert file_spans.block_spans(1, 1, 2) == [(2, 0, 2)]
+    # blocks are clipped at the end of piece
+    assert file_spans.block_spans(4, 0, 16) == [(3, 8, 1)]
+
+
+def test_descriptor_pool_closes_idle_files(tmp_path):
+    file_paths = [str(tmp_path / "dir" / str(index)) for index in range(4)]
+    file_pool = file_descriptor_pool(file_paths, max_open_files=2)
+    in_use_file = file_pool.acquire(0)
+    for file_index in range(1, 4):
+        file_pool.acquire(file_index)
+        file_pool.release(file_index)
+    # file in use is never closed, idle files closed in LRU order
+    assert list(file_pool.open_files) == [0, 3]
+    in_use_file.pwrite(b"data", 0)
+    file_pool.release(0)
+    file_pool.close()
+    assert file_pool.open_files == {}
+    assert sorted(os.listdir(tmp_path / "dir")) == ["0", "1", "2", "3"]
+
+
+def make_multi_file_handler(download_path, files, piece_length):
+    metadata = SimpleNamespace(
+        file_size=sum(file_length for file_length, file_path in files),
+        piece_length=piece_length,
+        files=files,
+    )
+    torrent = SimpleNamespace(
+        torrent_metadata=metadata,
+        client_request={"allocation mode": "sparse"},
+        get_piece_length=lambda piece_index: min(
+            piece_length, metadata.file_size - piece_index * piece_length
+        ),
+    )
+    return torrent_multi_file_handler(str(download_path), torrent)
+
+
+def test_multi_file_handler_reads_and_writes_across_files(tmp_path):
+    files = [(5, "a.bin"), (0, "empty.bin"), (3, "b/c.bin"), (9, "b/d/e.bin")]
+    file_handler = make_multi_file_handler(tmp_path / "torrent", files, 4)
+    file_handler.initialize_for_download()
+    for file_length, file_path in files:
+        assert os.path.getsize(tmp_path / "torrent" / file_path) == file_length
+
+    torrent_data = bytes(range(17))
+    for piece_index in range(5):
+        piece_data = torrent_data[piece_index * 4 : piece_index * 4 + 4]
+        file_handler.write_piece(piece_index, piece_data)
+    with open(tmp_path / "torrent" / "b" / "c.bin", "rb") as torrent_file:
+        assert torrent_file.read() == torrent_data[5:8]
+    assert file_handler.read_piece(1) == torrent_data[4:8]
+    assert file_handler.read_block(1, 0, 3) == torrent_data[4:7]
+    assert file_handler.read_piece(4) == torrent_data[16:]
+
+
+def test_multi_file_handler_rejects_paths_outside_directory(tmp_path):
+    with pytest.raises(ValueError):
+        make_multi_file_handler(tmp_path, [(1, "../outside.bin")], 4)
+    with pytest.raises(ValueError):
+        make_multi_file_handler(tmp_path, [(1, "/outside.bin")], 4)
+
+
+def test_piece_cache_evicts_least_recently_used_pieces():
+    cache = piece_cache(3 * 4)
+    for piece_index in range(3):
+        cache.put(piece_index, bytes(4))
+    assert cache.get(0) is not None
+    # piece 1 is least recently used
+    cache.put(3, bytes(4))
+    assert cache.get(1) is None
+    assert cache.get(2) is not None
+    # pieces larger than the cache are never cached
+    cache.put(4, bytes(13))
+    assert cache.get(4) is None
+    assert (cache.hits, cache.misses, cache.evictions) == (2, 2, 1)
+    assert cache.cached_size == 12
+
+
+def test_blocks_read_from_cached_pieces(tmp_path):
+    file_handler = make_file_handler(
+        tmp_path / "cached.bin", 2**21, "sparse", piece_cache_size=1
+    )
+    file_handler.initialize_for_download()
+    file_handler.write_piece(2, b"piece data")
+    # blocks are never sent from file while the cache is used
+    assert file_handler.block_file_span(2, 0, 4) is None
+    assert file_handler.read_block(2, 0, 5) == b"piece"
+    assert file_handler.read_block(2, 6, 4) == b"data"
+    cache = file_handler.piece_cache
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # written pieces are removed from the cache
+    file_handler.write_piece(2, b"other data")
+    assert file_handler.read_block(2, 0, 5) == b"other"
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 2, 0)
+    # only 4 pieces of 256 KB fit in 1 MB cache
+    for piece_index in range(5):
+        file_handler.read_block(piece_index, 0, 1)
+    assert cache.evictions == 1
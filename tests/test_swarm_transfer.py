@@ -0,0 +1,320 @@
+import asyncio
+import errno
+import os
+import struct
+
+import pytest
+
+from py_bit_torrent.protocol.peer_wire_messages import (
+    INTERESTED,
+    PIECE,
+    REQUEST,
+    UNCHOKE,
+    create_bitfield_message,
+    handshake,
+    interested,
+    request,
+    unchoke,
+)
+from py_bit_torrent.protocol.piece_bitfield import piece_bitfield
+from py_bit_torrent.protocol.shared_file_handler import create_shared_file_handler
+from py_bit_torrent.protocol.swarm import PEER_SELECTION_INTERVAL, swarm
+from py_bit_torrent.protocol.torrent import torrent
+from tests.conftest import PIECE_LENGTH, make_client_request, make_metadata
+
+
+async def start_seeder(seed_path, metadata, port, storage_backend):
+    # seeder listening on the loopback interface
+    client_request = make_client_request(seed_path, None, storage_backend)
+    seeder_torrent = torrent(metadata, client_request, port, "127.0.0.1")
+    seeder_swarm = swarm({"peers": []}, seeder_torrent)
+    seeder_swarm.add_shared_file_handler(
+        create_shared_file_handler(seed_path, seeder_torrent)
+    )
+    seeding_task = asyncio.create_task(seeder_swarm.seed_file())
+    await asyncio.sleep(0.1)
+    return seeder_swarm, seeding_task
+
+
+def assert_file_closed(file_object):
+    with pytest.raises(OSError):
+        os.fstat(file_object.fileno())
+
+
+async def download_from_seeders(
+    workdir, file_data, ports, storage_backend="file", failed_writes=0
+):
+    seed_path = str(workdir / "seed.bin")
+    with open(seed_path, "wb") as seed_file:
+        seed_file.write(file_data)
+    metadata = make_metadata(file_data)
+    seeders = [
+        await start_seeder(seed_path, metadata, port, storage_backend) for port in ports
+    ]
+
+    # leecher downloading from the seeders
+    download_path = str(workdir / "download.bin")
+    client_request = make_client_request(None, download_path, storage_backend)
+    leecher_torrent = torrent(metadata, client_request)
+    peers_data = {"peers": [{"ip": "127.0.0.1", "port": port} for port in ports]}
+    leecher_swarm = swarm(peers_data, leecher_torrent)
+    file_handler = create_shared_file_handler(download_path, leecher_torrent)
+    file_handler.initialize_for_download()
+    leecher_swarm.add_shared_file_handler(file_handler)
+    # first writes of the pieces fail as if the disk is full
+    write_pieces = file_handler.write_pieces
+    write_failures = []
+
+    def failing_write_pieces(piece_index, pieces_data):
+        if len(write_failures) < failed_writes:
+            write_failures.append(piece_index)
+            raise OSError(errno.ENOSPC, "No space left on device")
+        write_pieces(piece_index, pieces_data)
+
+    file_handler.write_pieces = failing_write_pieces
+
+    try:
+        assert await asyncio.wait_for(leecher_swarm.download_file(), 60)
+    finally:
+        for seeder_swarm, seeding_task in seeders:
+            seeding_task.cancel()
+            seeder_swarm.client_peer.close_peer_connection()
+
+    # files are closed once the download / seeding is finished
+    for seeder_swarm, seeding_task in seeders:
+        await asyncio.gather(seeding_task, return_exceptions=True)
+        assert not seeder_swarm.upload_peers
+        assert_file_closed(seeder_swarm.file_handler.download_file)
+    assert_file_closed(leecher_swarm.file_handler.download_file)
+    assert leecher_swarm.download_complete()
+    with open(download_path, "rb") as downloaded_file:
+        assert downloaded_file.read() == file_data
+    return leecher_swarm
+
+
+@pytest.mark.parametrize("storage_backend", ["file", "mmap"])
+async def test_download_from_local_seeder(workdir, unused_tcp_port, storage_backend):
+    file_data = os.urandom(PIECE_LENGTH * 5 + 1234)
+    await download_from_seeders(workdir, file_data, [unused_tcp_port], storage_backend)
+
+
+async def test_pieces_not_written_are_downloaded_again(workdir, unused_tcp_port):
+    file_data = os.urandom(PIECE_LENGTH * 4 + 1234)
+    leecher_swarm = await download_from_seeders(
+        workdir, file_data, [unused_tcp_port], failed_writes=2
+    )
+    assert leecher_swarm.disk_writer.write_errors == 2
+
+
+async def test_download_blocks_from_several_seeders(workdir, unused_tcp_port_factory):
+    file_data = os.urandom(PIECE_LENGTH * 3 + 1234)
+    ports = [unused_tcp_port_factory(), unused_tcp_port_factory()]
+    leecher_swarm = await download_from_seeders(workdir, file_data, ports)
+    # blocks were downloaded from both the seeders
+    for peer in leecher_swarm.peers_list:
+        assert peer.statistics.download_meter.total_bytes > 0
+    # rate meter of swarm is updated with the blocks from all the peers
+    assert leecher_swarm.torrent.statistics.download_meter.total_bytes >= len(file_data)
+
+
+async def test_download_multi_file_torrent(workdir, unused_tcp_port):
+    # pieces spanning several files in nested directories
+    files = [
+        (PIECE_LENGTH + 100, "first.bin"),
+        (0, "empty.bin"),
+        (300, os.path.join("nested", "second.bin")),
+        (PIECE_LENGTH * 2, os.path.join("nested", "deep", "third.bin")),
+    ]
+    file_data = os.urandom(sum(file_length for file_length, file_path in files))
+    seed_path = workdir / "seed"
+    file_position = 0
+    for file_length, file_path in files:
+        os.makedirs((seed_path / file_path).parent, exist_ok=True)
+        with open(seed_path / file_path, "wb") as seed_file:
+            seed_file.write(file_data[file_position : file_position + file_length])
+        file_position += file_length
+    metadata = make_metadata(file_data, "shared", files)
+    seeder = await start_seeder(str(seed_path), metadata, unused_tcp_port, "file")
+
+    download_path = str(workdir / "download")
+    client_request = make_client_request(None, download_path)
+    leecher_torrent = torrent(metadata, client_request)
+    leecher_swarm = swarm(
+        {"peers": [{"ip": "127.0.0.1", "port": unused_tcp_port}]}, leecher_torrent
+    )
+    file_handler = create_shared_file_handler(download_path, leecher_torrent)
+    file_handler.initialize_for_download()
+    leecher_swarm.add_shared_file_handler(file_handler)
+
+    try:
+        assert await asyncio.wait_for(leecher_swarm.download_file(), 60)
+    finally:
+        seeder_swarm, seeding_task = seeder
+        seeding_task.cancel()
+        seeder_swarm.client_peer.close_peer_connection()
+
+    assert not leecher_swarm.file_handler.file_pool.open_files
+    for file_length, file_path in files:
+        with open(seed_path / file_path, "rb") as seed_file:
+            with open(os.path.join(download_path, file_path), "rb") as download_file:
+                assert download_file.read() == seed_file.read()
+
+
+def test_peers_share_immutable_torrent_metadata(workdir):
+    metadata = make_metadata(os.urandom(PIECE_LENGTH * 2))
+    client_request = make_client_request(None, str(workdir / "download.bin"))
+    leecher_torrent = torrent(metadata, client_request)
+    peers_data = {"peers": [{"ip": "127.0.0.1", "port": port} for port in [1, 2]]}
+    leecher_swarm = swarm(peers_data, leecher_torrent)
+    # peers keep only their own statistics, torrent is never copied
+    for peer in leecher_swarm.peers_list:
+        assert peer.torrent is leecher_torrent
+        assert peer.statistics.download_meter.parent_meter is (
+            leecher_torrent.statistics.download_meter
+        )
+    with pytest.raises(AttributeError):
+        metadata.pieces = bytes(40)
+
+
+# remote peer speaking the peer wire protocol over raw stream
+REMOTE_PEER_ID = b"-RP0001-remote--peer"
+
+
+async def read_message(reader):
+    message_length = struct.unpack("!I", await reader.readexactly(4))[0]
+    while message_length == 0:
+        message_length = struct.unpack("!I", await reader.readexactly(4))[0]
+    message = await reader.readexactly(message_length)
+    return message[0], message[1:]
+
+
+async def read_message_of_type(reader, message_id):
+    recieved_id, payload = await read_message(reader)
+    while recieved_id != message_id:
+        recieved_id, payload = await read_message(reader)
+    return payload
+
+
+async def test_downloader_handles_interested_peer(workdir, unused_tcp_port):
+    # state of the downloader is not any of DSTATE0-3 when peer is interested
+    metadata = make_metadata(os.urandom(PIECE_LENGTH * 2))
+    request_recieved = asyncio.get_running_loop().create_future()
+
+    async def remote_seeder(reader, writer):
+        await reader.readexactly(68)
+        writer.write(handshake(metadata.info_hash, REMOTE_PEER_ID).message())
+        writer.write(create_bitfield_message(piece_bitfield.full(2)).message())
+        await read_message_of_type(reader, INTERESTED)
+        writer.write(interested().message())
+        await asyncio.sleep(0.2)
+        writer.write(unchoke().message())
+        request_recieved.set_result(await read_message_of_type(reader, REQUEST))
+
+    server = await asyncio.start_server(remote_seeder, "127.0.0.1", unused_tcp_port)
+    download_path = str(workdir / "download.bin")
+    leecher_torrent = torrent(metadata, make_client_request(None, download_path))
+    leecher_swarm = swarm(
+        {"peers": [{"ip": "127.0.0.1", "port": unused_tcp_port}]}, leecher_torrent
+    )
+    file_handler = create_shared_file_handler(download_path, leecher_torrent)
+    file_handler.initialize_for_download()
+    leecher_swarm.add_shared_file_handler(file_handler)
+    download_task = asyncio.create_task(leecher_swarm.download_file())
+    try:
+        block_request = await asyncio.wait_for(request_recieved, 5)
+        assert struct.unpack("!III", block_request)[1] == 0
+    finally:
+        download_task.cancel()
+        server.close()
+
+
+async def test_seeder_handles_unchoke_from_peer(workdir, unused_tcp_port):
+    # unchoke from the peer makes the client interested in the peer, state of
+    # the seeder is not any of USTATE0-3 untill the peer is interested
+    file_data = os.urandom(PIECE_LENGTH * 2)
+    seed_path = str(workdir / "seed.bin")
+    with open(seed_path, "wb") as seed_file:
+        seed_file.write(file_data)
+    metadata = make_metadata(file_data)
+    seeder_swarm, seeding_task = await start_seeder(
+        seed_path, metadata, unused_tcp_port, "file"
+    )
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", unused_tcp_port)
+        writer.write(handshake(metadata.info_hash, REMOTE_PEER_ID).message())
+        await reader.readexactly(68)
+        writer.write(unchoke().message())
+        await asyncio.sleep(0.2)
+        writer.write(interested().message())
+        await asyncio.wait_for(read_message_of_type(reader, UNCHOKE), 5)
+        writer.write(request(1, 0, 2**14).message())
+        block = await asyncio.wait_for(read_message_of_type(reader, PIECE), 5)
+        assert block[8:] == file_data[PIECE_LENGTH : PIECE_LENGTH + 2**14]
+        writer.close()
+    finally:
+        seeding_task.cancel()
+        seeder_swarm.client_peer.close_peer_connection()
+
+
+class connected_socket:
+    def __init__(self):
+        self.connected = True
+
+    def peer_connection_active(self):
+        return self.connected
+
+
+def test_top_peers_selected_once_per_interval(workdir, monkeypatch):
+    metadata = make_metadata(os.urandom(PIECE_LENGTH * 2))
+    client_request = make_client_request(None, str(workdir / "download.bin"))
+    client_request["max peers"] = 2
+    leecher_torrent = torrent(metadata, client_request)
+    peers_data = {"peers": [{"ip": "127.0.0.1", "port": port} for port in [1, 2, 3]]}
+    leecher_swarm = swarm(peers_data, leecher_torrent)
+    for peer, rate in zip(leecher_swarm.peers_list, [10, 30, 20]):
+        peer.bitfield_pieces = piece_bitfield.full(2)
+        peer.bitfield_initialized = True
+        peer.peer_sock = connected_socket()
+        monkeypatch.setattr(peer.statistics.download_meter, "rate", lambda r=rate: r)
+    slow_peer, fast_peer, medium_peer = leecher_swarm.peers_list
+
+    # peers are ranked only when the top peers are selected again
+    rankings = []
+    top_peers = leecher_swarm.top_peers
+
+    def ranked_peers():
+        rankings.append(top_peers())
+        return rankings[-1]
+
+    monkeypatch.setattr(leecher_swarm, "top_peers", ranked_peers)
+    assert leecher_swarm.select_top_peers(0) == {fast_peer, medium_peer}
+    for current_time in range(1, PEER_SELECTION_INTERVAL):
+        leecher_swarm.select_top_peers(current_time)
+    assert len(rankings) == 1
+    # disconnected top peer is replaced without waiting for the interval
+    fast_peer.peer_sock.connected = False
+    assert leecher_swarm.select_top_peers(1) == {medium_peer, slow_peer}
+    leecher_swarm.select_top_peers(PEER_SELECTION_INTERVAL + 1)
+    assert len(rankings) == 3
+
+
+def test_seeding_statistics_include_piece_cache(workdir):
+    file_data = os.urandom(PIECE_LENGTH * 2)
+    seed_path = str(workdir / "seed.bin")
+    with open(seed_path, "wb") as seed_file:
+        seed_file.write(file_data)
+    client_request = make_client_request(seed_path)
+    client_request["piece cache size"] = 1
+    seeder_torrent = torrent(make_metadata(file_data), client_request)
+    seeder_swarm = swarm({"peers": []}, seeder_torrent)
+    file_handler = create_shared_file_handler(seed_path, seeder_torrent)
+    seeder_swarm.add_shared_file_handler(file_handler)
+    try:
+        for block_offset in [0, 2**14]:
+            file_handler.read_block(1, block_offset, 2**14)
+        seeder_swarm.log_upload_statistics()
+        statistics = seeder_torrent.statistics
+        assert (statistics.cache_hits, statistics.cache_misses) == (1, 1)
+        assert "cache : [hits = 1, misses = 1" in statistics.get_upload_statistics()
+    finally:
+        file_handler.close()